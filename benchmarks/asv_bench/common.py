@@ -0,0 +1,75 @@
+import gzip
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import os
+import socket
+from socketserver import ThreadingMixIn
+import sys
+from threading import Thread
+
+# the synthetic data generator lives next to the standalone benchmark scripts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate import generate, write  # noqa: E402
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+ENCODERS = {
+    "identity": lambda data: data,
+    "gzip": lambda data: gzip.compress(data, compresslevel=6),
+}
+
+if zstandard is not None:
+    ENCODERS["zstd"] = zstandard.compress
+
+
+class ResponseServer:
+    """
+    ResponseServer serves a fixed query response from a local HTTP server using the requested content encoding.
+    """
+
+    def __init__(self, bodies):
+        self.bodies = bodies
+
+    def __enter__(self):
+        bodies = self.bodies
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                accepted = [e.strip() for e in self.headers.get("Accept-Encoding", "").split(",")]
+                encoding = next((e for e in accepted if e in bodies), "identity")
+                body = bodies[encoding]
+                self.send_response(200)
+                if encoding != "identity":
+                    self.send_header("Content-Encoding", encoding)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = _Server(("127.0.0.1", 0), Handler)
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}/api/v1/query"
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
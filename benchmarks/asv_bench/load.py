@@ -0,0 +1,70 @@
+import os
+import sage_data_client
+from .common import write, zstandard
+
+ROWS = [10000, 100000]
+SUFFIXES = [".ndjson", ".ndjson.gz", ".ndjson.zst"]
+
+
+class Load:
+    params = (ROWS, SUFFIXES)
+    param_names = ["rows", "suffix"]
+    timeout = 300
+
+    def setup_cache(self):
+        # files are written once into the benchmark's working directory and reused by every run
+        paths = {}
+        for rows in ROWS:
+            for suffix in SUFFIXES:
+                if suffix == ".ndjson.zst" and zstandard is None:
+                    continue
+                path = os.path.abspath(f"data-{rows}{suffix}")
+                write(path, rows, uploads=0.01)
+                paths[rows, suffix] = path
+        return paths
+
+    def setup(self, paths, rows, suffix):
+        if (rows, suffix) not in paths:
+            raise NotImplementedError("requires zstandard")
+
+    def time_load(self, paths, rows, suffix):
+        sage_data_client.load(paths[rows, suffix])
+
+    def time_load_categorical(self, paths, rows, suffix):
+        sage_data_client.load(paths[rows, suffix], categorical=True)
+
+    def time_load_filter(self, paths, rows, suffix):
+        sage_data_client.load(paths[rows, suffix], filter={"name": "env.temperature", "vsn": "W00*"})
+
+    def time_load_columns(self, paths, rows, suffix):
+        sage_data_client.load(paths[rows, suffix], columns=["timestamp", "name", "value", "meta.vsn"])
+
+    def time_load_iter(self, paths, rows, suffix):
+        for _ in sage_data_client.load_iter(paths[rows, suffix], chunksize=10000):
+            pass
+
+    def peakmem_load(self, paths, rows, suffix):
+        sage_data_client.load(paths[rows, suffix])
+
+    def peakmem_load_categorical(self, paths, rows, suffix):
+        sage_data_client.load(paths[rows, suffix], categorical=True)
+
+
+class LoadMany:
+    params = [4]
+    param_names = ["files"]
+    timeout = 300
+
+    def setup_cache(self):
+        paths = []
+        for i in range(4):
+            path = os.path.abspath(f"many-{i:04d}.ndjson.gz")
+            write(path, 25000, seed=i)
+            paths.append(path)
+        return paths
+
+    def time_load_many(self, paths, files):
+        sage_data_client.load_many(paths[:files])
+
+    def time_load_many_filter(self, paths, files):
+        sage_data_client.load_many(paths[:files], filter={"vsn": "W00A"})
@@ -0,0 +1,36 @@
+import sage_data_client
+from .common import ENCODERS, ResponseServer, generate
+
+ROWS = [10000, 100000]
+
+
+class Query:
+    params = (ROWS, ["identity", "gzip", "zstd"])
+    param_names = ["rows", "encoding"]
+    timeout = 300
+
+    def setup_cache(self):
+        return {rows: generate(rows, uploads=0.01) for rows in ROWS}
+
+    def setup(self, data, rows, encoding):
+        if encoding not in ENCODERS:
+            raise NotImplementedError(f"requires {encoding} support")
+        self.server = ResponseServer({encoding: ENCODERS[encoding](data[rows])}).__enter__()
+        self.client = sage_data_client.Client(self.server.endpoint)
+
+    def teardown(self, data, rows, encoding):
+        self.client.close()
+        self.server.__exit__(None, None, None)
+
+    def time_query(self, data, rows, encoding):
+        self.client.query(start="2023-09-28T00:00:00Z")
+
+    def time_query_categorical(self, data, rows, encoding):
+        self.client.query(start="2023-09-28T00:00:00Z", categorical=True)
+
+    def time_query_iter(self, data, rows, encoding):
+        for _ in self.client.query_iter(start="2023-09-28T00:00:00Z", chunksize=10000):
+            pass
+
+    def peakmem_query(self, data, rows, encoding):
+        self.client.query(start="2023-09-28T00:00:00Z")
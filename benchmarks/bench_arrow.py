@@ -0,0 +1,53 @@
+"""
+This benchmark compares the time to reload query results saved as NDJSON, Parquet and Feather
+files and to parse NDJSON using the python and pyarrow engines. Requires pyarrow.
+
+python3 benchmarks/bench_arrow.py --rows 1000000
+"""
+import argparse
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import time
+from generate import generate
+import sage_data_client
+
+
+def timeit(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000, help="number of records to generate")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as dir:
+        ndjson = Path(dir, "data.ndjson")
+        ndjson.write_bytes(generate(args.rows))
+        df = sage_data_client.load(ndjson)
+
+        cases = [
+            ("ndjson python", ndjson, {}),
+            ("ndjson pyarrow", ndjson, {"engine": "pyarrow"}),
+        ]
+
+        for suffix in [".parquet", ".feather"]:
+            path = Path(dir, "data" + suffix)
+            sage_data_client.save(df, path)
+            cases.append((suffix[1:], path, {}))
+            cases.append((suffix[1:] + " categorical", path, {"categorical": True}))
+
+        for label, path, kwargs in cases:
+            elapsed = timeit(lambda: sage_data_client.load(path, **kwargs))
+            size = os.path.getsize(path) / 1e6
+            print(f"{label:<24} {size:8.1f}MB {elapsed:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
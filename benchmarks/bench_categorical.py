@@ -0,0 +1,61 @@
+"""
+This benchmark compares memory use, load time and the groupby from examples/temperature_stats.py
+for data frames loaded with and without categorical columns.
+
+python3 benchmarks/bench_categorical.py --rows 1000000
+"""
+import argparse
+from io import BytesIO
+import time
+import pandas as pd
+from generate import generate
+import sage_data_client
+
+
+def memory_report(df):
+    usage = df.memory_usage(deep=True, index=False)
+    return pd.DataFrame(
+        {
+            "dtype": df.dtypes.astype(str),
+            "MB": usage / 1e6,
+            "bytes/row": usage / max(len(df), 1),
+        }
+    )
+
+
+def timeit(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000, help="number of records to generate")
+    args = parser.parse_args()
+
+    data = generate(args.rows)
+
+    for categorical in [False, True]:
+        start = time.perf_counter()
+        df = sage_data_client.load(BytesIO(data), categorical=categorical)
+        load_time = time.perf_counter() - start
+
+        groupby_time = timeit(
+            lambda: df.groupby(["meta.vsn", "meta.sensor"], observed=True).value.agg(
+                ["size", "min", "max", "mean"]
+            )
+        )
+
+        print(f"categorical={categorical}")
+        print(memory_report(df).to_string(float_format="{:.1f}".format))
+        print(f"total: {df.memory_usage(deep=True).sum() / 1e6:.1f}MB")
+        print(f"load: {load_time:.3f}s groupby: {groupby_time * 1e3:.1f}ms")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+This benchmark compares the time and peak memory of converting and summarizing a large NDJSON
+file using the sage-data command line, which streams records in chunks, against loading the whole
+file into a data frame.
+
+python3 benchmarks/bench_cli.py --rows 1000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+from tempfile import TemporaryDirectory
+import time
+from generate import write
+
+
+def run(args):
+    # each run is a separate process, so its peak memory is measured on its own
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", RUN, *args], stdout=subprocess.PIPE, check=True)
+    elapsed = time.perf_counter() - start
+    return elapsed, int(proc.stdout.split()[-1])
+
+
+RUN = """
+import resource, sys
+import sage_data_client
+from sage_data_client.cli import main
+if sys.argv[1] == "load":
+    df = sage_data_client.load(sys.argv[2])
+    if sys.argv[3].endswith(".parquet"):
+        sage_data_client.save(df, sys.argv[3])
+    else:
+        df.groupby("name").value.agg(["count", "min", "max", "mean"]).to_csv(sys.stdout)
+else:
+    main(sys.argv[1:])
+sys.stdout.flush()
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000, help="number of records to generate")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as dir:
+        path = os.path.join(dir, "data.ndjson.gz")
+        write(path, args.rows)
+        out = os.path.join(dir, "data.parquet")
+
+        for label, argv in [
+            ("load + save parquet", ["load", path, out]),
+            ("sage-data convert parquet", ["convert", path, out]),
+            ("load + groupby stats", ["load", path, "-"]),
+            ("sage-data stats", ["stats", path]),
+        ]:
+            elapsed, maxrss = run(argv)
+            print(f"{label:<28} {elapsed:.3f}s peak={maxrss / 1024:.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+This benchmark measures per request overhead of sending many small queries to a local HTTP
+server using a new urlopen connection per request versus a pooled keep alive Client.
+
+The local server doesn't use TLS and has almost no round trip time, so the difference against
+the real data API, where each new connection needs a TCP and TLS handshake, is much larger.
+
+python3 benchmarks/bench_client.py --requests 1000
+"""
+import argparse
+from gzip import GzipFile
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import socket
+from socketserver import ThreadingMixIn
+from threading import Thread
+import time
+from urllib.request import Request, urlopen
+import sage_data_client
+from sage_data_client.query import _load
+
+BODY = b"""{"timestamp":"2023-09-28T15:56:39.404972476Z","name":"env.temperature","value":50.75,"meta":{"node":"000048b02d05a0a4","vsn":"W02E"}}
+"""
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # headers and body are written separately, so avoid nagle delays on keep alive connections
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+QUERY = {"start": "2023-09-28T15:56:00.000000Z", "filter": {"name": "env.temperature"}}
+
+
+def urlopen_query(endpoint, q):
+    # the request path used by query() before connection pooling
+    req = Request(endpoint, json.dumps(q).encode(), headers={"Accept-Encoding": "gzip"})
+    with urlopen(req) as f:
+        if "gzip" in f.headers.get("Content-Encoding", ""):
+            f = GzipFile(fileobj=f, mode="rb")
+        return _load(f)
+
+
+def measure(func, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000, help="number of requests to send")
+    args = parser.parse_args()
+
+    server = Server(("127.0.0.1", 0), Handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_port}/api/v1/query"
+
+    client = sage_data_client.Client(endpoint)
+
+    def client_query(q):
+        with client.open(q) as f:
+            return _load(f)
+
+    urlopen_latency = measure(lambda: urlopen_query(endpoint, QUERY), args.requests)
+    client_latency = measure(lambda: client_query(QUERY), args.requests)
+
+    print(f"urlopen per request: {urlopen_latency * 1e3:7.3f}ms")
+    print(f"client per request:  {client_latency * 1e3:7.3f}ms")
+    print(f"speedup:             {urlopen_latency / client_latency:7.2f}x")
+
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+This benchmark measures throughput of each stage of loading compressed results: decompressing
+only, parsing only and decompressing and parsing together, comparing GzipFile against the
+decompression path used by load and query, with and without the background decompression thread.
+
+zstd and brotli cases require the optional zstandard and brotli packages.
+
+python3 benchmarks/bench_compression.py --rows 1000000
+"""
+import argparse
+import gzip
+from gzip import GzipFile
+from io import BytesIO
+import time
+from generate import generate
+from sage_data_client import compression
+from sage_data_client.query import _load
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def timeit(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def drain(f):
+    while f.read(1 << 18):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000, help="number of records to generate")
+    args = parser.parse_args()
+
+    data = generate(args.rows)
+    mb = len(data) / 1e6
+
+    encoded = {"gzip": gzip.compress(data, compresslevel=6)}
+    if zstandard is not None:
+        encoded["zstd"] = zstandard.compress(data, 3)
+    if brotli is not None:
+        encoded["br"] = brotli.compress(data, quality=5)
+
+    def report(label, seconds):
+        print(f"{label:<40} {seconds:.3f}s {mb / seconds:8.1f} MB/s")
+
+    print(f"{args.rows} records, {mb:.1f} MB uncompressed")
+    for encoding, body in encoded.items():
+        print(f"{encoding} compressed {len(body) / 1e6:.1f} MB")
+
+    report("parse only", timeit(lambda: _load(BytesIO(data))))
+
+    report("decompress only gzip GzipFile", timeit(lambda: drain(GzipFile(fileobj=BytesIO(encoded["gzip"])))))
+    for encoding, body in encoded.items():
+        report(f"decompress only {encoding}", timeit(lambda: drain(compression.decode(BytesIO(body), encoding))))
+
+    report("load gzip GzipFile", timeit(lambda: _load(GzipFile(fileobj=BytesIO(encoded["gzip"])))))
+    for encoding, body in encoded.items():
+        for threaded in [False, True]:
+            label = f"load {encoding}" + (" threaded" if threaded else "")
+            report(label, timeit(lambda: _load(compression.decode(BytesIO(body), encoding, threaded=threaded))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+This benchmark compares recovering from a failure late in a large backfill. A failed query has to
+start again from the beginning, while download only requests the windows missing from its
+manifest. It also compares the time to download all shards against a single query.
+
+python3 benchmarks/bench_download.py --rows 1000000 --windows 24
+"""
+import argparse
+from datetime import timedelta
+import os
+from tempfile import TemporaryDirectory
+import time
+from urllib.error import HTTPError
+from generate import START, generate
+import sage_data_client
+from sage_data_client.server import Server
+
+
+def timeit(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000, help="number of records to generate")
+    parser.add_argument("--windows", type=int, default=24, help="number of download windows")
+    args = parser.parse_args()
+
+    # generated records are about a second apart
+    span = (args.rows + 1) * 1_000_000_007
+    window = timedelta(microseconds=span // args.windows // 1000 + 1)
+    kwargs = dict(start=START, end=START + span)
+
+    with Server(generate(args.rows).splitlines()) as server, TemporaryDirectory() as dir:
+        client = sage_data_client.Client(server.endpoint, retries=0)
+
+        elapsed, df = timeit(lambda: client.query(**kwargs))
+        print(f"query: {elapsed:.3f}s rows={len(df)}")
+
+        elapsed, rows = timeit(lambda: sage_data_client.download(os.path.join(dir, "full"), chunk_window=window, client=client, **kwargs))
+        size = sum(os.path.getsize(os.path.join(dir, "full", f)) for f in os.listdir(os.path.join(dir, "full")))
+        print(f"download: {elapsed:.3f}s rows={rows} size={size / 1e6:.1f}MB")
+
+        elapsed, df = timeit(lambda: sage_data_client.load(os.path.join(dir, "full")))
+        print(f"load download: {elapsed:.3f}s rows={len(df)}")
+
+        # fail the request for the last window, then recover
+        server.failures.extend([None] * (args.windows - 1) + [400])
+        try:
+            sage_data_client.download(os.path.join(dir, "resume"), chunk_window=window, client=client, retries=0, **kwargs)
+        except HTTPError:
+            pass
+
+        elapsed, df = timeit(lambda: client.query(**kwargs))
+        print(f"recover by restarting query: {elapsed:.3f}s rows={len(df)}")
+
+        server.requests.clear()
+        elapsed, rows = timeit(lambda: sage_data_client.download(os.path.join(dir, "resume"), chunk_window=window, client=client, **kwargs))
+        print(f"recover by resuming download: {elapsed:.3f}s requests={len(server.requests)} rows={rows}")
+
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+This benchmark compares joining query results from many nodes using join with resampling or
+merge_asof on each node separately, like the join_queries.py example did.
+
+python3 benchmarks/bench_join.py --rows 1000000
+"""
+import argparse
+from io import BytesIO
+import time
+import pandas as pd
+from generate import generate
+import sage_data_client
+
+
+def timeit(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def resample_per_node(frames, window):
+    results = {}
+    for label, df in frames.items():
+        for vsn, group in df.groupby("meta.vsn"):
+            results[label, vsn] = group.resample(window, on="timestamp").value.mean()
+    return pd.DataFrame(results)
+
+
+def merge_asof_per_node(frames, tolerance):
+    labels = list(frames)
+    parts = []
+    for vsn, left in frames[labels[0]].groupby("meta.vsn"):
+        left = left[["timestamp", "value"]].rename(columns={"value": labels[0]})
+        for label in labels[1:]:
+            right = frames[label]
+            right = right[right["meta.vsn"] == vsn][["timestamp", "value"]].rename(columns={"value": label})
+            left = pd.merge_asof(left, right, on="timestamp", tolerance=pd.Timedelta(tolerance), direction="nearest")
+        parts.append(left.assign(vsn=vsn))
+    return pd.concat(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000, help="number of records to generate")
+    parser.add_argument("--nodes", type=int, default=500, help="number of distinct nodes")
+    args = parser.parse_args()
+
+    df = sage_data_client.load(BytesIO(generate(args.rows, nodes=args.nodes)))
+    frames = {
+        label: df[df.name == name].reset_index(drop=True)
+        for label, name in [
+            ("temperature", "env.temperature"),
+            ("pressure", "env.pressure"),
+            ("humidity", "env.relative_humidity"),
+        ]
+    }
+    print(f"{args.rows} records from {args.nodes} nodes")
+
+    before = timeit(lambda: resample_per_node(frames, "5min"))
+    after = timeit(lambda: sage_data_client.join(frames, how="window", tolerance="5m"))
+    print(f"window: resample per node={before:.3f}s join={after:.3f}s speedup={before / after:.1f}x")
+
+    before = timeit(lambda: merge_asof_per_node(frames, "30s"))
+    after = timeit(lambda: sage_data_client.join(frames, how="asof", tolerance="30s"))
+    print(f"asof: merge_asof per node={before:.3f}s join={after:.3f}s speedup={before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
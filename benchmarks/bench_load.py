@@ -0,0 +1,69 @@
+"""
+This benchmark compares the columnar response loader used by load() against the original
+row by row loader on synthetic Sage-like data.
+
+python3 benchmarks/bench_load.py --rows 1000000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from io import BytesIO
+import pandas as pd
+from generate import generate
+from sage_data_client.query import _load
+
+
+def load_rows(fileobj):
+    """
+    load_rows is the original row by row loader kept for comparison.
+    """
+
+    def load_row(r):
+        input = json.loads(r)
+        output = {}
+        output["timestamp"] = pd.to_datetime(input["timestamp"], unit="ns", utc=True)
+        output["name"] = input["name"]
+        output["value"] = input["value"]
+        for k, v in input["meta"].items():
+            output[f"meta.{k}"] = v
+        return output
+
+    return pd.DataFrame(map(load_row, fileobj))
+
+
+def measure(func, data):
+    start = time.perf_counter()
+    df = func(BytesIO(data))
+    elapsed = time.perf_counter() - start
+
+    # memory is measured in a separate run as tracing slows down the loader considerably
+    tracemalloc.start()
+    func(BytesIO(data))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000, help="number of records to generate")
+    args = parser.parse_args()
+
+    data = generate(args.rows)
+    print(f"rows: {args.rows} size: {len(data) / 1e6:.1f}MB")
+
+    df_rows, rows_time, rows_peak = measure(load_rows, data)
+    df_cols, cols_time, cols_peak = measure(_load, data)
+
+    # NOTE In Pandas Nones and NaNs do not equal themselves, so will fill them to compare.
+    assert list(df_rows.columns) == list(df_cols.columns)
+    assert (df_rows.fillna("") == df_cols.fillna("")).all().all()
+
+    print(f"row loader:      {rows_time:7.3f}s peak {rows_peak / 1e6:8.1f}MB")
+    print(f"columnar loader: {cols_time:7.3f}s peak {cols_peak / 1e6:8.1f}MB")
+    print(f"speedup:         {rows_time / cols_time:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
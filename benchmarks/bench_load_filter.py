@@ -0,0 +1,57 @@
+"""
+This benchmark compares loading a file and filtering the data frame with pandas against pushing
+the filter and column projection down into load.
+
+python3 benchmarks/bench_load_filter.py --rows 1000000
+"""
+import argparse
+from io import BytesIO
+import time
+from generate import generate
+import sage_data_client
+
+
+def timeit(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000, help="number of records to generate")
+    args = parser.parse_args()
+
+    data = generate(args.rows)
+
+    cases = [
+        ("one node", {"vsn": "W00A"}),
+        ("one name, ~10% of nodes", {"name": "env.temperature", "vsn": "W00*"}),
+        ("one name", {"name": "env.pressure"}),
+    ]
+
+    for label, filter in cases:
+
+        def load_then_filter():
+            df = sage_data_client.load(BytesIO(data))
+            mask = df.name.notna()
+            for k, v in filter.items():
+                col = "name" if k == "name" else f"meta.{k}"
+                mask &= df[col].str.fullmatch(v.replace(".", r"\.").replace("*", ".*"))
+            return df[mask][["timestamp", "value", "meta.vsn"]]
+
+        def load_pushdown():
+            return sage_data_client.load(BytesIO(data), filter=filter, columns=["timestamp", "value", "meta.vsn"])
+
+        expect, baseline = timeit(load_then_filter)
+        result, pushdown = timeit(load_pushdown)
+        assert len(expect) == len(result)
+
+        print(f"{label:<24} matched={len(result) / args.rows:6.1%} load+filter={baseline:.3f}s pushdown={pushdown:.3f}s speedup={baseline / pushdown:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
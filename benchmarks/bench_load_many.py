@@ -0,0 +1,44 @@
+"""
+This benchmark measures how load_many scales with the number of worker processes when loading
+many compressed exports, with and without a filter.
+
+python3 benchmarks/bench_load_many.py --files 64 --rows 100000
+"""
+import argparse
+from gzip import compress
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import time
+from generate import generate
+import sage_data_client
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=16, help="number of files to generate")
+    parser.add_argument("--rows", type=int, default=50000, help="number of records per file")
+    args = parser.parse_args()
+
+    workers = [1]
+    while workers[-1] * 2 <= (os.cpu_count() or 1):
+        workers.append(workers[-1] * 2)
+
+    with TemporaryDirectory() as dir:
+        for i in range(args.files):
+            Path(dir, f"{i:04d}.ndjson.gz").write_bytes(compress(generate(args.rows, seed=i), 1))
+
+        pattern = str(Path(dir, "*.ndjson.gz"))
+
+        for filter in [None, {"name": "env.temperature", "vsn": "W00*"}]:
+            base = None
+            for n in workers:
+                start = time.perf_counter()
+                df = sage_data_client.load_many(pattern, workers=n, filter=filter)
+                elapsed = time.perf_counter() - start
+                base = base or elapsed
+                print(f"filter={filter} workers={n:<3} rows={len(df):<9} {elapsed:.3f}s speedup={base / elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+This benchmark measures the accuracy of estimate and compares the time and peak memory of
+querying a large result in a single request against paginated queries into a data frame,
+chunks and a file, using a local data API server.
+
+python3 benchmarks/bench_pagination.py --rows 1000000 --max-rows 100000
+"""
+import argparse
+import os
+from tempfile import TemporaryDirectory
+import time
+import tracemalloc
+from generate import START, generate
+import sage_data_client
+from sage_data_client.server import Server
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func()
+        return time.perf_counter() - start, tracemalloc.get_traced_memory()[1], result
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000, help="number of records to generate")
+    parser.add_argument("--max-rows", type=int, default=20000, help="target number of records per page")
+    args = parser.parse_args()
+
+    # generated records are about a second apart
+    kwargs = dict(start=START, end=START + (args.rows + 1) * 1_000_000_007, filter={"name": "env.*"})
+
+    with Server(generate(args.rows).splitlines()) as server, TemporaryDirectory() as dir:
+        kwargs["endpoint"] = server.endpoint
+        path = os.path.join(dir, "data.ndjson.gz")
+
+        elapsed, _, est = measure(lambda: sage_data_client.estimate(**kwargs))
+        rows = len(sage_data_client.query(**kwargs))
+        print(f"estimate: {est.rows} records, actual {rows} ({est.rows / rows - 1:+.1%}) in {elapsed:.3f}s")
+
+        for label, func in [
+            ("single request", lambda: len(sage_data_client.query(**kwargs))),
+            ("query max_rows", lambda: len(sage_data_client.query(max_rows=args.max_rows, **kwargs))),
+            ("query_iter max_rows", lambda: sum(len(df) for df in sage_data_client.query_iter(max_rows=args.max_rows, chunksize=10000, **kwargs))),
+            ("query_to_file", lambda: sage_data_client.query_to_file(path, max_rows=args.max_rows, **kwargs)),
+        ]:
+            requests = len(server.requests)
+            elapsed, peak, n = measure(func)
+            print(f"{label}: {elapsed:.3f}s peak={peak / 1e6:.1f}MB rows={n} requests={len(server.requests) - requests}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+This benchmark measures the overhead of profiling hooks on load and prints the per stage
+breakdown recorded for a gzip compressed response.
+
+python3 benchmarks/bench_profiling.py --rows 1000000
+"""
+import argparse
+import gzip
+from io import BytesIO
+import time
+from generate import generate
+import sage_data_client
+from sage_data_client import compression
+from sage_data_client.query import _load
+
+
+def timeit(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000, help="number of records to generate")
+    args = parser.parse_args()
+
+    data = gzip.compress(generate(args.rows))
+
+    def load():
+        with sage_data_client.profiling.record("load") as stats:
+            with compression.decode(BytesIO(data), "gzip", threaded=True, stats=stats) as f:
+                return _load(f, stats=stats)
+
+    disabled = timeit(load)
+
+    with sage_data_client.profile() as profiler:
+        enabled = timeit(load)
+
+    print(f"disabled={disabled:.3f}s enabled={enabled:.3f}s overhead={enabled / disabled - 1:.1%}")
+    print(profiler.summary().drop(columns=["started", "error"]).tail(1).T)
+
+
+if __name__ == "__main__":
+    main()
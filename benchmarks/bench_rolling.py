@@ -0,0 +1,71 @@
+"""
+This benchmark compares the time per tick of maintaining per node windowed statistics using
+RollingAggregator against recomputing them from the full window each tick, like the batch
+trigger examples do.
+
+python3 benchmarks/bench_rolling.py --nodes 100 --rate 10 --window 10m
+"""
+import argparse
+from collections import deque
+import time
+import numpy as np
+import pandas as pd
+import sage_data_client
+
+
+def ticks(nodes, rate, count, seed=0):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2023-09-28T00:00:00Z")
+    vsns = np.array([f"W{i:03X}" for i in range(nodes)])
+    rows = nodes * rate
+    for i in range(count):
+        timestamps = start + pd.to_timedelta(i * 60 + np.sort(rng.uniform(0, 60, rows)), unit="s")
+        yield pd.DataFrame(
+            {
+                "timestamp": timestamps,
+                "name": "env.pressure",
+                "value": rng.normal(1000.0, 8.0, rows),
+                "meta.vsn": vsns[rng.integers(0, nodes, rows)],
+            }
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=100, help="number of nodes")
+    parser.add_argument("--rate", type=int, default=10, help="records per node per minute")
+    parser.add_argument("--window", default="10m", help="window length")
+    parser.add_argument("--ticks", type=int, default=60, help="number of one minute ticks")
+    args = parser.parse_args()
+
+    frames = list(ticks(args.nodes, args.rate, args.ticks))
+    window = pd.Timedelta(args.window)
+
+    # recompute the statistics from the records in the window each tick
+    recent = deque()
+    start = time.perf_counter()
+    for df in frames:
+        recent.append(df)
+        data = pd.concat(recent, ignore_index=True)
+        data = data[data.timestamp > data.timestamp.max() - window]
+        data.groupby("meta.vsn").value.agg(["mean", "std", "min", "max"])
+        while recent and recent[0].timestamp.iloc[-1] <= data.timestamp.min() - window:
+            recent.popleft()
+    recompute_time = (time.perf_counter() - start) / len(frames)
+
+    agg = sage_data_client.RollingAggregator(window=args.window, by=["vsn"])
+    start = time.perf_counter()
+    for df in frames:
+        agg.update(df)
+    rolling_time = (time.perf_counter() - start) / len(frames)
+
+    rows = args.nodes * args.rate
+    window_rows = int(rows * window / pd.Timedelta("1m"))
+    print(f"new rows per tick: {rows} rows in window: {window_rows}")
+    print(f"recompute: {recompute_time * 1e3:.2f}ms/tick")
+    print(f"rolling:   {rolling_time * 1e3:.2f}ms/tick")
+    print(f"speedup:   {recompute_time / rolling_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+This benchmark compares loading results with format="series" against data frames, measuring
+load time, memory use and the time of a per series aggregation.
+
+python3 benchmarks/bench_series.py --rows 1000000
+"""
+import argparse
+from io import BytesIO
+import time
+from generate import generate
+import sage_data_client
+
+
+def timeit(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000, help="number of records to generate")
+    args = parser.parse_args()
+
+    data = generate(args.rows)
+
+    for label, kwargs in [
+        ("pandas", {}),
+        ("categorical", {"categorical": True}),
+        ("series", {"format": "series"}),
+    ]:
+        elapsed, result = timeit(lambda: sage_data_client.load(BytesIO(data), **kwargs))
+
+        if label == "series":
+            nbytes = result.nbytes
+            agg, _ = timeit(lambda: result.agg(["size", "mean"]))
+        else:
+            nbytes = int(result.memory_usage(deep=True).sum())
+            keys = [c for c in result.columns if c == "name" or c.startswith("meta.")]
+            agg, _ = timeit(lambda: result.groupby(keys, dropna=False, observed=True).value.agg(["size", "mean"]))
+
+        print(f"{label}: load={elapsed:.3f}s memory={nbytes / len(result):.1f} bytes/row agg per series={agg:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
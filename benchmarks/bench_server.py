@@ -0,0 +1,59 @@
+"""
+This benchmark load tests the client's concurrency features against a local data API server
+which adds a fixed latency to each request, like a remote server would. It compares sending
+per node queries one at a time against query_many, AsyncClient and a single sharded query.
+
+python3 benchmarks/bench_server.py --rows 1000000 --latency 0.2
+"""
+import argparse
+import asyncio
+import time
+from generate import generate
+import sage_data_client
+from sage_data_client.server import Server
+
+START = "2023-09-28T00:00:00Z"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000, help="number of records to generate")
+    parser.add_argument("--nodes", type=int, default=16, help="number of nodes, each queried separately")
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds the server waits before each response")
+    args = parser.parse_args()
+
+    vsns = [f"W{i:03X}" for i in range(args.nodes)]
+    filters = {vsn: {"vsn": vsn} for vsn in vsns}
+
+    with Server(generate(args.rows, nodes=args.nodes).splitlines(), latency=args.latency) as server:
+        client = sage_data_client.Client(server.endpoint, pool_size=8)
+
+        def sequential():
+            return [client.query(start=START, filter=f) for f in filters.values()]
+
+        def many():
+            return list(sage_data_client.query_many(filters, start=START, client=client, coalesce=False).values())
+
+        def asynchronous():
+            async def run():
+                async with sage_data_client.AsyncClient(client=client) as aclient:
+                    return await aclient.aquery_many([{"start": START, "filter": f} for f in filters.values()])
+
+            return asyncio.get_event_loop().run_until_complete(run())
+
+        def sharded():
+            return [client.query(start=START, end="2023-10-01T00:00:00Z", shards=8)]
+
+        for label, func in [("sequential", sequential), ("query_many", many), ("AsyncClient", asynchronous), ("shards=8", sharded)]:
+            start = time.perf_counter()
+            frames = func()
+            elapsed = time.perf_counter() - start
+            rows = sum(map(len, frames))
+            print(f"{label:<12} requests={len(server.requests):4d} rows={rows} {elapsed:.3f}s {rows / elapsed:10.0f} rows/s")
+            server.requests.clear()
+
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+This benchmark compares building query bodies using pandas' time parsing, as before, with the
+cached time parser, and measures the time to import the package.
+
+python3 benchmarks/bench_timeparse.py --rows 100000
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+import pandas as pd
+import sage_data_client
+from sage_data_client.prepared import _build_query
+
+
+def timeit(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def resolve_time_pandas(t):
+    try:
+        return pd.to_datetime(t)
+    except (TypeError, ValueError):
+        pass
+    return pd.to_datetime("now", utc=True) + pd.to_timedelta(t)
+
+
+def build_query_pandas(start, end=None, filter=None):
+    q = {"start": resolve_time_pandas(start).strftime("%Y-%m-%dT%H:%M:%S.%fZ")}
+    if end is not None:
+        q["end"] = resolve_time_pandas(end).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    if filter is not None:
+        q["filter"] = filter
+    return q
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000, help="number of queries to build")
+    args = parser.parse_args()
+
+    filter = {"name": "env.temperature", "vsn": "W023"}
+    inputs = {
+        "relative": ("-1h", None),
+        "absolute": ("2023-09-28T00:00:00Z", "2023-09-29T00:00:00Z"),
+    }
+
+    for kind, (start, end) in inputs.items():
+
+        def pandas():
+            for _ in range(args.rows):
+                json.dumps(build_query_pandas(start, end, filter)).encode()
+
+        def cached():
+            for _ in range(args.rows):
+                json.dumps(_build_query(start, end, filter=filter)).encode()
+
+        before = timeit(pandas)
+        after = timeit(cached)
+        print(f"{kind}: pandas={before / args.rows * 1e6:.1f}us cached={after / args.rows * 1e6:.1f}us speedup={before / after:.1f}x")
+
+    # a prepared Query is built and serialized once however many times it's sent
+    q = sage_data_client.Query(start="2023-09-28T00:00:00Z", end="2023-09-29T00:00:00Z", filter=filter)
+    reuse = timeit(lambda: [q.data for _ in range(args.rows)])
+    print(f"prepared: {reuse / args.rows * 1e6:.3f}us")
+
+    code = "import time; start = time.perf_counter(); import sage_data_client; print(time.perf_counter() - start)"
+    imports = [float(subprocess.check_output([sys.executable, "-c", code])) for _ in range(5)]
+    code = "import time; start = time.perf_counter(); import sage_data_client; sage_data_client.query; print(time.perf_counter() - start)"
+    eager = [float(subprocess.check_output([sys.executable, "-c", code])) for _ in range(5)]
+    print(f"import: lazy={min(imports):.3f}s with pandas={min(eager):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
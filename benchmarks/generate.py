@@ -0,0 +1,200 @@
+"""
+This script generates synthetic NDJSON data API responses for benchmarks.
+
+Records mimic those published by nodes: each node runs an environmental sensor plugin, a rain
+gauge plugin and system metrics, each with their own meta fields, and optionally a camera plugin
+publishing upload records with URL values. Timestamps are increasing, like query responses.
+
+Files ending in .gz or .zst are compressed while they're written, so large files never need to
+fit in memory. zst requires the zstandard package.
+
+python3 benchmarks/generate.py --rows 10000000 --uploads 0.01 data.ndjson.gz
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import Iterator, List
+
+
+START = 1695859200_000_000_000  # 2023-09-28T00:00:00Z
+
+# plugins run on every node, along with their relative share of records, names and extra meta fields
+PLUGINS = [
+    (
+        0.6,
+        "waggle/plugin-iio:0.6.0",
+        "wes-iio-bme",
+        ["env.temperature", "env.pressure", "env.relative_humidity"],
+    ),
+    (
+        0.15,
+        "waggle/plugin-raingauge:0.4.1",
+        "wes-raingauge",
+        ["env.raingauge.event_acc", "env.raingauge.rint", "env.raingauge.total_acc"],
+    ),
+    (
+        0.25,
+        "waggle/node-exporter:1.2.0",
+        "sys-metrics",
+        ["sys.cpu_seconds", "sys.mem.avail", "sys.uptime"],
+    ),
+]
+
+
+def generate(rows: int, seed: int = 0, nodes: int = 100, uploads: float = 0.0) -> bytes:
+    """
+    generate returns `rows` synthetic records as NDJSON.
+
+    Parameters
+    ----------
+    rows : number of records
+
+    seed : random seed, so the same arguments always generate the same data
+
+    nodes : number of distinct nodes
+
+    uploads : fraction of records which are uploads with URL values
+    """
+    return b"".join(iter_chunks(rows, seed=seed, nodes=nodes, uploads=uploads))
+
+
+def write(path: str, rows: int, seed: int = 0, nodes: int = 100, uploads: float = 0.0):
+    """
+    write writes `rows` synthetic records to `path`, compressing them when the path ends in .gz or .zst.
+    """
+    if path.endswith(".gz"):
+        f = gzip.open(path, "wb", compresslevel=6)
+    elif path.endswith(".zst"):
+        import zstandard
+
+        f = zstandard.open(path, "wb")
+    else:
+        f = open(path, "wb")
+
+    with f:
+        for chunk in iter_chunks(rows, seed=seed, nodes=nodes, uploads=uploads):
+            f.write(chunk)
+
+
+def iter_chunks(rows: int, seed: int = 0, nodes: int = 100, uploads: float = 0.0, chunksize: int = 100000) -> Iterator[bytes]:
+    """
+    iter_chunks yields the NDJSON of `rows` synthetic records in chunks of at most `chunksize` records.
+    """
+    rng = random.Random(seed)
+    vsns = [f"W{i:03X}" for i in range(nodes)]
+    sources = _sources(vsns, rng)
+    weights = [w * (1 - uploads) for w, *_ in PLUGINS] + [uploads]
+    kinds = list(range(len(weights)))
+    dumps = json.JSONEncoder(separators=(",", ":")).encode
+    timestamps = _Timestamps()
+
+    for offset in range(0, rows, chunksize):
+        n = min(chunksize, rows - offset)
+        lines = []  # type: List[str]
+
+        for i, kind in zip(range(offset, offset + n), rng.choices(kinds, weights, k=n)):
+            ts = START + i * 1_000_000_007
+            vsn = rng.choice(vsns)
+
+            if kind == len(PLUGINS):
+                meta = sources[vsn, "upload"]
+                filename = "sample.jpg"
+                value = (
+                    f"https://storage.sagecontinuum.org/api/v1/data/imagesampler-{meta['camera']}"
+                    f"/sage-imagesampler-0.3.7/{meta['node']}/{ts}-{filename}"
+                )
+                record = {"timestamp": timestamps.format(ts), "name": "upload", "value": value, "meta": dict(meta, filename=filename)}
+            else:
+                _, _, _, names = PLUGINS[kind]
+                name = rng.choice(names)
+                meta = sources[vsn, kind]
+                if name == "sys.cpu_seconds":
+                    meta = dict(meta, cpu=str(rng.randrange(4)), mode=rng.choice(["user", "system", "idle"]))
+                elif kind == 0:
+                    meta = meta[rng.randrange(2)]
+                record = {"timestamp": timestamps.format(ts), "name": name, "value": _value(name, rng), "meta": meta}
+
+            lines.append(dumps(record))
+
+        lines.append("")
+        yield "\n".join(lines).encode()
+
+
+def _sources(vsns, rng):
+    """
+    _sources returns the meta fields of each node and plugin. Most are shared by every record from that plugin.
+    """
+    sources = {}
+
+    for vsn in vsns:
+        node = f"000048b02d{rng.randrange(16 ** 6):06x}"
+        common = {"host": f"{node}.ws-nxcore", "job": "Pluginctl", "node": node, "vsn": vsn, "zone": "core"}
+
+        for kind, (_, plugin, task, _) in enumerate(PLUGINS):
+            meta = dict(common, plugin=plugin, task=task)
+            if kind == 0:
+                # nodes have two environmental sensors
+                sources[vsn, kind] = [dict(meta, sensor=sensor) for sensor in ["bme280", "bme680"]]
+            elif kind == 1:
+                sources[vsn, kind] = dict(meta, sensor="raingauge")
+            else:
+                sources[vsn, kind] = dict(common, host=f"{node}.ws-rpi", job="sys", zone="shield")
+
+        camera = rng.choice(["top", "bottom", "left", "right"])
+        sources[vsn, "upload"] = dict(common, plugin="waggle/plugin-image-sampler:0.3.7", task="imagesampler-" + camera, camera=camera)
+
+    return sources
+
+
+def _value(name, rng):
+    if name == "env.temperature":
+        return round(rng.gauss(18, 8), 2)
+    if name == "env.pressure":
+        return round(rng.gauss(98000, 1500), 1)
+    if name == "env.relative_humidity":
+        return round(rng.uniform(10, 95), 2)
+    if name.startswith("env.raingauge."):
+        # most rain gauge readings are zero
+        return 0.0 if rng.random() < 0.8 else round(rng.expovariate(2), 2)
+    if name == "sys.uptime":
+        return rng.randrange(10 ** 7)
+    return round(rng.uniform(0, 10 ** 6), 3)
+
+
+class _Timestamps:
+    """
+    _Timestamps formats nanosecond timestamps like the data API, reusing the formatted second across records.
+    """
+
+    def __init__(self):
+        self.second = None
+        self.prefix = ""
+
+    def format(self, ts: int) -> str:
+        second, ns = divmod(ts, 1_000_000_000)
+        if second != self.second:
+            self.second = second
+            self.prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        return f"{self.prefix}.{ns:09d}Z"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000, help="number of records to generate")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--nodes", type=int, default=100, help="number of distinct nodes")
+    parser.add_argument("--uploads", type=float, default=0.0, help="fraction of records which are uploads")
+    parser.add_argument("path", help="output path. paths ending in .gz or .zst are compressed.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    write(args.path, args.rows, seed=args.seed, nodes=args.nodes, uploads=args.uploads)
+    print(f"wrote {args.rows} records to {args.path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,9 @@
 """
-This example demonstrates one approach for combining multiple queries by resampling
-results into 30 minute windows and merging those into a new data frame.
+This example demonstrates combining multiple queries into a single data frame, first by
+averaging results over 30 minute windows and then by matching each temperature record with
+the nearest pressure and humidity records from the same node.
 """
 import sage_data_client
-import pandas as pd
-
-
-def join_resampled_queries(start, end, window, filters):
-    """
-    join_resampled_queries joins resampled data for a set of filters together
-    into a single data frame
-    """
-    return pd.DataFrame({
-        name: sage_data_client.query(
-            start=start,
-            end=end,
-            filter=filter,
-        ).resample(window, on="timestamp").value.mean()
-        for name, filter in filters.items()
-    })
 
 
 def main():
@@ -26,8 +11,7 @@ def main():
     end = "2022-01-11T00:00:00Z"
     vsn = "W023"
 
-    # combine lat, lon, temperature, pressure and humidity into data frame
-    df = join_resampled_queries(start, end, "30min", {
+    filters = {
         "lat": {
             "name": "sys.gps.lat",
             "vsn": vsn,
@@ -51,7 +35,10 @@ def main():
             "vsn": vsn,
             "sensor": "bme680"
         },
-    })
+    }
+
+    # combine lat, lon, temperature, pressure and humidity into a data frame of 30 minute means
+    df = sage_data_client.join(filters, start=start, end=end, how="window", tolerance="30m")
 
     # print out data for quick inspection
     print(df)
@@ -59,6 +46,17 @@ def main():
     # save data to csv
     df.to_csv("combined.csv")
 
+    # match each temperature record with the nearest pressure and humidity records within 30 seconds
+    df = sage_data_client.join(
+        {label: filters[label] for label in ["temperature", "pressure", "humidity"]},
+        start=start,
+        end=end,
+        how="asof",
+        tolerance="30s",
+    )
+
+    print(df)
+
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,5 @@
 """
-This example is a skeleton of how to poll the data system every minute for unusual
+This example is a skeleton of how to watch the data system every minute for unusual
 pressure events.
 
 In this case, events are determined windows with a stddev above an example
@@ -10,20 +10,23 @@ Additionally, you will need to provide a specific mechanism to carry out the
 alerts (ex. email, Slack, dedicated alerting / ticketing system, etc).
 """
 import sage_data_client
-import time
 
-while True:
-    # query pressure data in recent 10 minute window
-    df = sage_data_client.query(
-        start="-10m",
-        filter={
-            "name": "env.pressure",
-            "sensor": "bme680",
-        }
-    )
+# maintain per node pressure stats over a sliding 10 minute window. each update only
+# processes the new records instead of re-querying and recomputing the full window.
+agg = sage_data_client.RollingAggregator(window="10m", by=["vsn"])
 
+for df in sage_data_client.watch(
+    start="-10m",
+    filter={
+        "name": "env.pressure",
+        "sensor": "bme680",
+    },
+    interval=60,
+    min_interval=60,
+    max_interval=60,
+):
     # compute stddev for nodes' pressure data in window
-    std = df.groupby("meta.vsn").value.std()
+    std = agg.update(df)["std"]
 
     # find all pressure events exceeding an example threshold
     events = std[std > 8.0]
@@ -31,5 +34,3 @@ while True:
     # "post" vsn to alert system
     for vsn in events.index:
         print(f"post {vsn} to alert system")
-
-    time.sleep(60)
@@ -5,37 +5,48 @@ of urls which can be saved and downloaded as follows:
 python3 print_rain_event_image_urls.py > urls.txt
 wget -r -N -i urls.txt
 """
+import asyncio
 import sage_data_client
 import pandas as pd
 
 vsn = "W039"
 
-# query raingauge data for the last week
-df = sage_data_client.query(
+# compute mean rain in hour windows over the last week
+mean_acc = sage_data_client.aggregate(
     start="2021-12-20",
     end="2021-12-27",
     filter={
         "name": "env.raingauge.acc",
         "vsn": vsn,
-    }
-)
-
-# compute mean rain in hour window
-mean_acc = df.resample("1h", on="timestamp").value.mean()
+    },
+    func="mean",
+    window="1h",
+    by=[],
+)["mean"]
 
 # find rain accumulation events
 rain_events = mean_acc[mean_acc > 0]
 
+
+async def query_uploads(windows):
+    # query uploads for all rain event windows concurrently
+    async with sage_data_client.AsyncClient(max_concurrency=8) as client:
+        return await client.aquery_many(
+            {
+                "start": ts,
+                "end": ts + pd.to_timedelta("1h"),
+                "filter": {
+                    "name": "upload",
+                    "vsn": vsn,
+                    "task": "imagesampler-top",
+                },
+            }
+            for ts in windows
+        )
+
+
 # collect uploads in each rain event window
-uploads = pd.concat(sage_data_client.query(
-        start=ts,
-        end=ts + pd.to_timedelta("1h"),
-        filter={
-            "name": "upload",
-            "vsn": vsn,
-            "task": "imagesampler-top",
-        }
-    ) for ts in rain_events.index)
+uploads = pd.concat(asyncio.get_event_loop().run_until_complete(query_uploads(rain_events.index)))
 
 # print all urls found
 for url in uploads.value.values:
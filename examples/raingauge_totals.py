@@ -4,13 +4,16 @@ number of measurements grouped by VSN and sensor.
 """
 import sage_data_client
 
-# query and load data into pandas data frame
-df = sage_data_client.query(
+# count measurements in hourly windows. when supported, the counting is done by the data api.
+df = sage_data_client.aggregate(
     start="-1h",
     filter={
         "name": "env.raingauge.*",
-    }
+    },
+    func="count",
+    window="1h",
+    by=["vsn", "name"],
 )
 
 # print number of results of each name
-print(df.groupby(["meta.vsn", "name"]).size())
+print(df.sum().astype(int))
@@ -3,13 +3,14 @@ This example demonstrates querying all temperature data and printing basic stats
 """
 import sage_data_client
 
-# query and load data into pandas data frame
+# query and load data into pandas data frame. categorical columns reduce memory use and speed up groupby.
 df = sage_data_client.query(
     start="-1h",
     filter={
         "name": "env.temperature",
-    }
+    },
+    categorical=True,
 )
 
 # print stats of the temperature data grouped by node + sensor.
-print(df.groupby(["meta.vsn", "meta.sensor"]).value.agg(["size", "min", "max", "mean"]))
+print(df.groupby(["meta.vsn", "meta.sensor"], observed=True).value.agg(["size", "min", "max", "mean"]))
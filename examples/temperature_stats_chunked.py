@@ -0,0 +1,33 @@
+"""
+This example demonstrates computing the same stats as temperature_stats.py, but folding over
+chunks of the response so memory use stays bounded for large queries.
+"""
+import sage_data_client
+import pandas as pd
+
+stats = None
+
+# query data in chunks of at most 100000 records
+for df in sage_data_client.query_iter(
+    start="-1h",
+    filter={
+        "name": "env.temperature",
+    },
+    chunksize=100000,
+):
+    # compute partial stats for this chunk
+    chunk = df.groupby(["meta.vsn", "meta.sensor"]).value.agg(["size", "sum", "min", "max"])
+
+    if stats is None:
+        stats = chunk
+        continue
+
+    # combine partial stats with totals so far
+    stats = pd.concat([stats, chunk]).groupby(level=[0, 1]).agg(
+        {"size": "sum", "sum": "sum", "min": "min", "max": "max"}
+    )
+
+stats["mean"] = stats["sum"] / stats["size"]
+
+# print stats of the temperature data grouped by node + sensor.
+print(stats[["size", "min", "max", "mean"]])
@@ -1,6 +1,6 @@
 """
 This is an example of a simple edge-to-cloud batch trigger which uses sage-data-client
-to gather and aggregate internal temperature data every 5 minutes and prints all
+to aggregate internal temperature data over a 5 minute window and prints all
 nodes which exceed a threshold.
 
 Although it's simple, this example could easily be extended in multiple ways. For example:
@@ -19,18 +19,18 @@ def main():
 
     threshold = 55.0
 
-    while True:
-        # get the last 5m of temperature data
-        df = sage_data_client.query(start="-5m", filter=filter)
+    # keep the last 5m of temperature stats by node up to date incrementally
+    agg = sage_data_client.RollingAggregator(window="5m", by=["vsn"])
+    last_check = 0.0
 
-        # get mean temperature by node in batch query
-        mean_temps = df.groupby("meta.vsn").value.mean()
+    for df in sage_data_client.watch(start="-5m", filter=filter):
+        # get mean temperature by node in the last 5m
+        mean_temps = agg.update(df)["mean"]
 
-        # print values which exceed threshold
-        print(mean_temps[mean_temps > threshold])
-
-        # wait 5m
-        time.sleep(300)
+        # print values which exceed threshold every 5m
+        if time.monotonic() - last_check >= 300:
+            print(mean_temps[mean_temps > threshold])
+            last_check = time.monotonic()
 
 
 if __name__ == "__main__":
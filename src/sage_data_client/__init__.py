@@ -7,4 +7,88 @@ sage_data_client goals are to make writing queries and working with the results
 * Providing a simple query function which talks to the data API.
 * Providing the results in an easy to use [Pandas](https://pandas.pydata.org) data frame.
 """
-from .query import query, load
+from importlib import import_module
+import sys
+from types import ModuleType
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import TYPE_CHECKING
+
+# public names are imported from their modules when they're first used, so importing the
+# package doesn't import pandas until a data frame is actually needed.
+_LAZY = {
+    "query": ".query",
+    "query_iter": ".query",
+    "query_many": ".query",
+    "load": ".query",
+    "load_iter": ".query",
+    "load_many": ".query",
+    "Query": ".prepared",
+    "SeriesTable": ".series",
+    "save": ".arrow",
+    "aggregate": ".aggregation",
+    "join": ".joins",
+    "estimate": ".pagination",
+    "paginate": ".pagination",
+    "query_to_file": ".pagination",
+    "log_progress": ".pagination",
+    "download": ".bulk",
+    "QueryCache": ".cache",
+    "RangeCache": ".cache",
+    "RollingAggregator": ".rolling",
+    "watch": ".stream",
+    "awatch": ".stream",
+    "Client": ".client",
+    "AsyncClient": ".client",
+    "Profiler": ".profiling",
+    "QueryStats": ".profiling",
+    "add_hook": ".profiling",
+    "remove_hook": ".profiling",
+    "log_hook": ".profiling",
+    "profile": ".profiling",
+}
+
+_SUBMODULES = {"aggregation", "arrow", "bulk", "cache", "client", "compression", "filters", "joins", "pagination", "prepared", "profiling", "rolling", "series", "stream", "timeparse"}
+
+__all__ = list(_LAZY)
+
+if TYPE_CHECKING:
+    from .query import query, query_iter, query_many, load, load_iter, load_many
+    from .prepared import Query
+    from .series import SeriesTable
+    from .arrow import save
+    from .aggregation import aggregate
+    from .joins import join
+    from .pagination import estimate, paginate, query_to_file, log_progress
+    from .bulk import download
+    from .cache import QueryCache, RangeCache
+    from .rolling import RollingAggregator
+    from .stream import watch, awatch
+    from .client import Client, AsyncClient
+    from .profiling import Profiler, QueryStats, add_hook, remove_hook, log_hook, profile
+
+
+class _LazyModule(ModuleType):
+    def __getattr__(self, name):
+        if name in _LAZY:
+            value = getattr(import_module(_LAZY[name], self.__name__), name)
+        elif name in _SUBMODULES:
+            # submodules were previously always imported, so code may use them without importing them
+            value = import_module("." + name, self.__name__)
+        else:
+            raise AttributeError(f"module {self.__name__!r} has no attribute {name!r}")
+        setattr(self, name, value)
+        return value
+
+    def __setattr__(self, name, value):
+        # importing a submodule binds it on the package, which would hide the public function
+        # of the same name, like query, so the function is bound instead
+        if isinstance(value, ModuleType) and _LAZY.get(name) == "." + name:
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(_LAZY))
+
+
+sys.modules[__name__].__class__ = _LazyModule
@@ -0,0 +1,287 @@
+from concurrent.futures import ThreadPoolExecutor
+import re
+from urllib.error import HTTPError
+import numpy as np
+import pandas as pd
+from .client import Client, default_client
+from .filters import filter_key_column
+from .query import _utc, query, query_iter, resolve_time
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import Dict, Optional, Sequence
+
+
+# partial aggregates computed for each function. these can be combined across chunks and series.
+PARTIALS = {
+    "mean": ("sum", "count"),
+    "sum": ("sum",),
+    "count": ("count",),
+    "min": ("min",),
+    "max": ("max",),
+}
+
+# how partial aggregates of the same window and group are combined
+COMBINE = {
+    "sum": "sum",
+    "count": "sum",
+    "min": "min",
+    "max": "max",
+}
+
+# status codes returned by endpoints which don't support server side aggregation
+UNSUPPORTED_STATUS_CODES = (400, 404, 422, 501)
+
+
+def aggregate(
+    filter: Optional[Dict[str, str]],
+    start,
+    end=None,
+    func: str = "mean",
+    window: str = "1h",
+    by: Sequence[str] = ("name", "vsn"),
+    endpoint: str = "https://data.sagecontinuum.org/api/v1/query",
+    bucket: Optional[str] = None,
+    server: Optional[bool] = None,
+    chunksize: int = 100000,
+    client: Optional[Client] = None,
+) -> pd.DataFrame:
+    """
+    aggregate computes `func` over fixed `window`s of time for each group of `by` fields and returns the results as a wide data frame.
+
+    When the endpoint supports it, the aggregation is done by the data API using
+    `experimental_func` and `experimental_window`, so only one record per series and window is
+    transferred. Otherwise, the raw records are streamed in chunks of `chunksize` records and
+    aggregated locally, so memory use is bounded by the number of windows rather than the number
+    of records.
+
+    Parameters
+    ----------
+    filter : dictionary of query filters, required
+
+    start : query start time, required
+        Timestamps can be a relative like "-1h" or absolute like "2021-05-01T10:30:00Z".
+
+    end : query end time, default: None (now)
+
+    func : aggregation function, one of "mean", "sum", "count", "min" or "max", default: "mean"
+        Only numeric values are aggregated. Other values are ignored.
+
+    window : length of each window, like "30s", "5m", "1h" or "1d", default: "1h"
+        Windows are aligned to the Unix epoch in UTC.
+
+    by : filter keys to group results by, default: ("name", "vsn")
+        Series which share the same values for these keys are aggregated together.
+
+    endpoint : url of query api, default: "https://data.sagecontinuum.org/api/v1/query"
+
+    bucket: name of bucket to query
+
+    server : whether to aggregate on the server, default: None (use the server if it supports aggregation)
+        When True, errors from the server are raised instead of falling back to local aggregation.
+        When False, records are always aggregated locally.
+
+    chunksize : number of records in each chunk aggregated locally, default: 100000
+
+    client : Client used to send requests, default: None (shared client for `endpoint`)
+
+    Returns
+    -------
+    result : pandas.DataFrame
+        The data frame is indexed by the start time of each window and has a column for each
+        group of `by` values. Multiple `by` keys produce hierarchical columns. Windows without any
+        records for a group are NaN.
+
+    Examples
+    --------
+
+    Computing hourly mean temperature for two nodes
+
+    ```python
+    import sage_data_client
+
+    df = sage_data_client.aggregate(
+        filter={"name": "env.temperature", "vsn": "W023|W039", "sensor": "bme680"},
+        start="-1d",
+        func="mean",
+        window="1h",
+        by=["vsn"],
+    )
+
+    print(df)
+    ```
+    """
+    if func not in PARTIALS:
+        raise ValueError(f"unsupported func {func!r}. must be one of {tuple(PARTIALS)}")
+
+    window_ns = _window_ns(window)
+    by = list(by)
+
+    if client is None:
+        client = default_client(endpoint)
+
+    # resolve the time range once, so both paths and the window labels agree. requests are sent
+    # with microsecond precision, so end is truncated to match the stop time of the last window.
+    start = _utc(resolve_time(start)).floor("us")
+    end = _utc(resolve_time(end if end is not None else "now")).floor("us")
+
+    kwargs = dict(filter=filter, start=start, end=end, bucket=bucket, client=client)
+
+    partials = None
+
+    if server is not False:
+        try:
+            partials = _server_partials(func, window, window_ns, by, **kwargs)
+        except HTTPError as exc:
+            if server or exc.code not in UNSUPPORTED_STATUS_CODES:
+                raise
+
+    if partials is None:
+        if server:
+            raise ValueError("endpoint did not return aggregated results")
+        partials = _combine_chunks(
+            _chunk_partials(df, func, window_ns, by)
+            for df in query_iter(chunksize=chunksize, **kwargs)
+        )
+
+    return _wide(partials, func, by)
+
+
+def _server_partials(func, window, window_ns, by, **kwargs):
+    """
+    _server_partials requests each of func's partial aggregates from the server and returns them combined by window and group.
+
+    None is returned if the server ignored the aggregation and returned raw records.
+    """
+    funcs = PARTIALS[func]
+
+    def run(f):
+        return query(experimental_func=f, experimental_window=window, **kwargs)
+
+    if len(funcs) == 1:
+        frames = [run(funcs[0])]
+    else:
+        with ThreadPoolExecutor(len(funcs)) as executor:
+            frames = list(executor.map(run, funcs))
+
+    results = []
+
+    for f, df in zip(funcs, frames):
+        if not _is_aggregated(df, window_ns, kwargs["end"]):
+            return None
+        df = df.assign(timestamp=_stop_to_start(df.timestamp, window_ns))
+        df = df.assign(value=pd.to_numeric(df.value, errors="coerce"))
+        keys = [df.timestamp] + [_by_series(df, k) for k in by]
+        grouped = df.groupby(keys, dropna=False, observed=True, sort=False).value
+        results.append(grouped.agg(COMBINE[f]).rename(f))
+
+    combined = _combine_chunks([pd.concat(results, axis=1)])
+    return combined if combined is not None else pd.DataFrame()
+
+
+def _is_aggregated(df, window_ns, end) -> bool:
+    # the data api labels windows by their stop time, which is either a window boundary or the
+    # end of the query. servers which ignore the aggregation return raw records instead.
+    if len(df) == 0:
+        return True
+    ts = _ns(df.timestamp)
+    return bool(np.all((ts % window_ns == 0) | (ts == end.value)))
+
+
+def _stop_to_start(timestamps, window_ns) -> pd.Series:
+    ts = _ns(timestamps)
+    start = -(-ts // window_ns) * window_ns - window_ns
+    return pd.Series(pd.to_datetime(start, unit="ns", utc=True), index=timestamps.index)
+
+
+def _chunk_partials(df, func, window_ns, by) -> pd.DataFrame:
+    """
+    _chunk_partials computes func's partial aggregates of a chunk of raw records by window and group.
+    """
+    values = pd.to_numeric(df.value, errors="coerce")
+    mask = values.notna().to_numpy()
+    df = df[mask]
+
+    ts = _ns(df.timestamp)
+    labels = pd.to_datetime(ts // window_ns * window_ns, unit="ns", utc=True)
+
+    keys = [pd.Series(labels, index=df.index, name="timestamp")]
+    keys += [_by_series(df, k) for k in by]
+
+    grouped = values[mask].groupby(keys, dropna=False, observed=True, sort=False)
+    return grouped.agg(list(PARTIALS[func]))
+
+
+def _combine_chunks(chunks, batch=16) -> Optional[pd.DataFrame]:
+    """
+    _combine_chunks combines partial aggregates of the same window and group from many chunks.
+
+    Chunks are combined in batches so memory use stays proportional to the number of windows.
+    """
+    combined = None
+    pending = []
+
+    def flush():
+        frames = ([combined] if combined is not None else []) + pending
+        df = pd.concat(frames)
+        levels = list(range(df.index.nlevels))
+        return df.groupby(level=levels, dropna=False, sort=False).agg(
+            {c: COMBINE[c] for c in df.columns}
+        )
+
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        pending.append(chunk)
+        if len(pending) >= batch:
+            combined = flush()
+            pending = []
+
+    if pending:
+        combined = flush()
+
+    return combined
+
+
+def _wide(partials, func, by) -> pd.DataFrame:
+    if partials is None or len(partials) == 0:
+        if len(by) > 1:
+            columns = pd.MultiIndex.from_tuples([], names=by)
+        else:
+            columns = pd.Index([func] if not by else [], name=by[0] if by else None)
+        index = pd.DatetimeIndex([], tz="UTC", name="timestamp")
+        return pd.DataFrame(index=index, columns=columns, dtype=float)
+
+    if func == "mean":
+        result = partials["sum"] / partials["count"]
+    else:
+        result = partials[func].astype(float)
+
+    if not by:
+        return result.sort_index().to_frame(func)
+
+    result = result.unstack(list(range(1, len(by) + 1)))
+    result = result.sort_index().sort_index(axis=1)
+    result.index.name = "timestamp"
+    return result
+
+
+def _by_series(df, key) -> pd.Series:
+    col = filter_key_column(key)
+    if col in df.columns:
+        return df[col].rename(key)
+    return pd.Series(np.nan, index=df.index, dtype=object, name=key)
+
+
+def _ns(timestamps) -> np.ndarray:
+    return pd.DatetimeIndex(timestamps).as_unit("ns").asi8
+
+
+def _window_ns(window) -> int:
+    # the data api uses "d" for days, which pandas spells "D"
+    try:
+        value = pd.Timedelta(re.sub(r"(?<=\d)d", "D", window)).value
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid window {window!r}. must be a duration like \"30s\", \"5m\" or \"1h\"")
+    if value <= 0:
+        raise ValueError("window must be positive")
+    return value
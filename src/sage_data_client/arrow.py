@@ -0,0 +1,274 @@
+"""
+Arrow, Parquet and Feather support. These require the optional pyarrow package, which can be
+installed using:
+
+pip3 install sage-data-client[arrow]
+"""
+from pathlib import Path
+import pandas as pd
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.json as pajson
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+ARROW_SUFFIXES = (".parquet", ".feather", ".arrow")
+
+
+def save(data, path):
+    """
+    save writes a data frame or Arrow table of query results to a Parquet or Feather file.
+
+    The file format is chosen by the suffix of `path`:
+
+    `.parquet`: Parquet file. Best for long term storage and sharing.
+
+    `.feather` or `.arrow`: uncompressed Arrow IPC file. These can be memory mapped by `load`
+    without decoding, so they are the fastest to reload.
+
+    The `name` and meta columns are dictionary encoded, so repeated strings are only stored once.
+    Value columns with mixed types are stored as strings.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame or pyarrow.Table
+
+    path : path like
+
+    Examples
+    --------
+
+    ```python
+    import sage_data_client
+
+    df = sage_data_client.query(start="-1d", filter={"name": "env.temperature"})
+
+    sage_data_client.save(df, "temperature.arrow")
+
+    # reloading memory maps the file, so this is very fast
+    df = sage_data_client.load("temperature.arrow")
+    ```
+    """
+    _require_pyarrow()
+
+    suffix = Path(path).suffix
+
+    if suffix not in ARROW_SUFFIXES:
+        raise ValueError(f"unsupported file suffix {suffix!r}. must be one of {ARROW_SUFFIXES}")
+
+    if isinstance(data, pd.DataFrame):
+        table = frame_to_table(data)
+    else:
+        table = _dictionary_encode(data)
+
+    if suffix == ".parquet":
+        pq.write_table(table, str(path))
+    else:
+        feather.write_feather(table, str(path), compression="uncompressed")
+
+
+class TableWriter:
+    """
+    TableWriter writes data frames of query results to a Parquet or Feather file one at a time, so
+    files larger than memory can be written. Every data frame is converted to the same schema.
+
+    The file format is chosen by the suffix of `path`, like `save`.
+
+    Parameters
+    ----------
+    path : path like
+
+    columns : names of the columns of the file, like ["timestamp", "name", "value", "meta.vsn"]
+        Columns missing from a data frame are null.
+
+    numeric : whether values are stored as float64 rather than strings, default: True
+
+    The `name` and meta columns are dictionary encoded in Parquet files. Feather files can't
+    change dictionaries between chunks, so these are stored as strings.
+    """
+
+    def __init__(self, path, columns: Sequence[str], numeric: bool = True):
+        _require_pyarrow()
+
+        suffix = Path(path).suffix
+
+        if suffix not in ARROW_SUFFIXES:
+            raise ValueError(f"unsupported file suffix {suffix!r}. must be one of {ARROW_SUFFIXES}")
+
+        self.columns = list(columns)
+        self.numeric = numeric
+        self.dictionary = suffix == ".parquet"
+        self.schema = pa.schema([(c, _column_type(c, numeric, self.dictionary)) for c in self.columns])
+
+        if self.dictionary:
+            self.writer = pq.ParquetWriter(str(path), self.schema)
+        else:
+            self.writer = pa.ipc.new_file(str(path), self.schema, options=pa.ipc.IpcWriteOptions(compression=None))
+
+    def write(self, df: pd.DataFrame):
+        """
+        write appends the records of data frame `df` to the file.
+        """
+        arrays = []
+
+        for c, field in zip(self.columns, self.schema):
+            if c not in df.columns:
+                arrays.append(pa.nulls(len(df), field.type))
+            elif c == "timestamp":
+                arrays.append(pa.array(pd.DatetimeIndex(df[c]), type=field.type))
+            elif c == "value":
+                arrays.append(_values_array(df[c], self.numeric))
+            else:
+                col = df[c].astype(object)
+                array = pa.array(col.where(col.notna(), None), type=pa.string())
+                arrays.append(array.dictionary_encode() if self.dictionary else array)
+
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def is_arrow_path(path_or_buf) -> bool:
+    return isinstance(path_or_buf, (str, Path)) and Path(path_or_buf).suffix in ARROW_SUFFIXES
+
+
+def read_table(path):
+    """
+    read_table memory maps a Parquet or Feather file written by `save` into an Arrow table.
+    """
+    _require_pyarrow()
+    if Path(path).suffix == ".parquet":
+        return pq.read_table(str(path), memory_map=True)
+    return feather.read_table(str(path), memory_map=True)
+
+
+def read_ndjson(data: bytes):
+    """
+    read_ndjson parses the bytes of a data API response using the pyarrow JSON reader and returns an Arrow table with the same columns as `load`.
+
+    None is returned if the response can't be represented by the reader, for example when it's
+    empty or its values have mixed types.
+    """
+    _require_pyarrow()
+
+    if len(data.strip()) == 0:
+        return None
+
+    try:
+        table = pajson.read_json(pa.BufferReader(data)).flatten()
+        # columns follow the key order of the first record, so they're put in the order of `load`
+        meta = [c for c in table.column_names if c.startswith("meta.")]
+        table = table.select(["timestamp", "name", "value"] + meta)
+        timestamps = table.column("timestamp").cast(pa.timestamp("ns", "UTC"))
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, KeyError):
+        return None
+
+    return table.set_column(table.schema.get_field_index("timestamp"), "timestamp", timestamps)
+
+
+def table_from_columns(timestamps, names, values, meta):
+    """
+    table_from_columns builds an Arrow table from column lists accumulated by the response loader.
+    """
+    _require_pyarrow()
+
+    arrays = {
+        "timestamp": pa.array(timestamps),
+        "name": pa.array(names, type=pa.string()).dictionary_encode(),
+        "value": _value_array(values),
+    }
+    for k, col in meta.items():
+        arrays[f"meta.{k}"] = pa.array(col, from_pandas=True).dictionary_encode()
+    return pa.table(arrays)
+
+
+def frame_to_table(df, strict: bool = False):
+    """
+    frame_to_table converts a data frame of query results to an Arrow table with dictionary encoded name and meta columns.
+
+    Value columns with mixed types are converted to strings, unless `strict` is True, where
+    ValueError is raised instead.
+    """
+    _require_pyarrow()
+
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        if strict:
+            raise ValueError("value column has mixed types") from None
+        df = df.assign(value=df.value.astype(str))
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+    return _dictionary_encode(table)
+
+
+def table_to_frame(table, categorical=False) -> pd.DataFrame:
+    """
+    table_to_frame converts an Arrow table of query results to a data frame matching the output of `load`.
+    """
+    columns = []
+
+    for c in table.column_names:
+        col = table.column(c)
+        if pa.types.is_dictionary(col.type) and not categorical:
+            col = col.cast(col.type.value_type)
+        elif categorical and (c == "name" or c.startswith("meta.")) and _is_string(col.type):
+            col = col.dictionary_encode()
+        columns.append(col)
+
+    return pa.table(columns, names=table.column_names).to_pandas()
+
+
+def _dictionary_encode(table):
+    for i, c in enumerate(table.column_names):
+        col = table.column(i)
+        if (c == "name" or c.startswith("meta.")) and _is_string(col.type):
+            table = table.set_column(i, c, col.dictionary_encode())
+    return table
+
+
+def _is_string(t) -> bool:
+    return pa.types.is_string(t) or pa.types.is_large_string(t)
+
+
+def _value_array(values):
+    try:
+        return pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+def _column_type(c, numeric, dictionary):
+    if c == "timestamp":
+        return pa.timestamp("ns", "UTC")
+    if c == "value":
+        return pa.float64() if numeric else pa.string()
+    return pa.dictionary(pa.int32(), pa.string()) if dictionary else pa.string()
+
+
+def _values_array(values, numeric):
+    if numeric:
+        return pa.array(pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64"), type=pa.float64(), from_pandas=True)
+    values = values.astype(object)
+    return pa.array([None if v is None or v != v else str(v) for v in values], type=pa.string())
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError(
+            "pyarrow is required for Arrow, Parquet and Feather support. it can be installed using: pip3 install sage-data-client[arrow]"
+        )
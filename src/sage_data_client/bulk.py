@@ -0,0 +1,300 @@
+"""
+Resumable bulk downloads of query results into a directory of compressed NDJSON shards.
+
+The time range is split into fixed windows. Each window's response is streamed into its own
+shard file without being parsed, and a manifest records the completed windows, so a download
+which fails part way resumes from the first missing window instead of from the start.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.client import HTTPException, IncompleteRead
+import json
+import os
+from pathlib import Path
+import time
+import warnings
+from . import compression
+from .client import DEFAULT_ENDPOINT, Client, _is_transient, default_client
+from .joins import _duration_ns
+from .prepared import _build_query
+from .query import _open
+from .timeparse import NS_PER_US, format_ns, is_absolute, parse_ns
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import Callable, Dict, List, Optional
+
+MANIFEST = "manifest.json"
+
+MANIFEST_VERSION = 1
+
+
+def download(
+    path,
+    start,
+    end=None,
+    filter: Optional[Dict[str, str]] = None,
+    chunk_window="1d",
+    suffix: str = ".ndjson.gz",
+    endpoint: str = DEFAULT_ENDPOINT,
+    bucket: Optional[str] = None,
+    client: Optional[Client] = None,
+    retries: int = 3,
+    verify: bool = False,
+    workers: int = 1,
+    progress: Optional[Callable[[int, int, float], None]] = None,
+) -> int:
+    """
+    download streams the results of a query into a directory of shard files, one per `chunk_window` of time, and returns the number of records downloaded.
+
+    A manifest of the completed shards and their number of records is kept in `manifest.json`.
+    Running the same download again skips the shards which are complete, so a download which
+    failed part way resumes where it stopped. Shards are written to a temporary file and only
+    renamed into place once their response has been fully received.
+
+    The directory can be read using `load`, `load_iter` or `load_many`.
+
+    Parameters
+    ----------
+    path : directory to download into. It's created if it doesn't exist.
+
+    start, end, filter, endpoint, bucket and client : see the Parameters section of the `query` function
+        When resuming, relative times like "-30d" use the times resolved by the first download.
+
+    chunk_window : length of time of each shard, like "6h" or "1d", or a timedelta, default: "1d"
+
+    suffix : file suffix of each shard, default: ".ndjson.gz"
+        Shards ending in .gz, .zst or .br are compressed.
+
+    retries : number of times to retry a shard whose response failed part way, default: 3
+        These are in addition to the client's retries before the response starts.
+
+    verify : whether to count the records of complete shards again when resuming, default: False
+        Shards whose count differs from the manifest, or whose file is missing or has changed
+        size, are downloaded again.
+
+    workers : number of shards downloaded at the same time, default: 1
+        Requests also share the client's pool of `pool_size` connections.
+
+    progress : function called after each shard, see the `paginate` function, default: None
+
+    Examples
+    --------
+
+    ```python
+    import sage_data_client
+
+    sage_data_client.download(
+        "backfill",
+        start="2023-01-01T00:00:00Z",
+        end="2023-07-01T00:00:00Z",
+        filter={"name": "env.temperature"},
+        chunk_window="1d",
+        progress=sage_data_client.log_progress,
+    )
+
+    df = sage_data_client.load("backfill")
+    ```
+    """
+    if retries < 0:
+        raise ValueError("retries must be at least 0")
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    window_ns = _window_ns(chunk_window)
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    if client is None:
+        client = default_client(endpoint)
+
+    manifest = _read_manifest(path)
+    q = _build_query(start=start, end=end if end is not None else "now", filter=filter, bucket=bucket)
+
+    if manifest is None:
+        manifest = {"version": MANIFEST_VERSION, "query": q, "window": window_ns, "suffix": suffix, "complete": False, "shards": []}
+    else:
+        q = _resume_query(manifest, q, start, end, window_ns, suffix)
+
+    shards = {s["file"]: s for s in manifest["shards"] if _is_done(path, s, verify)}
+    windows = _windows(parse_ns(q["start"]), parse_ns(q["end"]), window_ns)
+    rows = sum(s["rows"] for s in shards.values())
+
+    pages = {}
+
+    for i, (lo, hi) in enumerate(windows):
+        file = f"{i:06d}{suffix}"
+        if file not in shards:
+            pages[file] = dict(q, start=format_ns(lo), end=format_ns(hi))
+
+    def done(file, n):
+        nonlocal rows
+        page = pages[file]
+        shards[file] = {"file": file, "start": page["start"], "end": page["end"], "rows": n, "bytes": os.path.getsize(path / file)}
+        rows += n
+
+        # the manifest is only written from this thread, after each shard is renamed into place
+        manifest["shards"] = sorted(shards.values(), key=lambda s: s["file"])
+        _write_manifest(path, manifest)
+
+        if progress is not None:
+            fraction = len(shards) / len(windows)
+            progress(rows, int(rows / fraction), fraction)
+
+    if workers == 1:
+        for file, page in pages.items():
+            done(file, _download_shard(client, page, path / file, retries))
+    else:
+        _download_shards(client, pages, path, retries, workers, done)
+
+    manifest["complete"] = True
+    manifest["shards"] = sorted(shards.values(), key=lambda s: s["file"])
+    _write_manifest(path, manifest)
+    return rows
+
+
+def _download_shards(client, pages, path, retries, workers, done):
+    error = None
+
+    with ThreadPoolExecutor(workers) as executor:
+        futures = {executor.submit(_download_shard, client, page, path / file, retries): file for file, page in pages.items()}
+
+        # shards which finish after another fails are still recorded, so resuming skips them
+        for future in as_completed(futures):
+            try:
+                done(futures[future], future.result())
+            except Exception as exc:
+                if error is None:
+                    error = exc
+                    for f in futures:
+                        f.cancel()
+
+    if error is not None:
+        raise error
+
+
+def _windows(start, end, window_ns) -> List[tuple]:
+    windows = []
+    lo = start
+    while lo < end:
+        # window edges are rounded to microseconds as that is the precision of query times
+        hi = min(lo + window_ns, end)
+        hi = max(hi - hi % NS_PER_US, lo + NS_PER_US) if hi < end else end
+        windows.append((lo, hi))
+        lo = hi
+    return windows
+
+
+def _window_ns(window) -> int:
+    try:
+        return _duration_ns(window)
+    except ValueError:
+        raise ValueError("chunk_window must be a positive duration like \"6h\" or \"1d\"") from None
+
+
+def _resume_query(manifest, q, start, end, window_ns, suffix) -> dict:
+    """
+    _resume_query checks that the query matches the one in the manifest and returns the manifest's query.
+    """
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"unsupported manifest version {manifest.get('version')!r}")
+
+    old = manifest["query"]
+    same = (
+        old.get("filter") == q.get("filter")
+        and old.get("bucket") == q.get("bucket")
+        and manifest["window"] == window_ns
+        and manifest["suffix"] == suffix
+        and (not is_absolute(start) or old["start"] == q["start"])
+        and (end is None or not is_absolute(end) or old["end"] == q["end"])
+    )
+    if not same:
+        raise ValueError("directory contains a different download. use a new directory for a different query")
+
+    return old
+
+
+def _is_done(path, shard, verify) -> bool:
+    file = path / shard["file"]
+    if not file.exists() or file.stat().st_size != shard["bytes"]:
+        return False
+    return not verify or _count_rows(file) == shard["rows"]
+
+
+def _download_shard(client, q, path, retries) -> int:
+    tmp = path.with_name(path.name + ".tmp")
+
+    for attempt in range(retries + 1):
+        try:
+            rows = _write_shard(client, q, tmp, compression.path_encoding(path))
+            os.replace(tmp, path)
+            return rows
+        except (OSError, HTTPException) as exc:
+            if attempt == retries or not _is_transient(exc):
+                _remove(tmp)
+                raise
+        time.sleep(client.backoff * 2**attempt)
+
+
+def _write_shard(client, q, path, encoding) -> int:
+    rows = 0
+    last = b"\n"
+
+    with compression.create(path, encoding) as out:
+        with client.open(q) as f:
+            for chunk in iter(lambda: f.read(compression.CHUNK_SIZE), b""):
+                out.write(chunk)
+                rows += chunk.count(b"\n")
+                last = chunk[-1:]
+
+    # every record ends with a newline, so anything else means the response was cut off
+    if last != b"\n":
+        raise IncompleteRead(last)
+
+    return rows
+
+
+def _count_rows(path) -> int:
+    rows = 0
+    with _open(path) as f:
+        for chunk in iter(lambda: f.read(compression.CHUNK_SIZE), b""):
+            rows += chunk.count(b"\n")
+    return rows
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _read_manifest(path) -> Optional[dict]:
+    try:
+        with open(Path(path, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_manifest(path, manifest):
+    # written to a temporary file and renamed, so a failure never leaves a partial manifest
+    tmp = Path(path, MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, Path(path, MANIFEST))
+
+
+def _shard_paths(path) -> List[str]:
+    """
+    _shard_paths returns the shard files of download directory `path` in time order.
+
+    Directories without a manifest are read as all of their NDJSON files, sorted by name.
+    """
+    manifest = _read_manifest(path)
+
+    if manifest is None:
+        return sorted(str(p) for p in Path(path).iterdir() if ".ndjson" in p.name and not p.name.endswith(".tmp"))
+
+    if not manifest["complete"]:
+        warnings.warn(f"download in {str(path)!r} is incomplete. only its complete shards are loaded", stacklevel=3)
+
+    return [str(Path(path, s["file"])) for s in manifest["shards"]]
@@ -0,0 +1,493 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+import tempfile
+import time
+import pandas as pd
+from . import arrow, compression
+from .query import _Columns, _concat, _load, _open, _query_window, timestr
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import Callable, Optional
+
+
+class QueryCache:
+    """
+    QueryCache stores query results on disk keyed by the query request body, so repeated queries
+    over fixed historical time ranges skip both the network request and response parsing.
+
+    Only queries with an absolute start and an absolute end in the past are cached. Queries using
+    relative times or no end time are always sent to the data API.
+
+    Results are stored as Parquet files when pyarrow is installed and as gzipped NDJSON files
+    otherwise.
+
+    Parameters
+    ----------
+    path : cache directory, default: "~/.cache/sage_data_client/query"
+
+    max_bytes : maximum total size of cached results, default: 1GB
+        When exceeded, the least recently used results are evicted.
+
+    ttl : number of seconds cached results are valid for, default: None (never expire)
+
+    Examples
+    --------
+
+    ```python
+    import sage_data_client
+
+    cache = sage_data_client.QueryCache()
+
+    df = sage_data_client.query(
+        start="2021-12-20T00:00:00Z",
+        end="2021-12-27T00:00:00Z",
+        filter={
+            "name": "env.raingauge.acc",
+            "vsn": "W039",
+        },
+        cache=cache,
+    )
+
+    print(cache.stats())
+    ```
+    """
+
+    def __init__(
+        self,
+        path="~/.cache/sage_data_client/query",
+        max_bytes: int = 1 << 30,
+        ttl: Optional[float] = None,
+    ):
+        self.path = Path(path).expanduser()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def fetch(
+        self,
+        endpoint: str,
+        q: dict,
+        fetch: Callable[[dict], pd.DataFrame],
+        historical: bool,
+        options: Optional[dict] = None,
+    ) -> pd.DataFrame:
+        """
+        fetch returns the cached result for query body `q` or calls `fetch(q)` and caches its result.
+
+        Only `historical` queries, whose absolute time range is entirely in the past, are cached.
+        Results are keyed by `options` like {"categorical": True} as well as `q`, since they change
+        the data frame returned.
+        """
+        if not historical:
+            self.bypassed += 1
+            return fetch(q)
+
+        path = self._entry_path(endpoint, q, options)
+
+        df = self._read(path, options)
+        if df is not None:
+            self.hits += 1
+            return df
+
+        self.misses += 1
+        df = fetch(q)
+        self._write(path, df)
+        self._evict()
+        return df
+
+    def stats(self) -> dict:
+        """
+        stats returns hit / miss counts for this cache object along with the number and total size of cached results.
+        """
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "entries": len(entries),
+            "bytes": sum(st.st_size for _, st in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self):
+        """
+        clear removes all cached results.
+        """
+        for path, _ in self._entries():
+            _unlink(path)
+
+    def _entry_path(self, endpoint, q, options=None) -> Path:
+        key = json.dumps([endpoint, q, options or {}], sort_keys=True, separators=(",", ":"))
+        return self.path / hashlib.sha256(key.encode()).hexdigest()
+
+    def _read(self, path, options) -> Optional[pd.DataFrame]:
+        path = _find_frame(path)
+        if path is None:
+            return None
+
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+
+        now = time.time()
+
+        # mtime records when the entry was created. it's used for the ttl.
+        if self.ttl is not None and now - st.st_mtime > self.ttl:
+            _unlink(path)
+            return None
+
+        try:
+            df = _read_frame(path, options)
+        except FileNotFoundError:
+            return None
+
+        # atime records when the entry was last used. it's used for lru eviction.
+        os.utime(path, (now, st.st_mtime))
+        return df
+
+    def _write(self, path, df):
+        path = _write_frame(path, df)
+        now = time.time()
+        os.utime(path, (now, now))
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[1].st_atime)
+        total = sum(st.st_size for _, st in entries)
+        for path, st in entries:
+            if total <= self.max_bytes:
+                break
+            _unlink(path)
+            total -= st.st_size
+
+    def _entries(self):
+        entries = []
+        for path in _frame_files(self.path):
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:
+                pass
+        return entries
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class RangeCache:
+    """
+    RangeCache stores query results on disk along with the time intervals they cover, so queries
+    over overlapping time ranges (for example, "the last 7 days" every 10 minutes) only request
+    the intervals which have not already been fetched.
+
+    Results are kept separately for each distinct filter / bucket, and are combined and
+    deduplicated by timestamp, name and meta fields. Queries using `head`, `tail` or
+    `experimental_func` are not cached, as their results cannot be stitched together from
+    smaller time ranges. Results are stored in the same formats as QueryCache.
+
+    Parameters
+    ----------
+    path : cache directory, default: "~/.cache/sage_data_client/range"
+
+    settle : number of seconds before now which are never marked as covered, default: 300
+        Recent data may still be arriving at the data API, so the most recent interval of each
+        query is always requested again.
+
+    max_segments : number of stored segments per filter before they are compacted, default: 16
+
+    Examples
+    --------
+
+    ```python
+    import sage_data_client
+
+    cache = sage_data_client.RangeCache()
+
+    # only the first call fetches the full week, later calls only fetch new data
+    df = sage_data_client.query(
+        start="-7d",
+        filter={
+            "name": "env.temperature",
+            "vsn": "W023",
+        },
+        cache=cache,
+    )
+    ```
+    """
+
+    def __init__(
+        self,
+        path="~/.cache/sage_data_client/range",
+        settle: float = 300.0,
+        max_segments: int = 16,
+    ):
+        self.path = Path(path).expanduser()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.settle = settle
+        self.max_segments = max_segments
+        self.requests = 0
+        self.bypassed = 0
+
+    def fetch(
+        self,
+        endpoint: str,
+        q: dict,
+        fetch: Callable[[dict], pd.DataFrame],
+        historical: bool,
+        options: Optional[dict] = None,
+    ) -> pd.DataFrame:
+        """
+        fetch returns the result for query body `q`, calling `fetch` only for intervals of the query time range which are not already stored.
+
+        Results are stored separately for each `options` like {"categorical": True}.
+        """
+        if any(k in q for k in ("head", "tail", "experimental_func", "experimental_window")):
+            self.bypassed += 1
+            return fetch(q)
+
+        start, end = _query_window(q)
+        settled = pd.Timestamp.now(tz="UTC") - pd.Timedelta(seconds=self.settle)
+
+        store = _RangeStore(self._store_path(endpoint, q, options), options)
+        segments = store.segments()
+        frames = [store.read(seg, start, end) for seg in segments if seg[0] < end and start < seg[1]]
+
+        for gap_start, gap_end in _gaps(_merge_intervals(segments), start, end):
+            self.requests += 1
+            df = fetch(dict(q, start=timestr(gap_start), end=timestr(gap_end)))
+            frames.append(df)
+
+            # only the part of the gap which has settled is recorded as covered
+            if gap_start < settled:
+                covered_end = min(gap_end, settled)
+                store.write((gap_start, covered_end), df[df.timestamp < covered_end])
+
+        if len(store.segments()) > self.max_segments:
+            store.compact()
+
+        return _combine(frames)
+
+    def stats(self) -> dict:
+        """
+        stats returns request counts for this cache object along with the number and total size of stored segments.
+        """
+        files = [f for d in self.path.iterdir() if d.is_dir() for f in _frame_files(d)]
+        return {
+            "requests": self.requests,
+            "bypassed": self.bypassed,
+            "filters": len(list(self.path.glob("*/manifest.json"))),
+            "segments": len(files),
+            "bytes": sum(f.stat().st_size for f in files),
+        }
+
+    def clear(self):
+        """
+        clear removes all stored results.
+        """
+        for path in self.path.glob("*/*"):
+            _unlink(path)
+        for path in self.path.glob("*"):
+            path.rmdir()
+
+    def _store_path(self, endpoint, q, options=None) -> Path:
+        q = {k: v for k, v in q.items() if k not in ("start", "end")}
+        key = json.dumps([endpoint, q, options or {}], sort_keys=True, separators=(",", ":"))
+        return self.path / hashlib.sha256(key.encode()).hexdigest()
+
+
+class _RangeStore:
+    """
+    _RangeStore manages the segment files and manifest for a single filter in a RangeCache.
+    """
+
+    def __init__(self, path, options=None):
+        self.path = path
+        self.options = options
+        self.manifest = path / "manifest.json"
+
+    def segments(self):
+        try:
+            with open(self.manifest) as f:
+                return [(_ts(s), _ts(e)) for s, e in json.load(f)]
+        except FileNotFoundError:
+            return []
+
+    def read(self, segment, start, end) -> pd.DataFrame:
+        df = _read_frame(_find_frame(self._segment_path(segment)), self.options)
+        if segment[0] < start or end < segment[1]:
+            df = df[(df.timestamp >= start) & (df.timestamp < end)]
+        return df
+
+    def write(self, segment, df):
+        self.path.mkdir(exist_ok=True)
+        _write_frame(self._segment_path(segment), df)
+        self._write_manifest(sorted(self.segments() + [segment]))
+
+    def compact(self):
+        segments = self.segments()
+        merged = _merge_intervals(segments)
+
+        for interval in merged:
+            parts = [seg for seg in segments if interval[0] <= seg[0] and seg[1] <= interval[1]]
+            if len(parts) == 1:
+                continue
+            df = _combine([self.read(seg, *interval) for seg in parts])
+            _write_frame(self._segment_path(interval), df)
+
+        self._write_manifest(merged)
+
+        for seg in set(segments) - set(merged):
+            _remove_frame(self._segment_path(seg))
+
+    def _write_manifest(self, segments):
+        data = json.dumps([[s.value, e.value] for s, e in segments]).encode()
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.manifest)
+
+    def _segment_path(self, segment) -> Path:
+        return self.path / f"{segment[0].value}-{segment[1].value}"
+
+
+def _combine(frames) -> pd.DataFrame:
+    frames = [df for df in frames if len(df) > 0]
+    if len(frames) == 0:
+        return _Columns().to_frame()
+    df = _concat(frames)
+    by = ["timestamp", "name"] + [c for c in df.columns if c.startswith("meta.")]
+    df.drop_duplicates(subset=by, inplace=True, ignore_index=True)
+    df.sort_values("timestamp", kind="stable", inplace=True, ignore_index=True)
+    return df
+
+
+def _merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _gaps(intervals, start, end):
+    gaps = []
+    t = start
+    for a, b in intervals:
+        if b <= t:
+            continue
+        if a >= end:
+            break
+        if a > t:
+            gaps.append((t, a))
+        t = max(t, b)
+    if t < end:
+        gaps.append((t, end))
+    return gaps
+
+
+def _ts(value) -> pd.Timestamp:
+    return pd.Timestamp(value, tz="UTC")
+
+
+# files are only ever read in these formats. in particular, pickles are never loaded from the
+# cache directory, as unpickling runs arbitrary code and ties the cache to the pandas version.
+FRAME_SUFFIXES = (".parquet", ".ndjson.gz")
+
+
+def _frame_files(path):
+    return [f for suffix in FRAME_SUFFIXES for f in path.glob("*" + suffix)]
+
+
+def _find_frame(path) -> Optional[Path]:
+    """
+    _find_frame returns the file storing the data frame written to `path` by `_write_frame`, or None if there isn't one.
+    """
+    for suffix in FRAME_SUFFIXES:
+        file = path.with_name(path.name + suffix)
+        if file.exists():
+            return file
+    return None
+
+
+def _read_frame(path, options) -> pd.DataFrame:
+    if path is None:
+        raise FileNotFoundError("cached data frame is missing")
+    categorical = bool((options or {}).get("categorical"))
+    if path.name.endswith(".parquet"):
+        return arrow.table_to_frame(arrow.read_table(path), categorical=categorical)
+    with _open(path) as f:
+        return _load(f, categorical=categorical)
+
+
+def _write_frame(path, df) -> Path:
+    """
+    _write_frame writes data frame `df` to `path` plus the suffix of its format and returns the file written.
+
+    Parquet is used when pyarrow is installed and the value column can be stored exactly. Otherwise,
+    records are written as gzipped NDJSON with integer nanosecond timestamps, which `_load` reads
+    back into the same data frame.
+    """
+    table = None
+
+    # empty results are written as empty NDJSON files, so they are read back with the same
+    # columns as `load` returns
+    if arrow.pa is not None and len(df) > 0:
+        try:
+            table = arrow.frame_to_table(df, strict=True)
+        except ValueError:
+            pass
+
+    suffix = ".parquet" if table is not None else ".ndjson.gz"
+    file = path.with_name(path.name + suffix)
+
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        if table is not None:
+            arrow.pq.write_table(table, tmp)
+        else:
+            with compression.create(tmp, "gzip") as f:
+                _write_records(f, df)
+        os.replace(tmp, file)
+    except BaseException:
+        _unlink(tmp)
+        raise
+
+    # a frame written in another format earlier would be found first, so it's removed
+    for other in FRAME_SUFFIXES:
+        if other != suffix:
+            _unlink(path.with_name(path.name + other))
+
+    return file
+
+
+def _remove_frame(path):
+    for suffix in FRAME_SUFFIXES:
+        _unlink(path.with_name(path.name + suffix))
+
+
+def _write_records(f, df):
+    meta = {c[len("meta."):]: df[c].astype(object).tolist() for c in df.columns if c.startswith("meta.")}
+    timestamps = df.timestamp.array.asi8.tolist()
+    names = df.name.astype(object).tolist()
+    values = df.value.tolist() if df.value.dtype.kind == "f" else df.value.astype(object).tolist()
+
+    for i in range(len(df)):
+        record = {
+            "timestamp": timestamps[i],
+            "name": names[i],
+            "value": values[i],
+            # missing meta fields are left out, as they are in data API responses
+            "meta": {k: col[i] for k, col in meta.items() if isinstance(col[i], str)},
+        }
+        f.write(json.dumps(record, separators=(",", ":")).encode() + b"\n")
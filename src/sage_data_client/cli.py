@@ -0,0 +1,413 @@
+"""
+Command line interface for exporting, converting and summarizing query results.
+
+Records are streamed from end to end in chunks, so memory use doesn't depend on the size of the
+results. Query results are written as NDJSON, so commands can be piped together:
+
+sage-data query --start -1d --filter name=env.temperature | sage-data stats --by meta.vsn -
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+from tempfile import TemporaryFile
+import pandas as pd
+from . import arrow, compression
+from .bulk import _shard_paths, _windows, download
+from .client import DEFAULT_ENDPOINT, Client
+from .pagination import _write_pages, log_progress
+from .prepared import _build_query
+from .query import _is_dir, _load_path_iter, _meta_keys, _open, _records
+from .timeparse import format_ns, parse_ns
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import List, Optional
+
+logger = logging.getLogger("sage_data_client")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="sage-data", description="Export, convert and summarize Sage data.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress to stderr")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    p = subparsers.add_parser("query", help="stream query results as NDJSON")
+    _add_query_arguments(p)
+    p.add_argument("-o", "--output", default="-", help="file to write. paths ending in .gz, .zst or .br are compressed. default: stdout")
+    p.add_argument("--max-rows", type=int, help="request the results in pages of about this many records")
+    p.add_argument("--workers", type=int, default=1, help="number of time shards requested at the same time")
+    p.set_defaults(func=_query)
+
+    p = subparsers.add_parser("download", help="download query results into a resumable directory of shards")
+    _add_query_arguments(p)
+    p.add_argument("path", help="directory to download into")
+    p.add_argument("--chunk-window", default="1d", help="length of time of each shard. default: 1d")
+    p.add_argument("--suffix", default=".ndjson.gz", help="file suffix of each shard. default: .ndjson.gz")
+    p.add_argument("--retries", type=int, default=3, help="number of times to retry a failed shard. default: 3")
+    p.add_argument("--verify", action="store_true", help="count the records of complete shards again when resuming")
+    p.add_argument("--workers", type=int, default=1, help="number of shards downloaded at the same time")
+    p.set_defaults(func=_download)
+
+    p = subparsers.add_parser("convert", help="convert NDJSON results to Parquet, Feather, CSV or NDJSON")
+    p.add_argument("input", help="NDJSON file or directory written by download. - reads stdin")
+    p.add_argument("output", help="file to write. the format is chosen by its suffix: .parquet, .feather, .arrow, .csv or .ndjson, optionally followed by .gz, .zst or .br for .csv and .ndjson. - writes stdout")
+    p.add_argument("--format", choices=["ndjson", "csv", "parquet", "feather"], help="output format. default: based on the output suffix, or ndjson for stdout")
+    p.add_argument("--columns", help="comma separated columns to include like timestamp,value,meta.vsn. NDJSON records always include timestamp, name and value. default: all")
+    p.add_argument("--chunksize", type=int, default=100000, help="number of records converted at a time. default: 100000")
+    _add_input_encoding_argument(p)
+    p.set_defaults(func=_convert)
+
+    p = subparsers.add_parser("stats", help="print count, min, max, mean, first and last timestamp of values")
+    p.add_argument("inputs", nargs="*", default=["-"], help="NDJSON files or directories written by download. default: stdin")
+    p.add_argument("--by", default="name", help="comma separated columns to group by. default: name")
+    p.add_argument("--csv", action="store_true", help="print CSV instead of a table")
+    p.add_argument("--chunksize", type=int, default=100000, help="number of records summarized at a time. default: 100000")
+    _add_input_encoding_argument(p)
+    p.set_defaults(func=_stats)
+
+    args = parser.parse_args(_join_times(sys.argv[1:] if argv is None else argv))
+
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    try:
+        args.func(args)
+    except BrokenPipeError:
+        # the reader of stdout exited, like `sage-data query ... | head`. stdout is redirected so
+        # flushing it at exit doesn't fail again.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    except (ValueError, OSError, ImportError) as exc:
+        parser.exit(1, f"sage-data: error: {exc}\n")
+
+
+def _join_times(argv):
+    # relative times like "-1h" look like options to argparse, so they're joined to their flag
+    joined = []
+    i = 0
+    while i < len(argv):
+        if argv[i] in ("--start", "--end") and i + 1 < len(argv):
+            joined.append(f"{argv[i]}={argv[i + 1]}")
+            i += 2
+        else:
+            joined.append(argv[i])
+            i += 1
+    return joined
+
+
+def _add_query_arguments(p):
+    p.add_argument("--start", required=True, help="query start time like -1h or 2023-01-01T00:00:00Z")
+    p.add_argument("--end", help="query end time. default: now")
+    p.add_argument("-f", "--filter", action="append", default=[], metavar="KEY=PATTERN", help="query filter like name=env.temperature. can be repeated")
+    p.add_argument("--bucket", help="name of bucket to query")
+    p.add_argument("--endpoint", default=DEFAULT_ENDPOINT, help="url of query api")
+
+
+def _add_input_encoding_argument(p):
+    p.add_argument(
+        "--input-encoding",
+        default="identity",
+        choices=["identity", "gzip", "zstd", "br"],
+        help="compression of stdin. files are decompressed based on their suffix. default: identity",
+    )
+
+
+def _query_body(args) -> dict:
+    filter = {}
+
+    for item in args.filter:
+        key, sep, pattern = item.partition("=")
+        if not sep or not key:
+            raise ValueError(f"invalid filter {item!r}. must be like name=env.temperature")
+        filter[key] = pattern
+
+    return _build_query(start=args.start, end=args.end or "now", filter=filter or None, bucket=args.bucket)
+
+
+def _progress(args):
+    return log_progress if args.verbose else None
+
+
+def _query(args):
+    if args.workers < 1:
+        raise ValueError("workers must be at least 1")
+    if args.max_rows is not None and args.workers > 1:
+        raise ValueError("--max-rows can't be used with --workers")
+
+    q = _query_body(args)
+
+    with Client(args.endpoint, pool_size=max(args.workers, 4)) as client, _create(args.output) as out:
+        if args.max_rows is not None:
+            if args.max_rows < 1:
+                raise ValueError("max_rows must be at least 1")
+            _write_pages(client, q, args.max_rows, _progress(args), out)
+        elif args.workers > 1:
+            _write_shards(client, q, args.workers, out)
+        else:
+            with client.open(q) as f:
+                shutil.copyfileobj(f, out, compression.CHUNK_SIZE)
+
+
+def _write_shards(client, q, workers, out):
+    """
+    _write_shards requests `workers` time shards of query `q` at the same time and writes their responses to `out` in time order.
+
+    The first shard is written as it's received. Later shards are spooled to temporary files until
+    the shards before them are written, so memory use stays constant.
+    """
+    start, end = parse_ns(q["start"]), parse_ns(q["end"])
+    windows = _windows(start, end, max(-(-(end - start) // workers), 1))
+    queries = [dict(q, start=format_ns(lo), end=format_ns(hi)) for lo, hi in windows]
+
+    with ExitStack() as stack:
+        spools = [out] + [stack.enter_context(TemporaryFile()) for _ in queries[1:]]
+
+        def fetch(i):
+            with client.open(queries[i]) as f:
+                shutil.copyfileobj(f, spools[i], compression.CHUNK_SIZE)
+
+        with ThreadPoolExecutor(workers) as executor:
+            futures = [executor.submit(fetch, i) for i in range(len(queries))]
+
+            for i, future in enumerate(futures):
+                future.result()
+                if i > 0:
+                    spools[i].seek(0)
+                    shutil.copyfileobj(spools[i], out, compression.CHUNK_SIZE)
+                    spools[i].close()
+                logger.info("received %d of %d shards", i + 1, len(futures))
+
+
+def _download(args):
+    q = _query_body(args)
+
+    with Client(args.endpoint, pool_size=max(args.workers, 4)) as client:
+        rows = download(
+            args.path,
+            start=q["start"],
+            end=q["end"],
+            filter=q.get("filter"),
+            chunk_window=args.chunk_window,
+            suffix=args.suffix,
+            bucket=q.get("bucket"),
+            client=client,
+            retries=args.retries,
+            verify=args.verify,
+            workers=args.workers,
+            progress=_progress(args),
+        )
+
+    logger.info("downloaded %d records to %s", rows, args.path)
+
+
+def _convert(args):
+    if args.chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+
+    suffix = _format_suffix(args.output, args.format)
+    columns = [c.strip() for c in args.columns.split(",") if c.strip()] if args.columns is not None else None
+    meta = _meta_keys(columns)
+
+    # only NDJSON output is written in a single pass over the input
+    with _input(args.input, args.input_encoding, spool=suffix != ".ndjson") as source:
+        if suffix == ".ndjson":
+            with _create(args.output) as out:
+                _write_ndjson(source, columns, meta, out)
+        else:
+            # chunks only have meta columns for fields in their records, so the columns and value
+            # type of the whole input are found first and every chunk is written with them.
+            found, numeric = _scan(source)
+            if columns is None:
+                columns = found
+
+            if suffix == ".csv":
+                with _create(args.output) as out:
+                    _write_csv(source, columns, args.chunksize, out)
+            else:
+                with arrow.TableWriter(args.output, columns, numeric=numeric) as writer:
+                    for df in _chunks(source, args.chunksize):
+                        writer.write(df)
+
+    logger.info("converted %s to %s", args.input, args.output)
+
+
+def _write_ndjson(source, columns, meta, out):
+    for f in _sources(source):
+        with _open(f) as r:
+            if columns is None:
+                # records are only decompressed and compressed again, without being parsed
+                shutil.copyfileobj(r, out, compression.CHUNK_SIZE)
+                continue
+
+            # records keep their standard fields, so the output can still be loaded
+            for record in _records(r, meta=meta):
+                out.write(json.dumps(record, separators=(",", ":")).encode() + b"\n")
+
+
+def _write_csv(source, columns, chunksize, out):
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    header = True
+
+    try:
+        for df in _chunks(source, chunksize):
+            df.reindex(columns=columns).to_csv(text, header=header, index=False)
+            header = False
+    finally:
+        # detached, so the wrapper doesn't close `out` when it's garbage collected
+        text.flush()
+        text.detach()
+
+
+def _format_suffix(path, format=None) -> str:
+    if format is not None:
+        suffix = "." + format
+        if suffix in arrow.ARROW_SUFFIXES and path == "-":
+            raise ValueError(f"{format} can't be written to stdout")
+        return suffix
+    if path == "-":
+        return ".ndjson"
+
+    name = os.path.basename(path).lower()
+    for suffix in compression.SUFFIX_ENCODINGS:
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+            break
+    _, suffix = os.path.splitext(name)
+    if suffix in arrow.ARROW_SUFFIXES and name != os.path.basename(path).lower():
+        raise ValueError(f"{suffix} files can't be compressed with {os.path.basename(path)[len(name):]}")
+    if suffix not in arrow.ARROW_SUFFIXES + (".csv", ".ndjson", ".json"):
+        raise ValueError(f"unsupported output {path!r}. must end in .parquet, .feather, .arrow, .csv or .ndjson")
+    return ".ndjson" if suffix == ".json" else suffix
+
+
+def _stats(args):
+    if args.chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+
+    by = [c.strip() for c in args.by.split(",") if c.strip()]
+    if not by:
+        raise ValueError("--by requires at least one column")
+
+    partials = []
+
+    for path in args.inputs:
+        with _input(path, args.input_encoding, spool=False) as source:
+            for df in _chunks(source, args.chunksize):
+                partials.append(_partial_stats(df, by))
+                # combine as we go, so memory use is proportional to the number of groups
+                if len(partials) > 1:
+                    partials = [_combine_stats(partials)]
+
+    if partials:
+        result = _combine_stats(partials)
+    else:
+        result = pd.DataFrame(columns=["count", "first", "last", "numeric", "sum", "min", "max"])
+
+    result["mean"] = result["sum"] / result["numeric"]
+    result = result[["count", "min", "max", "mean", "first", "last"]]
+
+    if args.csv:
+        result.to_csv(sys.stdout)
+    else:
+        print(result.to_string())
+
+
+def _partial_stats(df, by) -> pd.DataFrame:
+    for c in by:
+        if c not in df.columns:
+            df[c] = None
+    numeric = pd.to_numeric(df["value"], errors="coerce")
+    keys = df[by].astype(object)
+    grouped = df.assign(numeric=numeric).groupby([keys[c] for c in by], sort=False, dropna=False)
+    return grouped.agg(
+        count=("value", "size"),
+        first=("timestamp", "min"),
+        last=("timestamp", "max"),
+        numeric=("numeric", "count"),
+        sum=("numeric", "sum"),
+        min=("numeric", "min"),
+        max=("numeric", "max"),
+    )
+
+
+def _combine_stats(partials) -> pd.DataFrame:
+    df = pd.concat(partials)
+    return df.groupby(level=list(range(df.index.nlevels)), sort=True, dropna=False).agg(
+        {"count": "sum", "first": "min", "last": "max", "numeric": "sum", "sum": "sum", "min": "min", "max": "max"}
+    )
+
+
+@contextmanager
+def _create(path):
+    if path == "-":
+        out = sys.stdout.buffer
+        yield out
+        out.flush()
+    else:
+        with compression.create(path) as out:
+            yield out
+
+
+@contextmanager
+def _input(path, encoding="identity", spool=True):
+    """
+    _input yields a path or file to read `path` from. stdin is decompressed using content encoding `encoding`.
+
+    When `spool` is True, stdin is copied to a temporary file, so it can be read more than once.
+    Otherwise, it's read as a stream.
+    """
+    if path != "-":
+        yield path
+        return
+
+    with compression.decode(sys.stdin.buffer, encoding) as stdin:
+        if not spool:
+            yield stdin
+            return
+
+        with TemporaryFile() as f:
+            shutil.copyfileobj(stdin, f, compression.CHUNK_SIZE)
+            yield f
+
+
+def _sources(source) -> list:
+    if not isinstance(source, str):
+        # spooled stdin is read from the start each time. streamed stdin can only be read once
+        if source.seekable():
+            source.seek(0)
+        return [source]
+    if _is_dir(source):
+        return _shard_paths(source)
+    return [source]
+
+
+def _chunks(source, chunksize):
+    for f in _sources(source):
+        yield from _load_path_iter(f, chunksize, {})
+
+
+def _scan(source):
+    """
+    _scan returns the columns of all records of `source` and whether all values are numbers.
+    """
+    meta = {}
+    numeric = True
+
+    for f in _sources(source):
+        with _open(f) as r:
+            for record in _records(r):
+                meta.update(dict.fromkeys(record["meta"]))
+                if numeric and type(record["value"]) not in (int, float):
+                    numeric = False
+
+    return ["timestamp", "name", "value"] + [f"meta.{k}" for k in meta], numeric
+
+
+if __name__ == "__main__":
+    main()
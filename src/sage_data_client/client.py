@@ -0,0 +1,410 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from functools import partial
+from http.client import HTTPConnection, HTTPSConnection, HTTPException
+from io import BytesIO
+import json
+from queue import Empty, LifoQueue
+import socket
+from threading import BoundedSemaphore, Lock
+import time
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit
+from urllib.request import getproxies, proxy_bypass
+from . import compression, profiling
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import Dict, Iterable, Optional
+
+
+DEFAULT_ENDPOINT = "https://data.sagecontinuum.org/api/v1/query"
+
+# status codes which indicate the request may succeed if retried
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class Client:
+    """
+    Client sends queries to the data API over a pool of persistent connections, so repeated
+    queries avoid paying for a new TCP and TLS handshake each time.
+
+    Module level functions like `sage_data_client.query` use a shared default Client for each
+    endpoint. Creating a Client is only needed to change its settings.
+
+    Parameters
+    ----------
+    endpoint : url of query api, default: "https://data.sagecontinuum.org/api/v1/query"
+
+    pool_size : maximum number of concurrent connections, default: 4
+
+    timeout : number of seconds to wait on any single socket operation, default: 300
+
+    retries : number of times to retry a request after a transient failure, default: 3
+        Connection errors, timeouts and 429 / 5xx responses are retried. Requests are only retried
+        before any of the response has been read.
+
+    backoff : number of seconds to wait before the first retry, default: 0.5
+        The wait doubles after each failed attempt.
+
+    Examples
+    --------
+
+    ```python
+    import sage_data_client
+
+    with sage_data_client.Client(pool_size=8, timeout=30) as client:
+        for vsn in ["W023", "W039"]:
+            df = client.query(start="-1h", filter={"name": "env.temperature", "vsn": vsn})
+            print(df)
+    ```
+    """
+
+    def __init__(
+        self,
+        endpoint: str = DEFAULT_ENDPOINT,
+        pool_size: int = 4,
+        timeout: Optional[float] = 300.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+    ):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+        self.endpoint = endpoint
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._idle = LifoQueue()
+        self._slots = BoundedSemaphore(pool_size)
+
+    def query(self, *args, **kwargs):
+        """
+        query makes a query request using this client and returns the results in a data frame.
+
+        It accepts the same arguments as `sage_data_client.query` except `endpoint` and `client`.
+        """
+        from .query import query
+
+        return query(*args, endpoint=self.endpoint, client=self, **kwargs)
+
+    def query_iter(self, *args, **kwargs):
+        """
+        query_iter makes a query request using this client and incrementally yields the results as data frames.
+
+        It accepts the same arguments as `sage_data_client.query_iter` except `endpoint` and `client`.
+        """
+        from .query import query_iter
+
+        return query_iter(*args, endpoint=self.endpoint, client=self, **kwargs)
+
+    def close(self):
+        """
+        close closes all idle connections in the pool.
+        """
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def open(self, q: dict, stats=None):
+        """
+        open sends query body `q`, a dictionary or Query, and yields the decoded response body as a file like object.
+
+        When `stats` is a profiling.QueryStats, request and decompression measurements are added to it.
+        """
+        with self._connection() as conn:
+            stack = ExitStack()
+
+            for attempt in range(self.retries + 1):
+                try:
+                    f = stack.enter_context(conn.open(q, stats))
+                    break
+                except (OSError, HTTPException) as exc:
+                    conn.close()
+                    if attempt == self.retries or not _is_transient(exc):
+                        # raise the same exception types as urlopen
+                        if isinstance(exc, URLError):
+                            raise
+                        raise URLError(exc) from exc
+                time.sleep(self.backoff * 2**attempt)
+
+            with stack:
+                yield f
+
+    @contextmanager
+    def _connection(self):
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                conn = _Connection(self.endpoint, self.timeout)
+            try:
+                yield conn
+            finally:
+                self._idle.put(conn)
+
+
+class AsyncClient:
+    """
+    AsyncClient runs queries from asyncio code, overlapping the network latency of many queries
+    without blocking the event loop.
+
+    Requests are sent over a pooled `Client`. Reading and decoding each response runs in a
+    dedicated thread pool, so the event loop is free while responses are transferred and parsed.
+
+    Parameters
+    ----------
+    endpoint : url of query api, default: "https://data.sagecontinuum.org/api/v1/query"
+
+    max_concurrency : maximum number of queries in flight at once, default: 8
+
+    client : Client used to send requests, default: None (new Client with `max_concurrency` connections)
+
+    Examples
+    --------
+
+    ```python
+    import asyncio
+    import sage_data_client
+
+    async def main():
+        async with sage_data_client.AsyncClient() as client:
+            results = await client.aquery_many(
+                [{"start": "-1h", "filter": {"name": "env.temperature", "vsn": vsn}} for vsn in ["W023", "W039"]]
+            )
+        for df in results:
+            print(df)
+
+    asyncio.get_event_loop().run_until_complete(main())
+    ```
+    """
+
+    def __init__(
+        self,
+        endpoint: str = DEFAULT_ENDPOINT,
+        max_concurrency: int = 8,
+        client: Optional[Client] = None,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if client is None:
+            client = Client(endpoint, pool_size=max_concurrency)
+        self.client = client
+        self.endpoint = client.endpoint
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_concurrency)
+
+    async def aquery(self, *args, **kwargs):
+        """
+        aquery makes a query request and returns the results in a data frame.
+
+        It accepts the same arguments as `sage_data_client.query` except `endpoint` and `client`.
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, partial(self.client.query, *args, **kwargs))
+
+    async def aquery_many(self, queries: Iterable[dict], max_concurrency: Optional[int] = None) -> list:
+        """
+        aquery_many makes many query requests concurrently and returns their results in the same order as `queries`.
+
+        Parameters
+        ----------
+        queries : iterable of dictionaries of `query` keyword arguments
+
+        max_concurrency : maximum number of queries in flight at once, default: None (client's `max_concurrency`)
+            Values above the client's `max_concurrency` are limited to it.
+
+        Returns
+        -------
+        result : list of pandas.DataFrame
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def run(kwargs):
+            async with semaphore:
+                return await self.aquery(**kwargs)
+
+        return list(await asyncio.gather(*(run(kwargs) for kwargs in queries)))
+
+    def close(self):
+        """
+        close closes all idle connections and shuts down the thread pool.
+        """
+        self._executor.shutdown(wait=True)
+        self.client.close()
+
+    async def aclose(self):
+        """
+        aclose is like `close`, but waits for queries in flight to finish without blocking the event loop.
+        """
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+_default_clients = {}  # type: Dict[str, Client]
+_default_clients_lock = Lock()
+
+
+def default_client(endpoint: str = DEFAULT_ENDPOINT) -> Client:
+    """
+    default_client returns the shared Client used by module level functions for `endpoint`.
+    """
+    with _default_clients_lock:
+        try:
+            return _default_clients[endpoint]
+        except KeyError:
+            client = _default_clients[endpoint] = Client(endpoint)
+            return client
+
+
+def _is_transient(exc) -> bool:
+    if isinstance(exc, HTTPError):
+        return exc.code in RETRY_STATUS_CODES
+    return True
+
+
+class _Connection:
+    """
+    _Connection is a persistent HTTP/1.1 connection to a query endpoint which is reused across
+    requests and transparently reconnects if the server closed it while idle.
+    """
+
+    def __init__(self, endpoint: str, timeout: Optional[float] = None):
+        url = urlsplit(endpoint)
+        if url.scheme not in ("http", "https"):
+            raise ValueError(f"unsupported endpoint scheme: {url.scheme!r}")
+        self.endpoint = endpoint
+        self.scheme = url.scheme
+        self.host = url.hostname
+        self.port = url.port
+        self.path = url.path or "/"
+        if url.query:
+            self.path += "?" + url.query
+        self.timeout = timeout
+        self.proxy = _proxy_for(url)
+        self.conn = None
+        self.sock = None
+
+        # plain http requests through a proxy are sent with the full url as the path
+        if self.proxy is not None and self.scheme == "http":
+            self.path = endpoint
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        self.sock = None
+
+    @contextmanager
+    def open(self, q: dict, stats=None):
+        """
+        open sends query body `q` and yields the decoded response body as a file like object.
+        """
+        # Query objects carry their serialized body
+        body = q.data if hasattr(q, "data") else json.dumps(q).encode()
+
+        with profiling.stage(stats, "request"):
+            resp = self._request(body)
+
+        if not 200 <= resp.status < 300:
+            body = resp.read()
+            raise HTTPError(self.endpoint, resp.status, resp.reason, resp.headers, BytesIO(body))
+
+        f = None
+        try:
+            encoding = resp.headers.get("Content-Encoding", "identity")
+            if encoding in ("", "identity"):
+                f = resp
+                yield f
+            else:
+                # decompress in a background thread so it overlaps with reading and parsing
+                f = compression.decode(resp, encoding, threaded=True, stats=stats, interrupt=partial(self._interrupt, resp))
+                yield f
+        finally:
+            if f is not None and f is not resp:
+                f.close()
+            # reading lines up to the content length doesn't mark the response as complete, so
+            # finish it here to allow the connection to be reused.
+            if not resp.isclosed() and resp.length == 0:
+                resp.read()
+            # a partially read response leaves the connection in an unusable state
+            if not resp.isclosed():
+                self.close()
+
+    def _request(self, body):
+        headers = {
+            "Accept-Encoding": compression.accept_encoding(),
+            "Content-Type": "application/json",
+        }
+
+        # an idle keep alive connection may have been closed by the server, so if sending on a
+        # reused connection fails we retry once on a fresh one.
+        reused = self.conn is not None
+
+        try:
+            return self._send(body, headers)
+        except (ConnectionError, HTTPException):
+            self.close()
+            if not reused:
+                raise
+        return self._send(body, headers)
+
+    def _send(self, body, headers):
+        if self.conn is None:
+            self.conn = self._connect()
+        self.conn.request("POST", self.path, body, headers)
+        # the connection forgets its socket when the response closes the connection, so it's kept
+        # here in case a read of the response has to be interrupted
+        self.sock = self.conn.sock
+        return self.conn.getresponse()
+
+    def _interrupt(self, resp):
+        """
+        _interrupt shuts down the socket of unfinished response `resp`, so a decode thread blocked reading it wakes up. The connection is discarded afterwards.
+        """
+        if resp.isclosed() or self.sock is None:
+            return
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _connect(self):
+        if self.proxy is None:
+            if self.scheme == "https":
+                return HTTPSConnection(self.host, self.port, timeout=self.timeout)
+            return HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+        proxy = urlsplit(self.proxy)
+        if proxy.scheme == "https":
+            conn = HTTPSConnection(proxy.hostname, proxy.port, timeout=self.timeout)
+        else:
+            conn = HTTPConnection(proxy.hostname, proxy.port, timeout=self.timeout)
+        if self.scheme == "https":
+            conn.set_tunnel(self.host, self.port)
+        return conn
+
+
+def _proxy_for(url) -> Optional[str]:
+    # honor the same proxy environment variables as urllib
+    proxy = getproxies().get(url.scheme)
+    if proxy is None or proxy_bypass(url.hostname):
+        return None
+    if "://" not in proxy:
+        proxy = "http://" + proxy
+    return proxy
@@ -0,0 +1,314 @@
+"""
+Streaming decompression of responses and files. gzip is always supported. zstd and brotli
+require the optional zstandard and brotli packages, which can be installed using:
+
+pip3 install sage-data-client[zstd,brotli]
+"""
+import gzip
+import io
+from pathlib import Path
+from queue import Queue
+from threading import Event, Thread
+import time
+import zlib
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import Callable, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# size of compressed reads and of the decoded chunks handed between threads
+CHUNK_SIZE = 1 << 18
+
+# number of decoded chunks the background thread may read ahead of the consumer
+PREFETCH_CHUNKS = 8
+
+SUFFIX_ENCODINGS = {
+    ".gz": "gzip",
+    ".zst": "zstd",
+    ".br": "br",
+}
+
+
+def accept_encoding() -> str:
+    """
+    accept_encoding returns the Accept-Encoding header value listing supported encodings in order of preference.
+    """
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return ", ".join(encodings)
+
+
+def path_encoding(path) -> str:
+    """
+    path_encoding returns the content encoding of a file based on its suffix, or "identity" if it's not compressed.
+    """
+    return SUFFIX_ENCODINGS.get(Path(path).suffix, "identity")
+
+
+def decode(fileobj, encoding: str, threaded: bool = False, stats=None, interrupt: Optional[Callable[[], None]] = None):
+    """
+    decode returns a buffered binary file like object which decompresses `fileobj` using content encoding `encoding`.
+
+    When `threaded` is True, reading and decompressing run in a background thread which stays a few
+    chunks ahead of the consumer, so network transfer, decompression and parsing overlap. zlib and
+    zstandard release the GIL while decompressing, so this uses a second core.
+
+    When `stats` is a profiling.QueryStats, compressed bytes and decompression time are added to it.
+
+    Closing the returned file doesn't close `fileobj`. When `threaded` is True, `interrupt` is
+    called if the background thread is still running on close, so it can unblock a read of
+    `fileobj` which may not return for a long time, for example by shutting down a socket.
+    """
+    encoding = encoding.strip().lower()
+
+    if encoding in ("", "identity"):
+        raw = _Source(fileobj)
+    elif encoding in ("gzip", "x-gzip"):
+        raw = _Decoder(fileobj, _GzipDecompressor(), stats)
+    elif encoding == "zstd":
+        _require("zstd", zstandard, "zstandard", "zstd")
+        raw = _Decoder(fileobj, _ZstdDecompressor(), stats)
+    elif encoding == "br":
+        _require("brotli", brotli, "brotli", "brotli")
+        raw = _Decoder(fileobj, brotli.Decompressor(), stats)
+    else:
+        raise ValueError(f"unsupported content encoding {encoding!r}")
+
+    if stats is not None:
+        stats.encoding = encoding
+
+    if threaded:
+        raw = _Prefetch(raw, interrupt)
+
+    return io.BufferedReader(raw, CHUNK_SIZE)
+
+
+def create(path, encoding: Optional[str] = None):
+    """
+    create opens `path` for writing and returns a binary file like object which compresses data using content encoding `encoding`, default: None (based on the path's suffix)
+
+    Paths ending in .gz, .zst or .br are compressed using gzip, zstd or brotli. Other paths aren't compressed.
+    """
+    if encoding is None:
+        encoding = path_encoding(path)
+
+    if encoding == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    if encoding == "zstd":
+        _require("zstd", zstandard, "zstandard", "zstd")
+        return zstandard.open(path, "wb")
+    if encoding == "br":
+        _require("brotli", brotli, "brotli", "brotli")
+        return io.BufferedWriter(_BrotliWriter(open(path, "wb")), CHUNK_SIZE)
+    return open(path, "wb")
+
+
+class _BrotliWriter(io.RawIOBase):
+    """
+    _BrotliWriter compresses the data written to it into a file, which it closes when it's closed.
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.c = brotli.Compressor()
+
+    def writable(self):
+        return True
+
+    def write(self, data) -> int:
+        self.fileobj.write(self.c.process(bytes(data)))
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self.fileobj.write(self.c.finish())
+            self.fileobj.close()
+        super().close()
+
+
+class _Source(io.RawIOBase):
+    """
+    _Source reads chunks from a file like object without taking ownership of it.
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.buffer = b""
+        self.offset = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while self.offset >= len(self.buffer):
+            chunk = self.read_chunk()
+            if not chunk:
+                return 0
+            self.buffer = chunk
+            self.offset = 0
+        n = min(len(b), len(self.buffer) - self.offset)
+        b[:n] = self.buffer[self.offset : self.offset + n]
+        self.offset += n
+        return n
+
+    def read_chunk(self) -> bytes:
+        return self.fileobj.read(CHUNK_SIZE)
+
+
+class _Decoder(_Source):
+    """
+    _Decoder decompresses chunks read from a file like object using a decompressor with a `decompress` or `process` method.
+    """
+
+    def __init__(self, fileobj, decompressor, stats=None):
+        super().__init__(fileobj)
+        self.decompressor = decompressor
+        self.decompress = getattr(decompressor, "decompress", None) or decompressor.process
+        self.eof = False
+        self.stats = stats
+
+    def read_chunk(self) -> bytes:
+        # compressed chunks may decode to nothing, so keep reading until there's output or eof
+        while not self.eof:
+            data = self.fileobj.read(CHUNK_SIZE)
+            if not data:
+                self.eof = True
+                flush = getattr(self.decompressor, "flush", None)
+                return flush() if flush is not None else b""
+            if self.stats is None:
+                chunk = self.decompress(data)
+            else:
+                start = time.perf_counter()
+                chunk = self.decompress(data)
+                self.stats.decompressed(len(data), time.perf_counter() - start)
+            if chunk:
+                return chunk
+        return b""
+
+
+class _GzipDecompressor:
+    """
+    _GzipDecompressor decompresses gzip data consisting of one or more concatenated members, like GzipFile.
+    """
+
+    def __init__(self):
+        self.d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self.started = False
+
+    def decompress(self, data: bytes) -> bytes:
+        self.started = True
+        chunks = [self.d.decompress(data)]
+        while self.d.eof and self.d.unused_data:
+            data = self.d.unused_data
+            self.d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            chunks.append(self.d.decompress(data))
+        return b"".join(chunks)
+
+    def flush(self) -> bytes:
+        if self.started and not self.d.eof:
+            raise EOFError("compressed file ended before the end-of-stream marker was reached")
+        return b""
+
+
+class _ZstdDecompressor:
+    """
+    _ZstdDecompressor decompresses zstd data consisting of one or more concatenated frames.
+    """
+
+    def __init__(self):
+        self.d = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data: bytes) -> bytes:
+        chunks = [self.d.decompress(data)]
+        while self.d.eof and self.d.unused_data:
+            data = self.d.unused_data
+            self.d = zstandard.ZstdDecompressor().decompressobj()
+            chunks.append(self.d.decompress(data))
+        return b"".join(chunks)
+
+
+class _Prefetch(io.RawIOBase):
+    """
+    _Prefetch reads chunks from a _Source in a background thread into a bounded queue.
+    """
+
+    def __init__(self, source, interrupt=None):
+        self.source = source
+        self.interrupt = interrupt
+        self.queue = Queue(PREFETCH_CHUNKS)
+        self.stopped = Event()
+        self.buffer = b""
+        self.offset = 0
+        self.done = False
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while self.offset >= len(self.buffer):
+            if self.done:
+                return 0
+            chunk = self.queue.get()
+            if isinstance(chunk, BaseException):
+                self.done = True
+                raise chunk
+            if not chunk:
+                self.done = True
+                return 0
+            self.buffer = chunk
+            self.offset = 0
+        n = min(len(b), len(self.buffer) - self.offset)
+        b[:n] = self.buffer[self.offset : self.offset + n]
+        self.offset += n
+        return n
+
+    def close(self):
+        if not self.closed:
+            self.stopped.set()
+            self._drain()
+            # the background thread may be blocked reading the source, which can take until the
+            # next chunk arrives or the read times out, so it's interrupted before joining
+            if self.thread.is_alive() and self.interrupt is not None:
+                self.interrupt()
+            # unblock the background thread if it's waiting for space in the queue
+            while self.thread.is_alive():
+                self._drain()
+                self.thread.join(0.01)
+        super().close()
+
+    def _drain(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    def _run(self):
+        try:
+            while not self.stopped.is_set():
+                chunk = self.source.read_chunk()
+                self.queue.put(chunk)
+                if not chunk:
+                    return
+        except BaseException as exc:
+            self.queue.put(exc)
+
+
+def _require(encoding, module, package, extra):
+    if module is None:
+        raise ImportError(
+            f"{package} is required for {encoding} support. it can be installed using: pip3 install sage-data-client[{extra}]"
+        )
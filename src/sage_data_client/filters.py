@@ -0,0 +1,151 @@
+from functools import lru_cache
+import json
+import re
+import numpy as np
+import pandas as pd
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import Callable, Dict, Optional, Tuple
+
+
+def is_pattern(value: str) -> bool:
+    """
+    is_pattern returns whether filter value `value` uses `*` wildcards or `|` alternatives rather than matching exactly.
+    """
+    return "*" in value or "|" in value
+
+
+@lru_cache(maxsize=1024)
+def compile_pattern(value: str):
+    """
+    compile_pattern compiles filter value `value` into a regular expression which must match a full field.
+
+    `*` matches any sequence of characters and `|` separates alternatives. All other characters match literally.
+    """
+    return re.compile(
+        "|".join(".*".join(re.escape(part) for part in alt.split("*")) for alt in value.split("|"))
+    )
+
+
+def filter_key_column(key: str) -> str:
+    """
+    filter_key_column returns the data frame column matched by filter key `key`.
+    """
+    return "name" if key == "name" else f"meta.{key}"
+
+
+def match_frame(df: pd.DataFrame, filter: Dict[str, str]) -> np.ndarray:
+    """
+    match_frame returns a boolean mask of the rows of `df` matched by `filter` using the same semantics as the data API.
+    """
+    mask = np.ones(len(df), dtype=bool)
+
+    for key, value in filter.items():
+        col = filter_key_column(key)
+
+        if col not in df.columns:
+            return np.zeros(len(df), dtype=bool)
+
+        s = df[col]
+
+        if is_pattern(value):
+            matched = s.str.fullmatch(compile_pattern(value).pattern, na=False)
+        else:
+            matched = s == value
+
+        mask &= np.asarray(matched, dtype=bool)
+
+    return mask
+
+
+def record_matcher(filter: Dict[str, str]) -> Callable[[dict], bool]:
+    """
+    record_matcher returns a function which returns whether a parsed record is matched by `filter` using the same semantics as the data API.
+    """
+    tests = []
+
+    for key, value in filter.items():
+        if is_pattern(value):
+            tests.append((key, compile_pattern(value).fullmatch))
+        else:
+            tests.append((key, value.__eq__))
+
+    def match(record) -> bool:
+        meta = record.get("meta") or {}
+        for key, test in tests:
+            v = record.get("name") if key == "name" else meta.get(key)
+            if not isinstance(v, str) or not test(v):
+                return False
+        return True
+
+    return match
+
+
+def line_prefilter(filter: Dict[str, str]) -> Optional[Callable]:
+    """
+    line_prefilter returns a function which cheaply rejects raw NDJSON lines which can't be matched by `filter` before they're parsed, or None if no such check can be derived.
+
+    The check only looks for text which every matching line must contain, so lines it accepts must still be checked using `record_matcher`.
+    """
+    groups = []
+
+    for value in filter.values():
+        needles = _required_text(value)
+        if needles is not None:
+            groups.append(needles)
+
+    if len(groups) == 0:
+        return None
+
+    # the common case of exact values and single patterns only needs one substring test per key
+    if all(len(g) == 1 for g in groups):
+        needles = [g[0] for g in groups]
+        needles_bytes = [n.encode() for n in needles]
+
+        def check(line) -> bool:
+            for n in needles_bytes if isinstance(line, bytes) else needles:
+                if n not in line:
+                    return False
+            return True
+
+        return check
+
+    groups_bytes = [tuple(n.encode() for n in g) for g in groups]
+
+    def check(line) -> bool:
+        for g in groups_bytes if isinstance(line, bytes) else groups:
+            for n in g:
+                if n in line:
+                    break
+            else:
+                return False
+        return True
+
+    return check
+
+
+def _required_text(value: str) -> Optional[Tuple[str, ...]]:
+    """
+    _required_text returns JSON encoded text one of which must appear in any line whose field matches `value`.
+    """
+    needles = []
+
+    for alt in value.split("|"):
+        parts = alt.split("*")
+        # characters which encoders may escape differently can't be searched for reliably
+        if any(not _is_plain(part) for part in parts):
+            return None
+        parts[0] = '"' + parts[0]
+        parts[-1] = parts[-1] + '"'
+        needle = max(parts, key=len)
+        if len(needle) < 2:
+            return None
+        needles.append(needle)
+
+    return tuple(needles)
+
+
+def _is_plain(text: str) -> bool:
+    # json.dumps escapes quotes, backslashes, control and non-ascii characters. some encoders also
+    # escape <, > and & for safe embedding in html.
+    return json.dumps(text)[1:-1] == text and not any(c in text for c in "<>&")
@@ -0,0 +1,222 @@
+import numpy as np
+import pandas as pd
+from .aggregation import PARTIALS, _ns, _window_ns
+from .client import DEFAULT_ENDPOINT, Client
+from .query import query_many
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import Dict, Optional, Sequence, Union
+
+
+def join(
+    frames_or_filters: Dict[str, Union[pd.DataFrame, Dict[str, str]]],
+    on: str = "timestamp",
+    by: Sequence[str] = ("meta.vsn",),
+    how: str = "asof",
+    tolerance=None,
+    direction: str = "nearest",
+    func: str = "mean",
+    start=None,
+    end=None,
+    endpoint: str = DEFAULT_ENDPOINT,
+    bucket: Optional[str] = None,
+    client: Optional[Client] = None,
+) -> pd.DataFrame:
+    """
+    join aligns the values of many labeled query results by time within each group of `by` columns and returns them as a wide data frame.
+
+    Results are long format data frames, like those returned by `query`. Labels which are filters
+    are queried over `start` and `end` using `query_many`. The records of every label are grouped
+    and aligned together in a single vectorized pass, rather than per group.
+
+    Parameters
+    ----------
+    frames_or_filters : dictionary of labels to data frames or query filters, required
+
+    on : name of the time column, default: "timestamp"
+
+    by : names of the columns to group records by, default: ("meta.vsn",)
+        Only records in the same group are aligned. Records without a column are in the group with a missing value.
+
+    how : how records are aligned, "asof" or "window", default: "asof"
+        "asof" matches each record of the first label with the record of each other label in the
+        same group which is nearest in time. "window" computes `func` over the numeric values of
+        each label in fixed windows of time.
+
+    tolerance : for "asof", the longest time between matched records, default: None (no limit)
+        For "window", the length of each window, which is required. Windows are aligned to the Unix epoch in UTC.
+        Durations can be a string like "30s", "5m" or "1h", or a timedelta.
+
+    direction : for "asof", whether to match the "nearest", latest "backward" or earliest "forward" record, default: "nearest"
+
+    func : for "window", aggregation function, one of "mean", "sum", "count", "min" or "max", default: "mean"
+
+    start : query start time, required when querying filters
+
+    end : query end time, default: None (now)
+
+    endpoint : url of query api, default: "https://data.sagecontinuum.org/api/v1/query"
+
+    bucket: name of bucket to query
+
+    client : Client used to send requests, default: None (shared client for `endpoint`)
+
+    Returns
+    -------
+    result : pandas.DataFrame
+        The data frame is indexed by the `by` columns and `on`, sorted, and has a column of values
+        for each label. Records of other labels without a match, or windows without any numeric
+        values, are NaN. For "asof", the index has an entry for each record of the first label.
+
+    Examples
+    --------
+
+    Aligning pressure and humidity with each temperature record from the same node
+
+    ```python
+    import sage_data_client
+
+    df = sage_data_client.join(
+        {
+            "temperature": {"name": "env.temperature", "sensor": "bme680"},
+            "pressure": {"name": "env.pressure", "sensor": "bme680"},
+            "humidity": {"name": "env.relative_humidity", "sensor": "bme680"},
+        },
+        start="-1h",
+        by=["meta.vsn"],
+        how="asof",
+        tolerance="30s",
+    )
+
+    print(df.groupby("meta.vsn").corr())
+    ```
+    """
+    if how not in ("asof", "window"):
+        raise ValueError(f"unsupported how {how!r}. must be one of ('asof', 'window')")
+    if how == "asof" and direction not in ("nearest", "backward", "forward"):
+        raise ValueError(f"unsupported direction {direction!r}. must be one of ('nearest', 'backward', 'forward')")
+    if how == "window":
+        if func not in PARTIALS:
+            raise ValueError(f"unsupported func {func!r}. must be one of {tuple(PARTIALS)}")
+        if tolerance is None:
+            raise ValueError("tolerance is required for window joins")
+    if len(frames_or_filters) == 0:
+        raise ValueError("at least one frame or filter is required")
+
+    by = list(by)
+    tolerance_ns = _duration_ns(tolerance) if tolerance is not None else None
+
+    frames = _frames(frames_or_filters, start, end, endpoint, bucket, client)
+    labels = list(frames)
+
+    # groups are numbered across all labels at once, so the alignment only compares integers
+    groups, codes = _groups([frames[label] for label in labels], by)
+    times = [_ns(frames[label][on]) if len(frames[label]) > 0 else np.empty(0, dtype=np.int64) for label in labels]
+    values = [frames[label]["value"].to_numpy() if len(frames[label]) > 0 else np.empty(0) for label in labels]
+
+    if how == "asof":
+        result = _asof(labels, codes, times, values, tolerance_ns, direction)
+    else:
+        result = _window(labels, codes, times, values, tolerance_ns, func)
+
+    group = result.pop("group").to_numpy()
+    time = pd.DatetimeIndex(pd.to_datetime(result.pop("time").to_numpy(), unit="ns", utc=True))
+
+    if by:
+        keys = groups.take(group)
+        arrays = [keys.get_level_values(i) for i in range(len(by))] + [time]
+        result.index = pd.MultiIndex.from_arrays(arrays, names=by + [on])
+    else:
+        result.index = time.rename(on)
+
+    # values are labeled by position while aligning, so labels can't collide with the key columns
+    result.columns = labels
+    return result
+
+
+def _frames(frames_or_filters, start, end, endpoint, bucket, client) -> Dict[str, pd.DataFrame]:
+    filters = {label: f for label, f in frames_or_filters.items() if not isinstance(f, pd.DataFrame)}
+
+    if filters:
+        if start is None:
+            raise ValueError("start is required when joining filters")
+        results = query_many(filters, start=start, end=end, endpoint=endpoint, bucket=bucket, client=client)
+    else:
+        results = {}
+
+    return {label: results[label] if label in filters else f for label, f in frames_or_filters.items()}
+
+
+def _groups(frames, by):
+    """
+    _groups returns the sorted distinct values of the `by` columns across all frames and each frame's group numbers.
+    """
+    sizes = [len(df) for df in frames]
+
+    if not by:
+        return None, [np.zeros(n, dtype=np.int64) for n in sizes]
+
+    def column(df, col):
+        if col in df.columns:
+            # categories differ between frames, so they're combined as plain values
+            return df[col].astype(object)
+        return pd.Series(np.nan, index=df.index, dtype=object)
+
+    keys = pd.concat(
+        [pd.DataFrame({col: column(df, col) for col in by}) for df in frames],
+        ignore_index=True,
+    )
+    grouped = keys.groupby(by, sort=True, dropna=False)
+    codes = grouped.ngroup().to_numpy(dtype=np.int64)
+    groups = grouped.size().index
+    if not isinstance(groups, pd.MultiIndex):
+        groups = pd.MultiIndex.from_arrays([groups], names=by)
+
+    return groups, np.split(codes, np.cumsum(sizes)[:-1])
+
+
+def _asof(labels, codes, times, values, tolerance_ns, direction) -> pd.DataFrame:
+    def sorted_frame(i):
+        df = pd.DataFrame({"group": codes[i], "time": times[i], i: values[i]})
+        return df.sort_values("time", kind="stable", ignore_index=True)
+
+    result = sorted_frame(0)
+
+    for i in range(1, len(labels)):
+        result = pd.merge_asof(
+            result,
+            sorted_frame(i),
+            on="time",
+            by="group",
+            tolerance=tolerance_ns,
+            direction=direction,
+        )
+
+    return result.sort_values(["group", "time"], kind="stable", ignore_index=True)
+
+
+def _window(labels, codes, times, values, window_ns, func) -> pd.DataFrame:
+    # only numeric values are aggregated. other values are ignored.
+    numeric = [pd.to_numeric(pd.Series(v), errors="coerce").to_numpy(dtype=float) for v in values]
+    long = pd.DataFrame(
+        {
+            "group": np.concatenate(codes),
+            "time": np.concatenate(times) // window_ns * window_ns,
+            "label": np.repeat(np.arange(len(labels)), [len(v) for v in values]),
+            "value": np.concatenate(numeric),
+        }
+    )
+    long = long[long.value.notna()]
+
+    result = long.groupby(["group", "time", "label"], sort=True).value.agg(func).unstack("label")
+    result = result.reindex(columns=range(len(labels))).astype(float)
+    return result.reset_index()
+
+
+def _duration_ns(d) -> int:
+    if isinstance(d, str):
+        return _window_ns(d)
+    value = pd.Timedelta(d).value
+    if value <= 0:
+        raise ValueError("tolerance must be positive")
+    return value
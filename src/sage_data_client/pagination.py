@@ -0,0 +1,379 @@
+"""
+Estimating the size of query results and splitting large queries into pages of bounded size.
+
+The estimate comes from small probe requests for the first and last few records of each series.
+Series with fewer records than asked for are counted exactly. The rest are interpolated from the
+spacing of their first and last records. Pages are planned from the estimated rate of records
+and adjusted as pages arrive, so dense parts of the time range get shorter pages.
+"""
+from io import BytesIO
+import logging
+import numpy as np
+import pandas as pd
+from . import compression, profiling
+from .client import DEFAULT_ENDPOINT, Client, default_client
+from .query import _build_query, _concat, _fetch, _load, _load_iter, _query_iter
+from .timeparse import NS_PER_SECOND, NS_PER_US, format_ns, parse_ns
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import Callable, Dict, Iterator, Optional
+
+# number of records of each series requested by the probe
+DEFAULT_PROBE = 10
+
+# pages are never shorter than this, even if records are denser than max_rows per page
+MIN_PAGE_NS = NS_PER_SECOND
+
+# pages are at most this many times longer than the previous page, in case records become denser
+MAX_PAGE_GROWTH = 4
+
+logger = logging.getLogger("sage_data_client")
+
+
+class Estimate:
+    """
+    Estimate is the estimated size of a query's results.
+
+    Attributes
+    ----------
+    rows : estimated number of records
+
+    bytes : estimated size of the uncompressed response in bytes
+
+    series : number of series with records in the time range
+
+    exact : whether every series was fully counted, so `rows` is exact
+    """
+
+    __slots__ = ("rows", "bytes", "series", "exact")
+
+    def __init__(self, rows: int, bytes: int, series: int, exact: bool):
+        self.rows = rows
+        self.bytes = bytes
+        self.series = series
+        self.exact = exact
+
+    def __repr__(self):
+        return f"Estimate(rows={self.rows}, bytes={self.bytes}, series={self.series}, exact={self.exact})"
+
+
+def estimate(
+    start,
+    end=None,
+    filter: Optional[Dict[str, str]] = None,
+    endpoint: str = DEFAULT_ENDPOINT,
+    bucket: Optional[str] = None,
+    client: Optional[Client] = None,
+    probe: int = DEFAULT_PROBE,
+) -> Estimate:
+    """
+    estimate estimates the number of records and size of the results of a query without fetching them.
+
+    The first `probe` records of each series are requested and, when some series have more, the
+    last `probe` records. See the Parameters section of the `query` function for the other parameters.
+
+    Examples
+    --------
+
+    ```python
+    import sage_data_client
+
+    est = sage_data_client.estimate(start="-30d", filter={"name": "env.*"})
+    print(f"about {est.rows} records and {est.bytes / 1e9:.1f} GB")
+    ```
+    """
+    if client is None:
+        client = default_client(endpoint)
+
+    q = _build_query(start=start, end=end if end is not None else "now", filter=filter, bucket=bucket)
+    est, _ = _probe(client, q, probe)
+    return est
+
+
+def paginate(
+    start,
+    end=None,
+    filter: Optional[Dict[str, str]] = None,
+    max_rows: int = 1000000,
+    endpoint: str = DEFAULT_ENDPOINT,
+    bucket: Optional[str] = None,
+    client: Optional[Client] = None,
+    categorical: bool = False,
+    progress: Optional[Callable[[int, int, float], None]] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    paginate splits a query into consecutive time windows of about `max_rows` records each and yields a data frame per page.
+
+    The size of the results is estimated first using `estimate`. Results which fit in a single
+    page are requested at once.
+
+    Parameters
+    ----------
+    See the Parameters section of the `query` function. Additionally:
+
+    max_rows : target number of records per page, default: 1000000
+        Pages are planned from estimated rates, so some pages may be larger.
+
+    progress : function called with the number of records received so far, the estimated total and the fraction of the time range done after each page, default: None
+        See `log_progress`.
+
+    Examples
+    --------
+
+    ```python
+    import sage_data_client
+
+    for df in sage_data_client.paginate(start="-30d", filter={"name": "env.temperature"}, progress=sage_data_client.log_progress):
+        print(df.groupby("meta.vsn").value.mean())
+    ```
+    """
+    _check_max_rows(max_rows)
+
+    if client is None:
+        client = default_client(endpoint)
+
+    q = _build_query(start=start, end=end if end is not None else "now", filter=filter, bucket=bucket)
+    return _pages(client, q, max_rows, progress, {"categorical": categorical})
+
+
+def query_to_file(
+    path,
+    start,
+    end=None,
+    filter: Optional[Dict[str, str]] = None,
+    max_rows: int = 1000000,
+    endpoint: str = DEFAULT_ENDPOINT,
+    bucket: Optional[str] = None,
+    client: Optional[Client] = None,
+    progress: Optional[Callable[[int, int, float], None]] = None,
+) -> int:
+    """
+    query_to_file streams the results of a query to an NDJSON file at `path` in pages of about `max_rows` records and returns the number of records written.
+
+    Responses are written as they're received without being parsed, so memory use stays small
+    regardless of the size of the results. Paths ending in .gz, .zst or .br are compressed. The
+    file can be read using `load`, `load_iter` or `load_many`.
+
+    See the Parameters section of the `paginate` function.
+
+    Examples
+    --------
+
+    ```python
+    import sage_data_client
+
+    sage_data_client.query_to_file("env.ndjson.gz", start="-30d", filter={"name": "env.*"}, progress=sage_data_client.log_progress)
+
+    for df in sage_data_client.load_iter("env.ndjson.gz"):
+        print(df.groupby("name").value.mean())
+    ```
+    """
+    _check_max_rows(max_rows)
+
+    if client is None:
+        client = default_client(endpoint)
+
+    q = _build_query(start=start, end=end if end is not None else "now", filter=filter, bucket=bucket)
+
+    with compression.create(path) as out:
+        return _write_pages(client, q, max_rows, progress, out)
+
+
+def log_progress(rows: int, total: int, fraction: float):
+    """
+    log_progress is a progress function which logs the progress of a paginated query to the "sage_data_client" logger at INFO level.
+    """
+    logger.info("received %d of about %d records, %.0f%% of time range", rows, total, 100 * fraction)
+
+
+def _pages(client, q, max_rows, progress, options) -> Iterator[pd.DataFrame]:
+    est, data = _probe(client, q, DEFAULT_PROBE)
+
+    # the probe already holds every record when each series had fewer than the probe size
+    if est.exact:
+        df = _load(BytesIO(data), **options)
+        _done(progress, len(df))
+        yield df
+        return
+
+    pages = _Pages(q, est, max_rows, progress)
+
+    for page in pages:
+        df = _fetch(client, page, options)
+        pages.add(len(df))
+        yield df
+
+
+def _iter_pages(client, q, max_rows, progress, chunksize, options) -> Iterator[pd.DataFrame]:
+    est, data = _probe(client, q, DEFAULT_PROBE)
+
+    if est.exact:
+        yield from _load_iter(BytesIO(data), chunksize, **options)
+        _done(progress, est.rows)
+        return
+
+    pages = _Pages(q, est, max_rows, progress)
+
+    for page in pages:
+        rows = 0
+        for df in _query_iter(client, page, chunksize, options):
+            rows += len(df)
+            yield df
+        pages.add(rows)
+
+
+def _write_pages(client, q, max_rows, progress, out) -> int:
+    """
+    _write_pages writes the raw responses of the pages of query `q` to binary file like object `out` and returns the number of records written.
+    """
+    est, data = _probe(client, q, DEFAULT_PROBE)
+
+    if est.exact:
+        out.write(data)
+        _done(progress, est.rows)
+        return est.rows
+
+    pages = _Pages(q, est, max_rows, progress)
+    rows = 0
+
+    for page in pages:
+        n = 0
+        with client.open(page) as f:
+            for chunk in iter(lambda: f.read(compression.CHUNK_SIZE), b""):
+                out.write(chunk)
+                n += chunk.count(b"\n")
+        pages.add(n)
+        rows += n
+
+    return rows
+
+
+def _query_pages(client, q, max_rows, progress, options) -> pd.DataFrame:
+    frames = [df for df in _pages(client, q, max_rows, progress, options) if len(df) > 0]
+    if len(frames) == 0:
+        return _load(BytesIO(b""), **options)
+    if len(frames) == 1:
+        return frames[0]
+    return _concat(frames)
+
+
+def _check_max_rows(max_rows):
+    if max_rows < 1:
+        raise ValueError("max_rows must be at least 1")
+
+
+def _done(progress, rows):
+    if progress is not None:
+        progress(rows, rows, 1.0)
+
+
+def _probe(client, q, probe):
+    """
+    _probe estimates the size of the results of query `q` and returns the Estimate and the probe's response.
+
+    The first `probe` records of each series are requested. If any series has more, the last
+    `probe` records are also requested, and the records between them are estimated from the rates
+    at both ends, so series which become denser or sparser over time are estimated better.
+    """
+    data, head = _probe_request(client, dict(q, head=probe))
+
+    if len(head) == 0:
+        return Estimate(0, 0, 0, True), data
+
+    keys = _series_keys(head)
+    counts = head.groupby(keys, dropna=False).size()
+
+    if (counts < probe).all():
+        return Estimate(len(head), len(data), len(counts), True), data
+
+    _, tail = _probe_request(client, dict(q, tail=probe))
+
+    keys += [c for c in _series_keys(tail) if c not in keys]
+    head = head.reindex(columns=keys + ["timestamp"])
+    tail = tail.reindex(columns=keys + ["timestamp"])
+
+    h = _spans(head, keys)
+    t = _spans(tail, keys).reindex(h.index)
+    unique = pd.concat([head, tail]).drop_duplicates().groupby(keys, dropna=False).size().reindex(h.index)
+
+    size = h["size"].to_numpy(dtype=np.float64)
+    tail_size = t["size"].fillna(0).to_numpy(dtype=np.float64)
+    head_rate = (size - 1) / np.maximum(h["max"].to_numpy() - h["min"].to_numpy(), 1)
+    tail_rate = (tail_size - 1) / np.maximum(t["max"].to_numpy() - t["min"].to_numpy(), 1)
+    gap = t["min"].to_numpy() - h["max"].to_numpy()
+
+    rows = np.where(
+        size < probe,
+        size,
+        # when head and tail overlap, every record of the series was seen. otherwise, the mean of
+        # the rates overestimates series with bursts, which errs towards smaller pages.
+        np.where(gap > 0, size + tail_size + gap * (head_rate + tail_rate) / 2, unique.to_numpy()),
+    )
+    rows = int(np.nan_to_num(rows).sum())
+
+    return Estimate(rows, int(rows * len(data) / len(head)), len(h), False), data
+
+
+def _probe_request(client, q):
+    with profiling.record("query", q) as stats:
+        with client.open(q, stats) as f:
+            data = f.read()
+        return data, _load(BytesIO(data), stats=stats)
+
+
+def _series_keys(df):
+    return [c for c in df.columns if c == "name" or c.startswith("meta.")]
+
+
+def _spans(df, keys) -> pd.DataFrame:
+    ts = df.assign(timestamp=pd.DatetimeIndex(df.timestamp).asi8)
+    return ts.groupby(keys, dropna=False).timestamp.agg(["size", "min", "max"])
+
+
+class _Pages:
+    """
+    _Pages iterates over the query bodies of consecutive pages. The number of records received
+    for each page must be passed to `add` before the next page is planned.
+    """
+
+    def __init__(self, q, est, max_rows, progress=None):
+        self.q = q
+        self.start = parse_ns(q["start"])
+        self.end = parse_ns(q["end"])
+        self.total = est.rows
+        self.max_rows = max_rows
+        self.progress = progress
+        self.rate = est.rows / max(self.end - self.start, 1)
+        self.rows = 0
+        self.cursor = self.start
+        self.stop = self.start
+        self.span = None  # type: Optional[int]
+
+    def __iter__(self) -> Iterator[dict]:
+        while self.cursor < self.end:
+            if self.rate > 0:
+                span = max(int(self.max_rows / self.rate), MIN_PAGE_NS)
+            else:
+                span = self.end - self.cursor
+            if self.span is not None:
+                span = min(span, self.span * MAX_PAGE_GROWTH)
+
+            # page edges are rounded to microseconds as that is the precision of query times
+            stop = min(self.cursor + span, self.end)
+            stop = max(stop - stop % NS_PER_US, self.cursor + NS_PER_US)
+            stop = min(stop, self.end)
+
+            self.stop = stop
+            self.span = stop - self.cursor
+            yield dict(self.q, start=format_ns(self.cursor), end=format_ns(stop))
+            self.cursor = stop
+
+    def add(self, rows: int):
+        self.rows += rows
+        # smoothed, so an empty page doesn't make the next page unbounded
+        self.rate = (rows + 1) / self.span
+        # the remaining records are reestimated from the latest rate
+        self.total = self.rows + int(self.rate * (self.end - self.stop))
+
+        if self.progress is not None:
+            self.progress(self.rows, self.total, (self.stop - self.start) / max(self.end - self.start, 1))
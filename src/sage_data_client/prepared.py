@@ -0,0 +1,143 @@
+import json
+from .client import DEFAULT_ENDPOINT, Client, default_client
+from .timeparse import format_ns, parse_ns
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import Dict, Iterator, Optional
+
+
+class Query:
+    """
+    Query is a query request which is built and serialized once, so it can be sent many times
+    without repeating that work. Creating a Query doesn't import pandas.
+
+    Relative times are resolved when the Query is created.
+
+    Parameters
+    ----------
+    See the Parameters section of the `query` function for `start`, `end`, `head`, `tail`,
+    `filter`, `bucket`, `experimental_func` and `experimental_window`.
+
+    Attributes
+    ----------
+    body : dictionary sent as the request body. It must not be modified.
+
+    data : serialized request body
+
+    Examples
+    --------
+
+    ```python
+    import sage_data_client
+
+    q = sage_data_client.Query(
+        start="2023-01-01T00:00:00Z",
+        end="2023-01-02T00:00:00Z",
+        filter={"name": "env.temperature", "vsn": "W023"},
+    )
+
+    with sage_data_client.Client() as client:
+        for _ in range(3):
+            df = q.run(client=client)
+    ```
+    """
+
+    __slots__ = ("body", "data")
+
+    def __init__(
+        self,
+        start,
+        end=None,
+        head: Optional[int] = None,
+        tail: Optional[int] = None,
+        filter: Optional[Dict[str, str]] = None,
+        bucket: Optional[str] = None,
+        experimental_func: Optional[str] = None,
+        experimental_window: Optional[str] = None,
+    ):
+        self.body = _build_query(
+            start=start,
+            end=end,
+            head=head,
+            tail=tail,
+            filter=filter,
+            bucket=bucket,
+            experimental_func=experimental_func,
+            experimental_window=experimental_window,
+        )
+        self.data = json.dumps(self.body, separators=(",", ":")).encode()
+
+    def run(
+        self,
+        endpoint: str = DEFAULT_ENDPOINT,
+        client: Optional[Client] = None,
+        categorical: bool = False,
+        format: str = "pandas",
+    ):
+        """
+        run sends the query and returns the results in a data frame.
+
+        See the Parameters section of the `query` function for `endpoint`, `client`, `categorical` and `format`.
+        """
+        from .query import _check_format, _fetch
+
+        _check_format(format)
+
+        if client is None:
+            client = default_client(endpoint)
+
+        return _fetch(client, self, {"categorical": categorical, "format": format})
+
+    def iter(
+        self,
+        chunksize: int = 100000,
+        endpoint: str = DEFAULT_ENDPOINT,
+        client: Optional[Client] = None,
+        categorical: bool = False,
+    ) -> Iterator:
+        """
+        iter sends the query and incrementally yields the results as data frames of at most `chunksize` records.
+
+        See the Parameters section of the `query_iter` function.
+        """
+        from .query import _check_chunksize, _query_iter
+
+        _check_chunksize(chunksize)
+
+        if client is None:
+            client = default_client(endpoint)
+
+        return _query_iter(client, self, chunksize, {"categorical": categorical})
+
+    def __repr__(self):
+        return f"Query({self.data.decode()})"
+
+
+def _build_query(
+    start,
+    end=None,
+    head=None,
+    tail=None,
+    filter=None,
+    bucket=None,
+    experimental_func=None,
+    experimental_window=None,
+) -> dict:
+    if head is not None and tail is not None:
+        raise ValueError("only one of `head` or `tail` can be provided")
+    q = {"start": format_ns(parse_ns(start))}
+    if end is not None:
+        q["end"] = format_ns(parse_ns(end))
+    if filter is not None:
+        q["filter"] = filter
+    if head is not None:
+        q["head"] = head
+    elif tail is not None:
+        q["tail"] = tail
+    if experimental_func is not None:
+        q["experimental_func"] = experimental_func
+    if experimental_window is not None:
+        q["experimental_window"] = experimental_window
+    if bucket is not None:
+        q["bucket"] = bucket
+    return q
@@ -0,0 +1,392 @@
+"""
+Opt-in instrumentation of queries and loads. When no hooks are registered, none of the stages
+are timed, so instrumentation has no cost unless it's used.
+"""
+from collections import deque
+from contextlib import contextmanager
+import json
+import logging
+from threading import Lock
+import time
+import tracemalloc
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+# stages in the order they happen. stage times are exclusive, so time spent reading within the
+# parse stage is only counted as read.
+STAGES = (
+    "request",  # connecting, sending the request and waiting for the response headers
+    "read",  # waiting for response or file bytes, including decompression which isn't overlapped
+    "decompress",  # decompressing, which usually runs in a background thread overlapping other stages
+    "parse",  # decoding and filtering json records
+    "timestamps",  # converting timestamps
+    "frame",  # building the data frame or arrow table
+)
+
+logger = logging.getLogger("sage_data_client")
+
+_hooks = []  # type: List[Callable]
+_hooks_lock = Lock()
+
+
+class QueryStats:
+    """
+    QueryStats holds the measurements of a single query request or load.
+
+    Attributes
+    ----------
+    kind : "query" or "load"
+
+    source : query body for queries or path for loads
+
+    started : unix time the operation started
+
+    duration : number of seconds the operation took
+
+    stages : dictionary of stage names to number of seconds. see `STAGES`.
+
+    encoding : content encoding of the response or file, like "gzip" or "identity"
+
+    bytes_read : number of bytes transferred or read from disk, before decompression
+
+    bytes_decoded : number of bytes after decompression
+
+    rows : number of records returned
+
+    peak_memory : peak number of bytes allocated by Python during the operation, or None if not traced
+        This is only measured while tracemalloc is tracing, for example when using `profile(trace_memory=True)`.
+        It's approximate when several operations run concurrently.
+
+    error : name of the exception which ended the operation, or None
+    """
+
+    def __init__(self, kind: str, source=None):
+        self.kind = kind
+        self.source = source
+        self.started = time.time()
+        self.duration = 0.0
+        self.stages = {}  # type: Dict[str, float]
+        self.encoding = "identity"
+        self.bytes_read = 0
+        self.bytes_decoded = 0
+        self.rows = 0
+        self.peak_memory = None  # type: Optional[int]
+        self.error = None  # type: Optional[str]
+        self._nested = 0.0
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        stage times the enclosed block as stage `name`, excluding time spent in nested stages.
+        """
+        start = time.perf_counter()
+        outer, self._nested = self._nested, 0.0
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.add(name, elapsed - self._nested)
+            self._nested = outer + elapsed
+
+    def lines(self, fileobj) -> Iterator[bytes]:
+        """
+        lines yields the lines of `fileobj`, timing reads as the read stage and counting decoded bytes.
+        """
+        readlines = getattr(fileobj, "readlines", None)
+        if readlines is None:
+            yield from fileobj
+            return
+
+        while True:
+            start = time.perf_counter()
+            lines = readlines(1 << 16)
+            elapsed = time.perf_counter() - start
+            self.add("read", elapsed)
+            self._nested += elapsed
+            if not lines:
+                return
+            self.bytes_decoded += sum(map(len, lines))
+            yield from lines
+
+    def decompressed(self, size: int, seconds: float):
+        # called by the decompression thread. the fields it updates are only read once the
+        # decompressor has been closed.
+        self.bytes_read += size
+        self.add("decompress", seconds)
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "source": self.source,
+            "started": self.started,
+            "duration": self.duration,
+            "stages": {s: self.stages[s] for s in STAGES if s in self.stages},
+            "encoding": self.encoding,
+            "bytes_read": self.bytes_read,
+            "bytes_decoded": self.bytes_decoded,
+            "rows": self.rows,
+            "peak_memory": self.peak_memory,
+            "error": self.error,
+        }
+
+    def __repr__(self):
+        stages = ", ".join(f"{s}={self.stages[s]:.3f}s" for s in STAGES if s in self.stages)
+        return f"QueryStats(kind={self.kind!r}, duration={self.duration:.3f}s, rows={self.rows}, {stages})"
+
+
+class Profiler:
+    """
+    Profiler collects the QueryStats of queries and loads and keeps running totals which can be
+    exported as Prometheus counters.
+
+    A Profiler is a hook, so it can be registered for the lifetime of a process using `add_hook`,
+    or for a block of code using `profile`.
+
+    Parameters
+    ----------
+    keep : number of most recent QueryStats kept in `records`, default: 1000
+
+    Examples
+    --------
+
+    ```python
+    import sage_data_client
+
+    profiler = sage_data_client.Profiler()
+    sage_data_client.add_hook(profiler)
+
+    df = sage_data_client.query(start="-1h", filter={"name": "env.temperature"})
+
+    print(profiler.summary())
+    print(profiler.to_prometheus())
+    ```
+    """
+
+    def __init__(self, keep: int = 1000):
+        self.records = deque(maxlen=keep)
+        self._totals = {}  # type: Dict[str, dict]
+        self._lock = Lock()
+
+    def __call__(self, stats: QueryStats):
+        with self._lock:
+            self.records.append(stats)
+            totals = self._totals.setdefault(
+                stats.kind,
+                {
+                    "count": 0,
+                    "errors": 0,
+                    "duration": 0.0,
+                    "stages": {},
+                    "bytes_read": 0,
+                    "bytes_decoded": 0,
+                    "rows": 0,
+                    "peak_memory": 0,
+                },
+            )
+            totals["count"] += 1
+            totals["errors"] += stats.error is not None
+            totals["duration"] += stats.duration
+            for s, seconds in stats.stages.items():
+                totals["stages"][s] = totals["stages"].get(s, 0.0) + seconds
+            totals["bytes_read"] += stats.bytes_read
+            totals["bytes_decoded"] += stats.bytes_decoded
+            totals["rows"] += stats.rows
+            totals["peak_memory"] = max(totals["peak_memory"], stats.peak_memory or 0)
+
+    def summary(self):
+        """
+        summary returns a data frame with a row for each of the kept QueryStats and a column for each stage.
+        """
+        import pandas as pd
+
+        with self._lock:
+            records = list(self.records)
+
+        rows = []
+        for r in records:
+            d = r.to_dict()
+            stages = d.pop("stages")
+            d.pop("source")
+            for s in STAGES:
+                d[s] = stages.get(s, 0.0)
+            rows.append(d)
+
+        columns = ["kind", "started", "duration", *STAGES, "encoding", "bytes_read", "bytes_decoded", "rows", "peak_memory", "error"]
+        return pd.DataFrame(rows, columns=columns)
+
+    def to_prometheus(self, prefix: str = "sage_data_client") -> str:
+        """
+        to_prometheus returns the running totals in the Prometheus text exposition format.
+        """
+        with self._lock:
+            totals = {kind: dict(t, stages=dict(t["stages"])) for kind, t in self._totals.items()}
+
+        metrics = [
+            ("operations_total", "counter", "Number of queries and loads.", lambda t: t["count"]),
+            ("errors_total", "counter", "Number of queries and loads which raised an exception.", lambda t: t["errors"]),
+            ("duration_seconds_total", "counter", "Total duration of queries and loads.", lambda t: t["duration"]),
+            ("bytes_read_total", "counter", "Bytes transferred or read before decompression.", lambda t: t["bytes_read"]),
+            ("bytes_decoded_total", "counter", "Bytes after decompression.", lambda t: t["bytes_decoded"]),
+            ("rows_total", "counter", "Records returned.", lambda t: t["rows"]),
+            ("peak_memory_bytes", "gauge", "Largest traced peak memory of a single operation.", lambda t: t["peak_memory"]),
+        ]
+
+        lines = []
+
+        for name, type, help, value in metrics:
+            lines.append(f"# HELP {prefix}_{name} {help}")
+            lines.append(f"# TYPE {prefix}_{name} {type}")
+            for kind, t in sorted(totals.items()):
+                lines.append(f'{prefix}_{name}{{kind="{kind}"}} {value(t)}')
+
+        name = f"{prefix}_stage_seconds_total"
+        lines.append(f"# HELP {name} Total time spent in each stage of queries and loads.")
+        lines.append(f"# TYPE {name} counter")
+        for kind, t in sorted(totals.items()):
+            for s in STAGES:
+                if s in t["stages"]:
+                    lines.append(f'{name}{{kind="{kind}",stage="{s}"}} {t["stages"][s]}')
+
+        return "\n".join(lines) + "\n"
+
+
+def add_hook(hook: Callable[[QueryStats], None]):
+    """
+    add_hook registers `hook` to be called with the QueryStats of each query request and load once it completes.
+
+    Hooks are called from the thread which ran the operation, so they should be quick and thread safe.
+    Files loaded by `load_many` are loaded in worker processes and aren't reported.
+    """
+    with _hooks_lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[QueryStats], None]):
+    """
+    remove_hook unregisters a hook added by `add_hook`.
+    """
+    with _hooks_lock:
+        _hooks.remove(hook)
+
+
+def log_hook(stats: QueryStats):
+    """
+    log_hook is a hook which logs each QueryStats as a JSON object to the "sage_data_client" logger at INFO level.
+    """
+    logger.info("%s", json.dumps(stats.to_dict(), default=str))
+
+
+@contextmanager
+def profile(trace_memory: bool = False):
+    """
+    profile yields a Profiler which collects the QueryStats of queries and loads made in any thread while the block runs.
+
+    Parameters
+    ----------
+    trace_memory : whether to measure the peak memory of each operation using tracemalloc, default: False
+        Tracing memory slows down Python allocations considerably, so it's best used while investigating.
+
+    Examples
+    --------
+
+    ```python
+    import sage_data_client
+
+    with sage_data_client.profile() as profiler:
+        df = sage_data_client.query(start="-1h", filter={"name": "env.temperature"})
+
+    for stats in profiler.records:
+        print(stats)
+    ```
+    """
+    profiler = Profiler()
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+
+    if started_tracing:
+        tracemalloc.start()
+
+    add_hook(profiler)
+    try:
+        yield profiler
+    finally:
+        remove_hook(profiler)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+@contextmanager
+def record(kind: str, source=None):
+    """
+    record yields a new QueryStats for the enclosed block which is passed to each hook once it exits.
+
+    None is yielded when no hooks are registered, so callers only pay for instrumentation when it's used.
+    """
+    if not _hooks:
+        yield None
+        return
+
+    stats = QueryStats(kind, source)
+
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        baseline = tracemalloc.get_traced_memory()[0]
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+    try:
+        yield stats
+    except BaseException as exc:
+        stats.error = type(exc).__name__
+        raise
+    finally:
+        stats.duration = time.perf_counter() - start
+        if tracing and tracemalloc.is_tracing():
+            stats.peak_memory = max(tracemalloc.get_traced_memory()[1] - baseline, 0)
+        if stats.encoding == "identity":
+            stats.bytes_read = stats.bytes_decoded
+        _emit(stats)
+
+
+def stage(stats: Optional[QueryStats], name: str):
+    """
+    stage returns a context manager timing the enclosed block as stage `name` of `stats`, or doing nothing if `stats` is None.
+    """
+    if stats is None:
+        return _null_stage
+    return stats.stage(name)
+
+
+def lines(stats: Optional[QueryStats], fileobj):
+    """
+    lines returns the lines of `fileobj`, timing reads and counting bytes in `stats` if it isn't None.
+    """
+    if stats is None:
+        return fileobj
+    return stats.lines(fileobj)
+
+
+def _emit(stats):
+    with _hooks_lock:
+        hooks = list(_hooks)
+    for hook in hooks:
+        try:
+            hook(stats)
+        except Exception:
+            logger.exception("profiling hook %r failed", hook)
+
+
+class _NullStage:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_null_stage = _NullStage()
@@ -1,23 +1,31 @@
-from gzip import GzipFile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+import glob
+from io import BytesIO
+from itertools import islice
 import json
+from math import nan
+import os
 from pathlib import Path
-from urllib.request import urlopen, Request
+import numpy as np
 import pandas as pd
+from . import arrow, compression, profiling, timeparse
+from .client import Client, default_client
+from .filters import line_prefilter, match_frame, record_matcher
+from .prepared import Query, _build_query
+from .series import SeriesTable, _from_records, _values
 
 # NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterable, Iterator, List, Union
 
 
-def resolve_time(t):
-    try:
-        return pd.to_datetime(t)
-    except (TypeError, ValueError):
-        pass
-    return pd.to_datetime("now", utc=True) + pd.to_timedelta(t)
+def resolve_time(t) -> pd.Timestamp:
+    return pd.Timestamp(timeparse.parse_ns(t), unit="ns", tz="UTC")
 
 
 def timestr(t):
-    return t.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    return timeparse.format_ns(timeparse.parse_ns(t))
 
 
 def query(
@@ -30,6 +38,13 @@ def query(
     bucket: Optional[str] = None,
     experimental_func: Optional[str] = None,
     experimental_window: Optional[str] = None,
+    shards: int = 1,
+    cache=None,
+    client: Optional[Client] = None,
+    categorical: bool = False,
+    format: str = "pandas",
+    max_rows: Optional[int] = None,
+    progress=None,
 ) -> pd.DataFrame:
     """
     query makes a query request to the data API and returns the results in a data frame.
@@ -56,6 +71,33 @@ def query(
 
     experimental_window : aggregation window to apply function over.
 
+    shards : number of time windows to split the query into and fetch concurrently, default: 1
+        When greater than 1, the time range is split into `shards` equal sub windows which are
+        requested in parallel and combined into a single data frame ordered by timestamp. `head`
+        and `tail` still apply per series across the full time range.
+
+    cache : QueryCache or RangeCache used to store and reuse results, default: None
+        See the `QueryCache` and `RangeCache` classes for which queries are cached.
+
+    client : Client used to send requests, default: None (shared client for `endpoint`)
+
+    categorical : whether to return compact categorical columns, default: False
+        See the Parameters section of the `load` function for more details.
+
+    format : "pandas", "arrow" or "series", default: "pandas"
+        When "arrow", the results are returned as a pyarrow.Table built directly from the response.
+        When "series", the results are returned as a SeriesTable, which stores the name and meta
+        fields of each series once instead of for each record.
+
+    max_rows : target number of records per request, default: None (single request)
+        When set, the size of the results is estimated using a small probe request and the time
+        range is split into pages of about `max_rows` records which are requested one at a time.
+        This keeps requests for very large results from timing out. It can't be used with
+        `head`, `tail`, `experimental_func` or `shards`. See the `paginate` function.
+
+    progress : function called after each page when using `max_rows`, default: None
+        See the `paginate` function.
+
     Returns
     -------
     result : pandas.DataFrame
@@ -88,44 +130,439 @@ def query(
     # print stats of the temperature data grouped by node + sensor.
     print(df.groupby(["meta.node", "meta.sensor"]).value.agg(["size", "min", "max", "mean"]))
     ```
+
+    Fetching a long time range as 8 concurrent requests
+
+    ```python
+    import sage_data_client
+
+    df = sage_data_client.query(
+        start="2023-01-01T00:00:00Z",
+        end="2023-02-01T00:00:00Z",
+        filter={
+            "name": "env.temperature",
+            "vsn": "W023",
+        },
+        shards=8,
+    )
+    ```
     """
-    # build query
-    q = {"start": timestr(resolve_time(start))}
-    if end is not None:
-        q["end"] = timestr(resolve_time(end))
-    if filter is not None:
-        q["filter"] = filter
-    if head is not None and tail is not None:
-        raise ValueError("only one of `head` or `tail` can be provided")
-    elif head is not None:
-        q["head"] = head
-    elif tail is not None:
-        q["tail"] = tail
-    if experimental_func is not None:
-        q["experimental_func"] = experimental_func
-    if experimental_window is not None:
-        q["experimental_window"] = experimental_window
-    if bucket is not None:
-        q["bucket"] = bucket
-
-    data = json.dumps(q).encode()
-    headers = {"Accept-Encoding": "gzip"}
-    req = Request(endpoint, data, headers=headers)
-
-    with urlopen(req) as f:
-        content_encoding = f.headers.get("Content-Encoding", "")
-        if "gzip" in content_encoding:
-            f = GzipFile(fileobj=f, mode="rb")
-        return load(f)
-
-
-def load(path_or_buf) -> pd.DataFrame:
+    if shards < 1:
+        raise ValueError("shards must be at least 1")
+
+    _check_format(format)
+
+    if max_rows is not None:
+        _check_paginated(max_rows, shards, head, tail, experimental_func)
+        # pages are planned over a fixed time range
+        if end is None:
+            end = "now"
+
+    q = _build_query(
+        start=start,
+        end=end,
+        head=head,
+        tail=tail,
+        filter=filter,
+        bucket=bucket,
+        experimental_func=experimental_func,
+        experimental_window=experimental_window,
+    )
+
+    if client is None:
+        client = default_client(endpoint)
+
+    options = {"categorical": categorical}
+
+    # sharded and cached results are combined as data frames before conversion
+    if format != "pandas" and shards == 1 and cache is None and max_rows is None:
+        return _fetch(client, q, dict(options, format=format))
+
+    def fetch(q):
+        if max_rows is not None:
+            from .pagination import _query_pages
+
+            return _query_pages(client, q, max_rows, progress, options)
+        if shards > 1:
+            return _query_shards(client, q, shards, options)
+        return _fetch(client, q, options)
+
+    if cache is not None:
+        df = cache.fetch(client.endpoint, q, fetch, historical=_is_historical(start, end), options=options)
+    else:
+        df = fetch(q)
+
+    return _convert(df, format)
+
+
+def _fetch(client, q, options) -> pd.DataFrame:
+    with profiling.record("query", _body(q)) as stats:
+        with client.open(q, stats) as f:
+            return _load(f, stats=stats, **options)
+
+
+def _query_shards(client, q, shards, options) -> pd.DataFrame:
+    start, end = _query_window(q)
+
+    queries = [
+        dict(q, start=timestr(start), end=timestr(end))
+        for start, end in _split_window(start, end, shards)
+    ]
+
+    # requests are I/O bound and _load spends much of its time in json / pandas routines, so
+    # threads let us overlap network transfer with parsing of other shards. threads beyond the
+    # client's pool would only wait for a connection.
+    with ThreadPoolExecutor(max_workers=max(1, min(len(queries), client.pool_size))) as executor:
+        frames = list(executor.map(lambda q: _fetch(client, q, options), queries))
+
+    return _merge_shards(frames, head=q.get("head"), tail=q.get("tail"))
+
+
+def _check_paginated(max_rows, shards, head, tail, experimental_func):
+    if max_rows < 1:
+        raise ValueError("max_rows must be at least 1")
+    if shards > 1 or head is not None or tail is not None or experimental_func is not None:
+        raise ValueError("max_rows can't be used with shards, head, tail or experimental_func")
+
+
+def _body(q) -> dict:
+    return q.body if isinstance(q, Query) else q
+
+
+def _split_window(start, end, n):
+    if end <= start:
+        return [(start, end)]
+    # shard edges are rounded to microseconds as that is the precision used by timestr
+    edges = [(start + (end - start) * i / n).floor("us") for i in range(n)] + [end]
+    return [(a, b) for a, b in zip(edges, edges[1:]) if a < b]
+
+
+def _merge_shards(frames, head=None, tail=None) -> pd.DataFrame:
+    frames = [df for df in frames if len(df) > 0]
+
+    if len(frames) == 0:
+        return _Columns().to_frame()
+
+    df = _concat(frames)
+    df.sort_values("timestamp", kind="stable", inplace=True, ignore_index=True)
+
+    # head and tail were applied per shard by the server, so reapply them across all shards
+    if head is not None or tail is not None:
+        by = ["name"] + [c for c in df.columns if c.startswith("meta.")]
+        groups = df.groupby(by, sort=False, dropna=False)
+        df = groups.head(head) if head is not None else groups.tail(tail)
+        df.reset_index(drop=True, inplace=True)
+
+    return df
+
+
+def _concat(frames) -> pd.DataFrame:
+    df = pd.concat(frames, ignore_index=True)
+
+    # concat only keeps categorical dtypes when all frames have identical categories, so
+    # restore them for columns which were categorical in the inputs.
+    categorical = {
+        c for frame in frames for c, dtype in frame.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)
+    }
+    for c in categorical:
+        if not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+
+    return df
+
+
+def _query_window(q):
+    start = _utc(q["start"])
+    end = _utc(q["end"]) if "end" in q else pd.Timestamp.now(tz="UTC")
+    return start, end
+
+
+def _is_historical(start, end) -> bool:
+    return (
+        timeparse.is_absolute(start)
+        and end is not None
+        and timeparse.is_absolute(end)
+        and timeparse.parse_ns(end) <= timeparse.parse_ns("now")
+    )
+
+
+def _utc(t) -> pd.Timestamp:
+    t = pd.Timestamp(t)
+    if t.tzinfo is None:
+        return t.tz_localize("UTC")
+    return t.tz_convert("UTC")
+
+
+def query_iter(
+    start,
+    end=None,
+    head: Optional[int] = None,
+    tail: Optional[int] = None,
+    filter: Optional[Dict[str, str]] = None,
+    endpoint: str = "https://data.sagecontinuum.org/api/v1/query",
+    bucket: Optional[str] = None,
+    experimental_func: Optional[str] = None,
+    experimental_window: Optional[str] = None,
+    chunksize: int = 100000,
+    client: Optional[Client] = None,
+    categorical: bool = False,
+    max_rows: Optional[int] = None,
+    progress=None,
+) -> Iterator[pd.DataFrame]:
+    """
+    query_iter makes a query request to the data API and incrementally yields the results as data frames of at most `chunksize` records.
+
+    The response is parsed as it is streamed, so memory use is bounded by `chunksize` rather than the size of the response.
+
+    Parameters
+    ----------
+    See the Parameters section of the `query` function. Additionally:
+
+    chunksize : maximum number of records in each data frame, default: 100000
+
+    client : Client used to send requests, default: None (shared client for `endpoint`)
+
+    categorical : whether to return compact categorical columns, default: False
+
+    max_rows : target number of records per request, default: None (single request)
+        When set, the results are requested in pages of about `max_rows` records, which are
+        each streamed in chunks. See the `query` function.
+
+    progress : function called after each page when using `max_rows`, default: None
+
+    Returns
+    -------
+    result : iterator of pandas.DataFrame
+        Each data frame has the same columns as those returned by `load`. Chunks only include meta
+        columns for fields which appear in that chunk's records.
+
+    Examples
+    --------
+
+    Computing the mean temperature by node without loading the full response at once
+
+    ```python
+    import sage_data_client
+
+    sums = None
+
+    for df in sage_data_client.query_iter(start="-1d", filter={"name": "env.temperature"}, chunksize=10000):
+        s = df.groupby("meta.vsn").value.agg(["size", "sum"])
+        sums = s if sums is None else sums.add(s, fill_value=0)
+
+    print(sums["sum"] / sums["size"])
+    ```
+    """
+    if max_rows is not None:
+        _check_paginated(max_rows, 1, head, tail, experimental_func)
+        if end is None:
+            end = "now"
+
+    q = _build_query(
+        start=start,
+        end=end,
+        head=head,
+        tail=tail,
+        filter=filter,
+        bucket=bucket,
+        experimental_func=experimental_func,
+        experimental_window=experimental_window,
+    )
+
+    _check_chunksize(chunksize)
+
+    if client is None:
+        client = default_client(endpoint)
+
+    if max_rows is not None:
+        from .pagination import _iter_pages
+
+        return _iter_pages(client, q, max_rows, progress, chunksize, {"categorical": categorical})
+
+    return _query_iter(client, q, chunksize, {"categorical": categorical})
+
+
+def _query_iter(client, q, chunksize, options) -> Iterator[pd.DataFrame]:
+    with profiling.record("query", _body(q)) as stats:
+        with client.open(q, stats) as f:
+            yield from _load_iter(f, chunksize, stats=stats, **options)
+
+
+def query_many(
+    filters: Dict[str, Dict[str, str]],
+    start,
+    end=None,
+    head: Optional[int] = None,
+    tail: Optional[int] = None,
+    endpoint: str = "https://data.sagecontinuum.org/api/v1/query",
+    bucket: Optional[str] = None,
+    shards: int = 1,
+    cache=None,
+    client: Optional[Client] = None,
+    coalesce: bool = True,
+    categorical: bool = False,
+) -> Dict[str, pd.DataFrame]:
+    """
+    query_many makes queries for many labeled filters over the same time range using as few requests as possible and returns a data frame per label.
+
+    Filters which only differ by `name` are coalesced into a single request using a `|` separated
+    name pattern. The combined response is then split back out by label client side.
+
+    Parameters
+    ----------
+    filters : dictionary of labels to dictionaries of query filters, required
+
+    coalesce : whether to combine compatible filters into a single request, default: True
+        When False, one request is made per filter.
+
+    See the Parameters section of the `query` function for the remaining parameters.
+
+    Returns
+    -------
+    result : dictionary of labels to pandas.DataFrame
+        Each data frame contains the records matched by that label's filter, as if it was queried on its own.
+
+    Examples
+    --------
+
+    ```python
+    import sage_data_client
+
+    results = sage_data_client.query_many(
+        {
+            "temperature": {"name": "env.temperature", "vsn": "W023", "sensor": "bme680"},
+            "pressure": {"name": "env.pressure", "vsn": "W023", "sensor": "bme680"},
+            "humidity": {"name": "env.relative_humidity", "vsn": "W023", "sensor": "bme680"},
+        },
+        start="2022-01-10T00:00:00Z",
+        end="2022-01-11T00:00:00Z",
+    )
+
+    print(results["temperature"])
+    ```
+    """
+    if client is None:
+        client = default_client(endpoint)
+
+    if coalesce:
+        plan = _plan_query_many(filters)
+    else:
+        plan = [(filter, [label]) for label, filter in filters.items()]
+
+    def run(filter):
+        return query(
+            start=start,
+            end=end,
+            head=head,
+            tail=tail,
+            filter=filter or None,
+            bucket=bucket,
+            shards=shards,
+            cache=cache,
+            client=client,
+            categorical=categorical,
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(plan), client.pool_size))) as executor:
+        frames = list(executor.map(run, [filter for filter, _ in plan]))
+
+    results = {}
+
+    for (_, labels), df in zip(plan, frames):
+        for label in labels:
+            if len(labels) == 1:
+                results[label] = df
+            else:
+                results[label] = _select(df, filters[label] or {})
+
+    return {label: results[label] for label in filters}
+
+
+def _plan_query_many(filters):
+    groups = {}
+
+    for label, filter in filters.items():
+        filter = filter or {}
+        key = json.dumps({k: v for k, v in filter.items() if k != "name"}, sort_keys=True)
+        groups.setdefault(key, []).append((label, filter))
+
+    plan = []
+
+    for items in groups.values():
+        labels = [label for label, _ in items]
+        filter = dict(items[0][1])
+
+        if len(items) > 1:
+            names = [f.get("name") for _, f in items]
+            # a filter without a name matches every name, so the combined request must as well
+            if None in names:
+                filter.pop("name", None)
+            else:
+                filter["name"] = "|".join(dict.fromkeys(names))
+
+        plan.append((filter, labels))
+
+    return plan
+
+
+def _select(df, filter) -> pd.DataFrame:
+    df = df[match_frame(df, filter)]
+
+    if len(df) == 0:
+        return _Columns().to_frame()
+
+    # drop meta columns which only appeared in records for other filters
+    empty = [c for c in df.columns if c.startswith("meta.") and df[c].isna().all()]
+    df = df.drop(columns=empty).reset_index(drop=True)
+
+    for c, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            df[c] = df[c].cat.remove_unused_categories()
+
+    return df
+
+
+def load(
+    path_or_buf,
+    categorical: bool = False,
+    engine: str = "python",
+    format: str = "pandas",
+    filter: Optional[Dict[str, str]] = None,
+    start=None,
+    end=None,
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
     """
     load reads a path or file like object containing a response from the data api and returns the results in a data frame.
 
     Parameters
     ----------
-    path_or_buf : path like or file like object
+    path_or_buf : path like or file like object, or directory written by `download`
+
+    categorical : whether to return compact categorical columns, default: False
+        When True, `name` and all meta columns use the pandas `category` dtype and `value` is
+        converted to float64 when all values are numbers. Repeated strings are only stored once,
+        which greatly reduces memory use and speeds up operations like groupby.
+
+    engine : "python" or "pyarrow", default: "python"
+        Parser used for NDJSON responses. The "pyarrow" engine uses the pyarrow JSON reader and
+        falls back to the "python" engine for responses it can't represent, like mixed types.
+
+    format : "pandas", "arrow" or "series", default: "pandas"
+        When "arrow", the results are returned as a pyarrow.Table. When "series", the results are
+        returned as a SeriesTable. See the `SeriesTable` class for more details.
+
+    filter : dictionary of query filters applied to records, default: None
+        Filters use the same semantics as the data API, including `*` and `|` patterns. With the
+        "python" engine, lines are checked for the text required by the filter before being
+        parsed, so records which can't match are skipped cheaply.
+
+    start : only include records at or after this time, default: None
+
+    end : only include records before this time, default: None
+
+    columns : list of columns to include like ["timestamp", "value", "meta.vsn"], default: None (all columns)
+        With the "python" engine, meta fields which aren't included are never expanded into columns.
 
     Returns
     -------
@@ -140,6 +577,10 @@ def load(path_or_buf) -> pd.DataFrame:
 
         Metadata fields like "node" and "vsn" are stored in columns named "meta.node" or "meta.vsn".
 
+    Paths ending in .gz are decompressed. Paths ending in .parquet, .feather or .arrow are read as
+    files written by `save`. These are memory mapped instead of parsed, which requires pyarrow.
+    Directories written by `download` are read as the combined records of their shards, in time order.
+
     Examples
     --------
 
@@ -156,48 +597,625 @@ def load(path_or_buf) -> pd.DataFrame:
     # print number of results of each name
     print(df.groupby(["meta.node", "name"]).size())
     ```
+
+    Loading only the rain gauge records for a single node from a large file
+
+    ```python
+    import sage_data_client
+
+    df = sage_data_client.load(
+        "data.ndjson.gz",
+        filter={"name": "env.raingauge.*", "vsn": "W023"},
+        columns=["timestamp", "name", "value"],
+    )
+    ```
     """
-    if isinstance(path_or_buf, str):
-        if path_or_buf.endswith(".gz"):
-            with GzipFile(path_or_buf, "rb") as f:
-                return _load(f)
-        else:
-            with open(path_or_buf, "rb") as f:
-                return _load(f)
+    _check_format(format)
+
+    if engine not in ("python", "pyarrow"):
+        raise ValueError(f"unsupported engine {engine!r}. must be one of ('python', 'pyarrow')")
+
+    meta = _meta_keys(columns)
+    start = _utc(resolve_time(start)) if start is not None else None
+    end = _utc(resolve_time(end)) if end is not None else None
+
+    source = str(path_or_buf) if isinstance(path_or_buf, (str, Path)) else None
 
-    if isinstance(path_or_buf, Path):
-        if path_or_buf.suffix == ".gz":
-            with GzipFile(path_or_buf, "rb") as f:
-                return _load(f)
+    with profiling.record("load", source) as stats:
+        if _is_dir(path_or_buf):
+            result = _load_dir(path_or_buf, categorical, engine, format, filter, start, end, columns, meta, stats)
         else:
-            with open(path_or_buf, "rb") as f:
-                return _load(f)
+            result = _load_path(path_or_buf, categorical, engine, format, filter, start, end, columns, meta, stats)
+        if stats is not None:
+            stats.rows = len(result)
+        return result
 
-    return _load(path_or_buf)
 
+def _load_path(path_or_buf, categorical, engine, format, filter, start, end, columns, meta, stats):
+    restricted = filter or start is not None or end is not None or columns is not None
 
-def _load_row(r):
-    input = json.loads(r)
-    output = {}
-    output["timestamp"] = pd.to_datetime(input["timestamp"], unit="ns", utc=True)
-    output["name"] = input["name"]
-    output["value"] = input["value"]
-    for k, v in input["meta"].items():
-        output[f"meta.{k}"] = v
-    return output
+    if arrow.is_arrow_path(path_or_buf):
+        with profiling.stage(stats, "read"):
+            table = arrow.read_table(path_or_buf)
+        if not restricted:
+            if format == "arrow":
+                return table
+            with profiling.stage(stats, "frame"):
+                return _convert(arrow.table_to_frame(table, categorical=categorical), format)
+        with profiling.stage(stats, "frame"):
+            df = arrow.table_to_frame(table, categorical=categorical)
+        df = _restrict(df, filter, start, end)
+    else:
+        with _open(path_or_buf, stats) as f:
+            if not restricted:
+                if engine == "pyarrow":
+                    return _load_pyarrow(f, categorical=categorical, format=format, stats=stats)
+                return _load(f, categorical=categorical, format=format, stats=stats)
+            if engine == "pyarrow":
+                df = _load_pyarrow(f, categorical=categorical, format="pandas", stats=stats)
+                df = _restrict(df, filter, start, end)
+            else:
+                df = _load_restricted(f, filter or None, start, end, meta, {"categorical": categorical}, stats=stats)
 
+    df = _project(df, columns)
 
-def _load(fileobj) -> pd.DataFrame:
-    df = pd.DataFrame(map(_load_row, fileobj))
+    if format == "pandas":
+        return df
+
+    with profiling.stage(stats, "frame"):
+        return _convert(df, format)
+
+
+def _load_dir(path, categorical, engine, format, filter, start, end, columns, meta, stats):
+    from .bulk import _shard_paths
+
+    frames = []
+
+    for shard in _shard_paths(path):
+        df = _load_path(shard, categorical, engine, "pandas", filter, start, end, columns, meta, stats)
+        if len(df) > 0:
+            frames.append(df)
+
+    if len(frames) == 0:
+        df = _project(_new_columns(categorical).to_frame(), columns)
+    elif len(frames) == 1:
+        df = frames[0]
+    else:
+        df = _concat(frames)
+
+    if format == "pandas":
+        return df
+
+    with profiling.stage(stats, "frame"):
+        return _convert(df, format)
+
+
+def _is_dir(path_or_buf) -> bool:
+    return isinstance(path_or_buf, (str, Path)) and os.path.isdir(path_or_buf)
 
-    # if dataframe is empty, return empty with known columns
-    if len(df) == 0:
-        return pd.DataFrame(
-            {
-                "timestamp": pd.to_datetime([], utc=True),
-                "name": pd.Series([], dtype=str),
-                "value": [],
-            }
-        )
 
+def _convert(df, format):
+    if format == "arrow":
+        return arrow.frame_to_table(df)
+    if format == "series":
+        return SeriesTable.from_frame(df)
     return df
+
+
+def _load_restricted(fileobj, filter, start, end, meta, options, chunksize=100000, stats=None) -> pd.DataFrame:
+    """
+    _load_restricted loads the records matching filter, start and end in chunks, so memory use is proportional to the number of matching records.
+    """
+    frames = []
+
+    for df in _load_iter(fileobj, chunksize, filter=filter, meta=meta, stats=stats, **options):
+        df = _restrict(df, None, start, end)
+        if len(df) > 0:
+            frames.append(df)
+
+    if len(frames) == 0:
+        return _new_columns(**options).to_frame()
+    if len(frames) == 1:
+        return frames[0]
+    return _concat(frames)
+
+
+def _restrict(df, filter, start, end) -> pd.DataFrame:
+    mask = np.ones(len(df), dtype=bool)
+    if filter:
+        mask &= match_frame(df, filter)
+    if start is not None:
+        mask &= (df.timestamp >= start).to_numpy()
+    if end is not None:
+        mask &= (df.timestamp < end).to_numpy()
+    if mask.all():
+        return df
+    return df[mask].reset_index(drop=True)
+
+
+def _meta_keys(columns) -> Optional[List[str]]:
+    if columns is None:
+        return None
+    for c in columns:
+        if c not in ("timestamp", "name", "value") and not c.startswith("meta."):
+            raise ValueError(f"unsupported column {c!r}. must be timestamp, name, value or meta.*")
+    return [c[len("meta.") :] for c in columns if c.startswith("meta.")]
+
+
+def _project(df, columns) -> pd.DataFrame:
+    if columns is None:
+        return df
+    return df[[c for c in columns if c in df.columns]]
+
+
+def _load_pyarrow(fileobj, categorical, format, stats=None):
+    with profiling.stage(stats, "read"):
+        data = fileobj.read()
+
+    with profiling.stage(stats, "parse"):
+        table = arrow.read_ndjson(data)
+
+    if table is None:
+        return _load(BytesIO(data), categorical=categorical, format=format, stats=stats)
+
+    if stats is not None:
+        stats.bytes_decoded += len(data)
+
+    with profiling.stage(stats, "frame"):
+        if format == "arrow":
+            return arrow._dictionary_encode(table)
+        return _convert(arrow.table_to_frame(table, categorical=categorical), format)
+
+
+def _check_format(format):
+    if format not in ("pandas", "arrow", "series"):
+        raise ValueError(f"unsupported format {format!r}. must be one of ('pandas', 'arrow', 'series')")
+
+
+def load_iter(path_or_buf, chunksize: int = 100000, categorical: bool = False) -> Iterator[pd.DataFrame]:
+    """
+    load_iter reads a path or file like object containing a response from the data api and incrementally yields the results as data frames of at most `chunksize` records.
+
+    Parameters
+    ----------
+    path_or_buf : path like or file like object, or directory written by `download`
+
+    chunksize : maximum number of records in each data frame, default: 100000
+
+    categorical : whether to return compact categorical columns, default: False
+        Categories are built separately for each chunk.
+
+    Returns
+    -------
+    result : iterator of pandas.DataFrame
+        Each data frame has the same columns as those returned by `load`. Chunks only include meta
+        columns for fields which appear in that chunk's records.
+
+    Examples
+    --------
+
+    Counting records by name in a large compressed file
+
+    ```python
+    import sage_data_client
+
+    counts = None
+
+    for df in sage_data_client.load_iter("data.ndjson.gz", chunksize=10000):
+        c = df.groupby("name").size()
+        counts = c if counts is None else counts.add(c, fill_value=0)
+
+    print(counts)
+    ```
+    """
+    _check_chunksize(chunksize)
+    return _load_path_iter(path_or_buf, chunksize, {"categorical": categorical})
+
+
+def load_many(
+    paths: Union[str, Path, Iterable],
+    workers: Optional[int] = None,
+    filter: Optional[Dict[str, str]] = None,
+    start=None,
+    end=None,
+    categorical: bool = False,
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    load_many reads many files containing responses from the data api in parallel and returns the combined results in a data frame.
+
+    Files are decompressed and parsed in a pool of processes, so loading scales with the number of
+    cores. Records which don't match `filter`, `start` and `end` are dropped while each file is
+    parsed, so only matching records are kept in memory and sent back from the workers.
+
+    Parameters
+    ----------
+    paths : glob pattern like "exports/*.ndjson.gz", path like or iterable of either
+        Patterns are expanded and sorted by name. "**" matches any number of directories.
+        Directories written by `download` are expanded to their shards.
+
+    workers : number of processes used to load files, default: None (number of cores)
+        When 1, files are loaded in the calling process.
+
+    filter : dictionary of query filters applied to records, default: None
+        Filters use the same semantics as the data API, including `*` and `|` patterns.
+
+    start : only include records at or after this time, default: None
+
+    end : only include records before this time, default: None
+
+    categorical : whether to return compact categorical columns, default: False
+
+    columns : list of columns to include like ["timestamp", "value", "meta.vsn"], default: None (all columns)
+
+    Returns
+    -------
+    result : pandas.DataFrame
+        Records are ordered by file and then by position in each file. The data frame has a meta
+        column for every meta field found in any file. Records without a field have NaN values.
+
+        See the Returns section for the `load` function for more details.
+
+    Examples
+    --------
+
+    Loading a month of daily exports for a single node
+
+    ```python
+    import sage_data_client
+
+    if __name__ == "__main__":
+        df = sage_data_client.load_many(
+            "exports/2023-09-*.ndjson.gz",
+            filter={"name": "env.temperature", "vsn": "W023"},
+        )
+    ```
+    """
+    paths = _expand_paths(paths)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    options = {"categorical": categorical}
+    meta = _meta_keys(columns)
+    start = _utc(resolve_time(start)) if start is not None else None
+    end = _utc(resolve_time(end)) if end is not None else None
+    load_file = partial(_load_file, filter=filter or None, start=start, end=end, meta=meta, options=options)
+
+    if workers == 1 or len(paths) <= 1:
+        frames = list(map(load_file, paths))
+    else:
+        with ProcessPoolExecutor(min(workers, len(paths))) as executor:
+            frames = list(executor.map(load_file, paths))
+
+    frames = [df for df in frames if len(df) > 0]
+
+    if len(frames) == 0:
+        return _project(_new_columns(**options).to_frame(), columns)
+
+    return _project(_concat(frames), columns)
+
+
+def _expand_paths(paths) -> List[str]:
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+
+    expanded = []
+
+    for path in paths:
+        path = os.path.expanduser(str(path))
+        if glob.has_magic(path):
+            matches = sorted(glob.glob(path, recursive=True))
+            if len(matches) == 0:
+                raise FileNotFoundError(f"no files match {path!r}")
+            expanded.extend(matches)
+        elif os.path.isdir(path):
+            from .bulk import _shard_paths
+
+            expanded.extend(_shard_paths(path))
+        else:
+            expanded.append(path)
+
+    return expanded
+
+
+def _load_file(path, filter, start, end, meta, options) -> pd.DataFrame:
+    with _open(path) as f:
+        return _load_restricted(f, filter, start, end, meta, options)
+
+
+def _load_path_iter(path_or_buf, chunksize, options) -> Iterator[pd.DataFrame]:
+    if _is_dir(path_or_buf):
+        from .bulk import _shard_paths
+
+        for shard in _shard_paths(path_or_buf):
+            yield from _load_path_iter(shard, chunksize, options)
+        return
+
+    source = str(path_or_buf) if isinstance(path_or_buf, (str, Path)) else None
+
+    with profiling.record("load", source) as stats:
+        with _open(path_or_buf, stats) as f:
+            yield from _load_iter(f, chunksize, stats=stats, **options)
+
+
+def _check_chunksize(chunksize):
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+
+
+@contextmanager
+def _open(path_or_buf, stats=None):
+    if isinstance(path_or_buf, (str, Path)):
+        encoding = compression.path_encoding(path_or_buf)
+        with open(path_or_buf, "rb") as f:
+            if encoding == "identity":
+                yield f
+            else:
+                # decompress in a background thread so it overlaps with parsing
+                with compression.decode(f, encoding, threaded=True, stats=stats) as d:
+                    yield d
+    else:
+        yield path_or_buf
+
+
+class _Columns:
+    """
+    _Columns accumulates response records column by column so the data frame can be built in a
+    single pass at the end instead of from a list of per row dicts.
+    """
+
+    def __init__(self):
+        self.timestamps = []
+        self.names = []
+        self.values = []
+        self.meta = {}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, record):
+        self.timestamps.append(record["timestamp"])
+        self.names.append(record["name"])
+        self.values.append(record["value"])
+
+        meta = self.meta
+        record_meta = record["meta"]
+
+        for k, v in record_meta.items():
+            try:
+                meta[k].append(v)
+            except KeyError:
+                meta[k] = [nan] * self.size + [v]
+
+        self.size += 1
+
+        # pad any meta columns which were not present in this record
+        if len(record_meta) != len(meta):
+            for col in meta.values():
+                if len(col) < self.size:
+                    col.append(nan)
+
+    def to_frame(self, stats=None) -> pd.DataFrame:
+        # if no records were added, return empty with known columns
+        if self.size == 0:
+            return pd.DataFrame(
+                {
+                    "timestamp": pd.to_datetime([], utc=True).as_unit("ns"),
+                    "name": pd.Series([], dtype=str),
+                    "value": [],
+                }
+            )
+
+        with profiling.stage(stats, "timestamps"):
+            timestamps = _to_datetime(self.timestamps)
+
+        data = {
+            "timestamp": timestamps,
+            "name": self.names,
+            "value": self.values,
+        }
+        for k, col in self.meta.items():
+            data[f"meta.{k}"] = col
+        return pd.DataFrame(data)
+
+    def to_arrow(self, stats=None):
+        if self.size == 0:
+            return arrow.frame_to_table(self.to_frame())
+        with profiling.stage(stats, "timestamps"):
+            timestamps = _to_datetime(self.timestamps)
+        return arrow.table_from_columns(timestamps, self.names, self.values, self.meta)
+
+
+def _to_datetime(timestamps) -> pd.DatetimeIndex:
+    # the data api returns RFC3339 strings, but we also accept integer nanoseconds since epoch
+    if isinstance(timestamps[0], str):
+        index = pd.to_datetime(timestamps, utc=True, format="ISO8601")
+    else:
+        index = pd.to_datetime(timestamps, unit="ns", utc=True)
+    return index.as_unit("ns")
+
+
+class _CategoricalColumns(_Columns):
+    """
+    _CategoricalColumns accumulates name and meta fields as integer codes into per column
+    category tables, so each distinct string is only stored once.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.name_categories = {}
+        self.meta_categories = {}
+
+    def append(self, record):
+        self.timestamps.append(record["timestamp"])
+        self.values.append(record["value"])
+
+        name = record["name"]
+        categories = self.name_categories
+        code = categories.get(name)
+        if code is None:
+            code = categories[name] = len(categories)
+        self.names.append(code)
+
+        meta = self.meta
+        record_meta = record["meta"]
+
+        for k, v in record_meta.items():
+            try:
+                categories = self.meta_categories[k]
+            except KeyError:
+                categories = self.meta_categories[k] = {}
+                meta[k] = [-1] * self.size
+            code = categories.get(v)
+            if code is None:
+                code = categories[v] = len(categories)
+            meta[k].append(code)
+
+        self.size += 1
+
+        # pad any meta columns which were not present in this record
+        if len(record_meta) != len(meta):
+            for col in meta.values():
+                if len(col) < self.size:
+                    col.append(-1)
+
+    def to_frame(self, stats=None) -> pd.DataFrame:
+        if self.size == 0:
+            return super().to_frame()
+
+        with profiling.stage(stats, "timestamps"):
+            timestamps = _to_datetime(self.timestamps)
+
+        data = {
+            "timestamp": timestamps,
+            "name": _categorical(self.names, self.name_categories),
+            "value": _values(self.values),
+        }
+        for k, col in self.meta.items():
+            data[f"meta.{k}"] = _categorical(col, self.meta_categories[k])
+        return pd.DataFrame(data)
+
+    def to_arrow(self, stats=None):
+        return arrow.frame_to_table(self.to_frame(stats))
+
+
+def _categorical(codes, categories) -> pd.Categorical:
+    return pd.Categorical.from_codes(np.array(codes, dtype=np.int32), categories=list(categories))
+
+
+class _SeriesColumns:
+    """
+    _SeriesColumns accumulates records as series ids into a list of distinct series, so the name
+    and meta fields shared by the records of a series are only stored once.
+    """
+
+    def __init__(self):
+        self.timestamps = []
+        self.values = []
+        self.series_ids = []
+        self.series = {}
+
+    def __len__(self):
+        return len(self.series_ids)
+
+    def append(self, record):
+        self.timestamps.append(record["timestamp"])
+        self.values.append(record["value"])
+
+        meta = record["meta"]
+        key = (record["name"], *meta.items())
+        series_id = self.series.get(key)
+        if series_id is None:
+            series_id = self.series[key] = len(self.series)
+        self.series_ids.append(series_id)
+
+    def to_table(self, stats=None) -> SeriesTable:
+        if len(self) == 0:
+            timestamps = pd.to_datetime([], utc=True).as_unit("ns")
+        else:
+            with profiling.stage(stats, "timestamps"):
+                timestamps = _to_datetime(self.timestamps)
+
+        names = [key[0] for key in self.series]
+        metas = [dict(key[1:]) for key in self.series]
+        series_ids = np.array(self.series_ids, dtype=np.int32)
+        return _from_records(names, metas, series_ids, timestamps, self.values)
+
+
+def _new_columns(categorical=False) -> _Columns:
+    if categorical:
+        return _CategoricalColumns()
+    return _Columns()
+
+
+def _load(fileobj, format="pandas", filter=None, meta=None, stats=None, **options) -> pd.DataFrame:
+    if format == "series":
+        columns = _SeriesColumns()
+    else:
+        columns = _new_columns(**options)
+
+    with profiling.stage(stats, "parse"):
+        for record in _records(profiling.lines(stats, fileobj), filter, meta):
+            columns.append(record)
+
+    if stats is not None:
+        stats.rows += len(columns)
+
+    with profiling.stage(stats, "frame"):
+        if format == "arrow":
+            return columns.to_arrow(stats)
+        if format == "series":
+            return columns.to_table(stats)
+        return columns.to_frame(stats)
+
+
+def _load_iter(fileobj, chunksize, filter=None, meta=None, stats=None, **options) -> Iterator[pd.DataFrame]:
+    records = _records(profiling.lines(stats, fileobj), filter, meta)
+
+    while True:
+        columns = _new_columns(**options)
+
+        # each chunk is parsed before it's yielded, so time spent by the consumer isn't counted
+        with profiling.stage(stats, "parse"):
+            for record in islice(records, chunksize):
+                columns.append(record)
+
+        if len(columns) == 0:
+            return
+
+        if stats is not None:
+            stats.rows += len(columns)
+
+        with profiling.stage(stats, "frame"):
+            df = columns.to_frame(stats)
+
+        yield df
+
+
+def _records(fileobj, filter=None, meta=None) -> Iterator[dict]:
+    lines = fileobj
+
+    if filter:
+        check = line_prefilter(filter)
+        if check is not None:
+            lines = (line for line in lines if check(line))
+        match = record_matcher(filter)
+        records = (r for r in map(json.loads, lines) if match(r))
+    else:
+        records = map(json.loads, lines)
+
+    if meta is not None:
+        records = _project_meta(records, meta)
+
+    return records
+
+
+def _project_meta(records, keys) -> Iterator[dict]:
+    for r in records:
+        meta = r["meta"]
+        r["meta"] = {k: meta[k] for k in keys if k in meta}
+        yield r
@@ -0,0 +1,271 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+from .aggregation import _window_ns
+from .filters import filter_key_column
+from .query import _utc
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import Dict, List, Optional, Sequence
+
+
+class RollingAggregator:
+    """
+    RollingAggregator maintains count, sum, mean, standard deviation, min and max of values over a
+    sliding time window for each group of `by` fields.
+
+    Records are added incrementally using `update`, so each update only costs time proportional to
+    the number of new and expired records rather than the number of records in the window. This
+    makes it a good fit for triggers consuming `watch` which would otherwise re-query and
+    recompute the full window on every tick.
+
+    The window ends at the latest timestamp seen and includes records with timestamps greater than
+    the end of the window minus `window`. Records are expected to arrive in timestamp order, like
+    those yielded by `watch`. Non-numeric values are ignored.
+
+    Parameters
+    ----------
+    window : length of the window, like "30s", "5m" or "1h", default: "5m"
+
+    by : filter keys to group records by, default: ("vsn",)
+
+    Examples
+    --------
+
+    ```python
+    import sage_data_client
+
+    agg = sage_data_client.RollingAggregator(window="10m", by=["vsn"])
+
+    for df in sage_data_client.watch(filter={"name": "env.pressure", "sensor": "bme680"}):
+        stats = agg.update(df)
+        print(stats[stats["std"] > 8.0])
+    ```
+    """
+
+    def __init__(self, window="5m", by: Sequence[str] = ("vsn",)):
+        self._window_ns = _window_ns(window)
+        self.window = pd.Timedelta(self._window_ns)
+        self.by = list(by)
+        self.now = None  # type: Optional[pd.Timestamp]
+
+        # records in the window are kept in a ring of blocks, one for each update
+        self._blocks = deque()
+        self._removed = 0
+
+        # groups are assigned ids in the order they're first seen. the running statistics of
+        # each group are stored in arrays indexed by id.
+        self._ids = {}  # type: Dict[tuple, int]
+        self._keys = []  # type: List[tuple]
+        self._n = np.zeros(0)
+        self._mean = np.zeros(0)
+        self._m2 = np.zeros(0)
+
+    def update(self, df: pd.DataFrame, now=None) -> pd.DataFrame:
+        """
+        update adds the records in data frame `df`, expires records which have left the window and returns the current `stats`.
+
+        Parameters
+        ----------
+        df : data frame of records with the same columns as those returned by `query`
+
+        now : time the window ends, default: None (latest timestamp seen)
+        """
+        values = pd.to_numeric(df.value, errors="coerce").to_numpy(dtype=float)
+        mask = ~np.isnan(values)
+        ts = pd.DatetimeIndex(df.timestamp).as_unit("ns").asi8[mask]
+        values = values[mask]
+
+        if now is not None:
+            self.now = _utc(now)
+        elif len(ts) > 0 and (self.now is None or ts.max() > self.now.value):
+            self.now = pd.Timestamp(ts.max(), unit="ns", tz="UTC")
+
+        if len(ts) > 0:
+            ids = self._group_ids(df[mask])
+            order = np.argsort(ts, kind="stable")
+            block = _Block(ts[order], ids[order], values[order], len(self._keys))
+            self._blocks.append(block)
+            self._merge(block)
+
+        self.expire()
+        return self.stats()
+
+    def expire(self, now=None):
+        """
+        expire drops records which have left the window ending at `now`, default: None (latest timestamp seen)
+        """
+        if now is not None:
+            self.now = _utc(now)
+        if self.now is None:
+            return
+
+        cutoff = self.now.value - self._window_ns
+        blocks = self._blocks
+
+        while blocks and blocks[0].ts[-1] <= cutoff:
+            self._remove(blocks.popleft())
+
+        if blocks and blocks[0].ts[0] <= cutoff:
+            block = blocks[0]
+            i = np.searchsorted(block.ts, cutoff, side="right")
+            self._remove(block.slice(0, i))
+            blocks[0] = block.slice(i, len(block.ts))
+
+        if self._removed >= max(len(blocks), 1):
+            # removing is less numerically stable than merging, so rebuild once a window's worth
+            # of blocks has been removed. this keeps the amortized cost per record constant.
+            self._removed = 0
+            self._n[:] = 0.0
+            self._mean[:] = 0.0
+            self._m2[:] = 0.0
+            for block in blocks:
+                self._merge(block)
+
+    def stats(self) -> pd.DataFrame:
+        """
+        stats returns a data frame indexed by group with count, sum, mean, std, var, min and max columns.
+
+        std and var are sample statistics, matching pandas, and are NaN for groups with a single record.
+        """
+        active = np.flatnonzero(self._n > 0)
+
+        n = self._n[active]
+        mean = self._mean[active]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = np.where(n > 1, np.maximum(self._m2[active], 0.0) / (n - 1), np.nan)
+
+        # the window min and max are the min and max over each block's per group min and max
+        mins = np.full(len(self._keys), np.inf)
+        maxs = np.full(len(self._keys), -np.inf)
+        for block in self._blocks:
+            k = len(block.min)
+            np.minimum(mins[:k], block.min, out=mins[:k])
+            np.maximum(maxs[:k], block.max, out=maxs[:k])
+
+        keys = [self._keys[i] for i in active]
+
+        if len(self.by) == 1:
+            index = pd.Index([k[0] for k in keys], name=self.by[0])
+        elif len(self.by) > 1:
+            index = pd.MultiIndex.from_tuples(keys, names=self.by)
+        else:
+            index = pd.RangeIndex(len(keys))
+
+        df = pd.DataFrame(
+            {
+                "count": n.astype(int),
+                "sum": n * mean,
+                "mean": mean,
+                "std": np.sqrt(var),
+                "var": var,
+                "min": mins[active],
+                "max": maxs[active],
+            },
+            index=index,
+        )
+        return df.sort_index()
+
+    def _group_ids(self, df) -> np.ndarray:
+        """
+        _group_ids returns the group id of each record, assigning ids to new groups.
+        """
+        codes, uniques = _factorize(df, self.by)
+        ids = np.empty(len(uniques), dtype=np.intp)
+
+        for i, key in enumerate(uniques):
+            try:
+                ids[i] = self._ids[key]
+            except KeyError:
+                ids[i] = self._ids[key] = len(self._keys)
+                self._keys.append(key)
+
+        grow = len(self._keys) - len(self._n)
+        if grow > 0:
+            self._n = np.concatenate([self._n, np.zeros(grow)])
+            self._mean = np.concatenate([self._mean, np.zeros(grow)])
+            self._m2 = np.concatenate([self._m2, np.zeros(grow)])
+
+        return ids[codes]
+
+    def _merge(self, b):
+        # parallel form of Welford's algorithm for combining the statistics of two sets
+        k = len(b.n)
+        na, ma = self._n[:k], self._mean[:k]
+        n = na + b.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = b.mean - ma
+            self._m2[:k] += np.where(n > 0, b.m2 + delta * delta * na * b.n / n, 0.0)
+            self._mean[:k] = np.where(n > 0, ma + delta * b.n / n, 0.0)
+        self._n[:k] = n
+
+    def _remove(self, b):
+        # inverse of _merge, solving for the statistics of the remaining set
+        self._removed += 1
+        k = len(b.n)
+        total = self._n[:k]
+        n = total - b.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, (total * self._mean[:k] - b.n * b.mean) / n, 0.0)
+            delta = b.mean - mean
+            m2 = self._m2[:k] - b.m2 - delta * delta * n * b.n / total
+            self._m2[:k] = np.where(n > 0, m2, 0.0)
+        self._mean[:k] = mean
+        self._n[:k] = n
+
+
+class _Block:
+    """
+    _Block holds the records added by a single update ordered by timestamp, along with the count,
+    mean, sum of squared deviations, min and max of their values for each group id below `size`.
+    """
+
+    __slots__ = ("ts", "ids", "values", "n", "mean", "m2", "min", "max")
+
+    def __init__(self, ts, ids, values, size):
+        self.ts = ts
+        self.ids = ids
+        self.values = values
+        self.n = np.bincount(ids, minlength=size).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.mean = np.where(self.n > 0, np.bincount(ids, values, minlength=size) / self.n, 0.0)
+        self.m2 = np.bincount(ids, (values - self.mean[ids]) ** 2, minlength=size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+        np.minimum.at(self.min, ids, values)
+        np.maximum.at(self.max, ids, values)
+
+    def slice(self, i, j) -> "_Block":
+        return _Block(self.ts[i:j], self.ids[i:j], self.values[i:j], len(self.n))
+
+
+def _factorize(df, by):
+    """
+    _factorize returns a code for each record and the tuple of `by` values for each code.
+    """
+    if not by:
+        return np.zeros(len(df), dtype=np.intp), [()]
+
+    columns = []
+    for k in by:
+        col = filter_key_column(k)
+        if col in df.columns:
+            columns.append(pd.factorize(df[col], use_na_sentinel=False))
+        else:
+            columns.append((np.zeros(len(df), dtype=np.intp), [None]))
+
+    if len(columns) == 1:
+        codes, uniques = columns[0]
+        return codes, [_key((v,)) for v in uniques]
+
+    shape = [len(u) for _, u in columns]
+    codes, combined = pd.factorize(np.ravel_multi_index([c for c, _ in columns], shape))
+    parts = np.unravel_index(combined, shape)
+    keys = [_key(tuple(u[i] for (_, u), i in zip(columns, idx))) for idx in zip(*parts)]
+    return codes, keys
+
+
+def _key(key) -> tuple:
+    # missing values are normalized to None so they map to the same group across updates
+    return tuple(None if v is None or v != v else v for v in key)
@@ -0,0 +1,226 @@
+"""
+Compact layout for query results. Records of the same series share their name and meta fields,
+so these are stored once in a table of distinct series and each record only stores a series id,
+timestamp and value.
+"""
+import numpy as np
+import pandas as pd
+from .filters import match_frame
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import Dict, List, Optional, Sequence, Union
+
+
+class SeriesTable:
+    """
+    SeriesTable holds query results as a table of distinct series and per record series ids,
+    timestamps and values. It's returned by `query` and `load` when using `format="series"`.
+
+    Meta fields are only expanded into per record columns when they're asked for, so results
+    with many records and few series use a few bytes per record beyond the timestamp and value,
+    and per series operations don't need to group by strings.
+
+    Attributes
+    ----------
+    series : pandas.DataFrame with the `name` and `meta.*` columns of each distinct series, indexed by series id
+
+    series_id : numpy.ndarray of the int32 series id of each record
+
+    timestamp : pandas.DatetimeIndex of the timestamp of each record
+
+    value : numpy.ndarray of the value of each record
+        Values are float64 when all values are numbers. Otherwise, they're objects.
+
+    Examples
+    --------
+
+    ```python
+    import sage_data_client
+
+    st = sage_data_client.query(start="-1d", filter={"name": "env.raingauge.*"}, format="series")
+
+    # one row per series instead of per record
+    print(st.series)
+
+    # per series statistics, joined with each series' fields
+    print(st.agg(["size", "min", "max", "mean"]))
+
+    # wide data frame with a column per node and name
+    print(st.pivot(by=["meta.vsn", "name"]))
+
+    # long data frame, like format="pandas", with only the meta fields needed
+    df = st.to_frame(columns=["name", "meta.vsn"])
+    ```
+    """
+
+    __slots__ = ("series", "series_id", "timestamp", "value")
+
+    def __init__(self, series: pd.DataFrame, series_id: np.ndarray, timestamp: pd.DatetimeIndex, value: np.ndarray):
+        self.series = series
+        self.series_id = series_id
+        self.timestamp = timestamp
+        self.value = value
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "SeriesTable":
+        """
+        from_frame returns a SeriesTable of the long format query results in data frame `df`.
+        """
+        columns = [c for c in df.columns if c == "name" or c.startswith("meta.")]
+        timestamp = pd.DatetimeIndex(df["timestamp"])
+
+        value = df["value"]
+        if value.dtype.kind in "fiu":
+            value = value.to_numpy(dtype=np.float64)
+        else:
+            value = _values(value.tolist(), array=True)
+
+        grouped = df[columns].astype(object).groupby(columns, sort=False, dropna=False)
+        series_id = grouped.ngroup().to_numpy(dtype=np.int32)
+        series = grouped.size().index.to_frame(index=False)
+        series.index.name = "series_id"
+        return cls(series, series_id, timestamp, value)
+
+    def __len__(self):
+        return len(self.series_id)
+
+    def __repr__(self):
+        return f"SeriesTable({len(self)} records, {len(self.series)} series)"
+
+    @property
+    def nbytes(self) -> int:
+        """
+        nbytes is the approximate number of bytes used, including the strings in the series table.
+        """
+        value = self.value.nbytes
+        if self.value.dtype == object:
+            value += int(pd.Series(self.value).memory_usage(deep=True, index=False)) - self.value.nbytes
+        series = int(self.series.memory_usage(deep=True, index=False).sum())
+        return self.series_id.nbytes + self.timestamp.nbytes + value + series
+
+    def frame(self) -> pd.DataFrame:
+        """
+        frame returns the records as a data frame with `series_id`, `timestamp` and `value` columns.
+        """
+        return pd.DataFrame({"series_id": self.series_id, "timestamp": self.timestamp, "value": self.value})
+
+    def expand(self, columns: Optional[Sequence[str]] = None, categorical: bool = False) -> pd.DataFrame:
+        """
+        expand returns the series `columns` of each record, default: None (all columns)
+
+        When `categorical` is True, columns use the pandas `category` dtype, which shares the
+        strings of the series table instead of copying a reference for each record.
+        """
+        if columns is None:
+            columns = list(self.series.columns)
+
+        data = {}  # type: Dict[str, Union[np.ndarray, pd.Categorical]]
+
+        for c in columns:
+            if categorical:
+                codes, uniques = pd.factorize(self.series[c])
+                data[c] = pd.Categorical.from_codes(codes[self.series_id], categories=uniques)
+            else:
+                data[c] = self.series[c].to_numpy().take(self.series_id)
+
+        return pd.DataFrame(data, index=pd.RangeIndex(len(self)))
+
+    def to_frame(self, columns: Optional[Sequence[str]] = None, categorical: bool = False) -> pd.DataFrame:
+        """
+        to_frame returns the records as a long format data frame, like `format="pandas"`, with series `columns`, default: None (all columns)
+
+        See the `expand` method for `categorical`.
+        """
+        if columns is None:
+            columns = list(self.series.columns)
+
+        df = self.expand(columns, categorical=categorical)
+        df.insert(0, "timestamp", self.timestamp)
+        df.insert(2 if "name" in columns else 1, "value", self.value)
+        return df
+
+    def select(self, filter: Dict[str, str]) -> "SeriesTable":
+        """
+        select returns a SeriesTable of the series matching `filter`, using the same semantics as query filters.
+
+        Only the series table is matched, so selecting is proportional to the number of series rather than records.
+        """
+        keep = match_frame(self.series, filter)
+        ids = np.flatnonzero(keep)
+
+        remap = np.full(len(self.series), -1, dtype=np.int32)
+        remap[ids] = np.arange(len(ids), dtype=np.int32)
+
+        mask = keep[self.series_id]
+        series = self.series.iloc[ids].reset_index(drop=True)
+        series.index.name = "series_id"
+        return SeriesTable(series, remap[self.series_id[mask]], self.timestamp[mask], self.value[mask])
+
+    def agg(self, func) -> pd.DataFrame:
+        """
+        agg computes `func`, like "mean" or ["min", "max"], over the values of each series and returns them joined with the series table.
+        """
+        result = pd.Series(self.value).groupby(self.series_id).agg(func)
+        if isinstance(result, pd.Series):
+            result = result.to_frame(func if isinstance(func, str) else "value")
+        result.index.name = "series_id"
+        return self.series.join(result, how="inner")
+
+    def pivot(self, by: Optional[Sequence[str]] = None, func: str = "last") -> pd.DataFrame:
+        """
+        pivot returns the values as a wide data frame indexed by timestamp with a column for each group of `by` series columns.
+
+        Parameters
+        ----------
+        by : series columns to group by, like ["meta.vsn", "name"], default: None (columns which differ between series)
+
+        func : how values of the same group and timestamp are combined, like "mean" or "last", default: "last"
+        """
+        if by is None:
+            by = [c for c in self.series.columns if self.series[c].nunique(dropna=False) > 1] or ["name"]
+        by = list(by)
+
+        grouped = self.series[by].astype(object).groupby(by, sort=True, dropna=False)
+        group = grouped.ngroup().to_numpy()
+        labels = grouped.size().index
+
+        df = pd.DataFrame({"timestamp": self.timestamp, "group": group.take(self.series_id), "value": self.value})
+        wide = df.groupby(["timestamp", "group"], sort=True).value.agg(func).unstack("group")
+        wide = wide.reindex(columns=range(len(labels)))
+        wide.columns = labels
+        return wide
+
+
+def _from_records(names: List[str], metas: List[dict], series_id: np.ndarray, timestamp: pd.DatetimeIndex, values: list) -> SeriesTable:
+    """
+    _from_records returns a SeriesTable from the name and meta fields of each series and the series ids, timestamps and values of the records.
+
+    Series with the same fields in a different order are combined.
+    """
+    data = {"name": names}
+    # meta columns are in order of first appearance, like format="pandas"
+    keys = dict.fromkeys(k for meta in metas for k in meta)
+    for k in keys:
+        data[f"meta.{k}"] = [meta.get(k, np.nan) for meta in metas]
+
+    series = pd.DataFrame(data, dtype=object)
+
+    canonical = series.groupby(list(series.columns), sort=False, dropna=False).ngroup().to_numpy(dtype=np.int32)
+    if len(canonical) > 0 and canonical.max() + 1 < len(canonical):
+        series_id = canonical[series_id]
+        series = series.drop_duplicates(ignore_index=True)
+
+    series.index.name = "series_id"
+    return SeriesTable(series, series_id, timestamp, _values(values, array=True))
+
+
+def _values(values: list, array: bool = False) -> Union[np.ndarray, list]:
+    """
+    _values returns a float64 array of record values when they're all numbers. Otherwise, they're returned as a list, or an object array if `array` is True.
+    """
+    # bool is a subclass of int, so check exact types to keep booleans as objects
+    if all(type(v) is float or type(v) is int for v in values):
+        return np.array(values, dtype=np.float64)
+    if array:
+        return np.array(values, dtype=object)
+    return values
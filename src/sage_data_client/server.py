@@ -0,0 +1,416 @@
+"""
+A lightweight local stand in for the data API query endpoint, serving records from memory. It's
+useful for deterministic tests, working offline and load testing clients.
+
+A dataset can be served from the command line using:
+
+python3 -m sage_data_client.server data.ndjson.gz --port 8000
+"""
+import argparse
+from bisect import bisect_left, bisect_right
+from gzip import compress
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import socket
+from socketserver import ThreadingMixIn
+from threading import Lock, Thread
+import time
+import pandas as pd
+from .aggregation import _window_ns
+from .filters import compile_pattern
+from .query import _open, _to_datetime
+from .timeparse import parse_ns
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+ENCODERS = {"gzip": compress}
+
+if zstandard is not None:
+    ENCODERS["zstd"] = zstandard.compress
+
+if brotli is not None:
+    ENCODERS["br"] = brotli.compress
+
+AGGREGATIONS = {
+    "mean": lambda values: sum(values) / len(values),
+    "sum": sum,
+    "count": len,
+    "min": min,
+    "max": max,
+}
+
+
+class Server:
+    """
+    Server serves NDJSON records from memory over HTTP using the same request and response format
+    as the data API query endpoint.
+
+    Queries support `start`, `end`, `filter` with `*` and `|` patterns, `head`, `tail`, `bucket`
+    and `experimental_func` / `experimental_window`. Records are grouped by series, in the order
+    each series was first added, and ordered by timestamp within each series. Responses are
+    compressed using the first of `encodings` accepted by the client.
+
+    Aggregations apply to the numeric values of each series over windows aligned to the Unix
+    epoch. Like the data API, each window is labeled by its stop time, truncated to the query end.
+
+    Parameters
+    ----------
+    lines : iterable of NDJSON records as str or bytes to serve from the default bucket, default: ()
+
+    aggregation : whether to support experimental_func and experimental_window, default: True
+        When False, these fields are ignored and raw records are returned, like older versions of the data API.
+
+    encodings : content encodings in order of preference, default: ("zstd", "br", "gzip")
+        Encodings which require packages which aren't installed are skipped.
+
+    latency : number of seconds to wait before responding to each request, default: 0.0
+
+    host : address to listen on, default: "127.0.0.1"
+
+    port : port to listen on, default: 0 (any free port)
+
+    Attributes
+    ----------
+    endpoint : url of the query endpoint while the server is running
+
+    requests : list of query bodies received
+
+    connections : number of connections accepted
+
+    failures : list of status codes returned instead of results for the next requests
+
+    Examples
+    --------
+
+    ```python
+    import sage_data_client
+    from sage_data_client.server import Server
+
+    with Server() as server:
+        server.load("data.ndjson.gz")
+        df = sage_data_client.query(start="2023-09-28T00:00:00Z", endpoint=server.endpoint)
+    ```
+    """
+
+    def __init__(
+        self,
+        lines: Iterable[Union[str, bytes]] = (),
+        aggregation: bool = True,
+        encodings: Sequence[str] = ("zstd", "br", "gzip"),
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.aggregation = aggregation
+        self.encodings = [e for e in encodings if e in ENCODERS]
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.endpoint = None  # type: Optional[str]
+        self.requests = []  # type: List[dict]
+        self.connections = 0
+        self.failures = []  # type: List[int]
+        self._buckets = {}  # type: Dict[Optional[str], Dict[tuple, _Series]]
+        self._lock = Lock()
+        self._server = None
+        self._thread = None
+        self.add(lines)
+
+    def add(self, lines: Iterable[Union[str, bytes]], bucket: Optional[str] = None, batch: int = 100000):
+        """
+        add adds NDJSON records to `bucket`, default: None (default bucket)
+        """
+        items = []
+        for line in lines:
+            if isinstance(line, str):
+                line = line.encode()
+            line = line.strip()
+            if line:
+                items.append((json.loads(line), line + b"\n"))
+            if len(items) >= batch:
+                self._add(items, bucket)
+                items = []
+        self._add(items, bucket)
+
+    def load(self, path_or_buf, bucket: Optional[str] = None):
+        """
+        load adds the records in an NDJSON file, like those saved from the data API, to `bucket`.
+
+        Paths ending in .gz, .zst or .br are decompressed.
+        """
+        with _open(path_or_buf) as f:
+            self.add(f, bucket=bucket)
+
+    def _add(self, items, bucket):
+        if len(items) == 0:
+            return
+
+        # timestamps are parsed in bulk, as parsing them one at a time dominates load time
+        timestamps = _to_datetime([r["timestamp"] for r, _ in items]).asi8.tolist()
+
+        with self._lock:
+            series = self._buckets.setdefault(bucket, {})
+            for ts, (record, line) in zip(timestamps, items):
+                key = (record["name"], tuple(sorted(record["meta"].items())))
+                try:
+                    s = series[key]
+                except KeyError:
+                    s = series[key] = _Series(record["name"], record["meta"])
+                s.add(ts, record["value"], line)
+
+    def query(self, q: dict) -> bytes:
+        """
+        query returns the NDJSON response body for query body `q`.
+
+        ValueError is raised for invalid queries.
+        """
+        if "start" not in q:
+            raise ValueError("start is required")
+        if "head" in q and "tail" in q:
+            raise ValueError("only one of head or tail can be provided")
+
+        start = _time_ns(q["start"])
+        end = _time_ns(q["end"]) if "end" in q else None
+        filter = {k: _compile_pattern(v) for k, v in (q.get("filter") or {}).items()}
+        head = q.get("head")
+        tail = q.get("tail")
+
+        func = q.get("experimental_func") if self.aggregation else None
+        window = None
+        if func is not None:
+            if func not in AGGREGATIONS:
+                raise ValueError(f"unsupported experimental_func {func!r}")
+            window = _window_ns(q.get("experimental_window", "1h"))
+
+        with self._lock:
+            series = list(self._buckets.get(q.get("bucket"), {}).values())
+
+        chunks = []
+
+        for s in series:
+            if not all(s.match(k, p) for k, p in filter.items()):
+                continue
+
+            i = bisect_left(s.timestamps, start)
+            j = bisect_left(s.timestamps, end) if end is not None else len(s.timestamps)
+
+            if head is not None:
+                j = min(j, i + head)
+            elif tail is not None:
+                i = max(i, j - tail)
+
+            if i >= j:
+                continue
+
+            if func is not None:
+                chunks.append(s.aggregate(i, j, func, window, end))
+            else:
+                chunks.extend(s.lines[i:j])
+
+        return b"".join(chunks)
+
+    def negotiate(self, accept_encoding: str) -> Optional[str]:
+        """
+        negotiate returns the first of the server's encodings in an Accept-Encoding header, or None for identity.
+        """
+        accepted = {e.split(";")[0].strip() for e in accept_encoding.split(",")}
+        for encoding in self.encodings:
+            if encoding in accepted:
+                return encoding
+        return None
+
+    def start(self):
+        """
+        start starts serving requests in a background thread.
+        """
+        self._server = _ThreadingHTTPServer((self.host, self.port), self._handler())
+        host, port = self._server.server_address[:2]
+        self.endpoint = f"http://{host}:{port}/api/v1/query"
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        stop stops serving requests and closes the listening socket.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # headers and body are written separately, so avoid nagle delays on keep alive connections
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with server._lock:
+                    server.connections += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+                if server.latency > 0:
+                    time.sleep(server.latency)
+
+                try:
+                    q = json.loads(body)
+                    if not isinstance(q, dict):
+                        raise ValueError("query must be an object")
+                except ValueError as exc:
+                    self.respond(400, f"invalid query: {exc}\n".encode())
+                    return
+
+                with server._lock:
+                    server.requests.append(q)
+                    status = server.failures.pop(0) if server.failures else None
+
+                if status is not None:
+                    self.respond(status, b"")
+                    return
+
+                try:
+                    data = server.query(q)
+                except ValueError as exc:
+                    self.respond(400, f"invalid query: {exc}\n".encode())
+                    return
+
+                self.respond(200, data, server.negotiate(self.headers.get("Accept-Encoding", "")))
+
+            def respond(self, status, data, encoding=None):
+                self.send_response(status)
+                if encoding is not None:
+                    data = ENCODERS[encoding](data)
+                    self.send_header("Content-Encoding", encoding)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class _Series:
+    """
+    _Series holds the records of a single series ordered by timestamp.
+    """
+
+    __slots__ = ("name", "meta", "timestamps", "values", "lines")
+
+    def __init__(self, name, meta):
+        self.name = name
+        self.meta = meta
+        self.timestamps = []  # type: List[int]
+        self.values = []
+        self.lines = []  # type: List[bytes]
+
+    def add(self, ts, value, line):
+        if not self.timestamps or ts >= self.timestamps[-1]:
+            self.timestamps.append(ts)
+            self.values.append(value)
+            self.lines.append(line)
+        else:
+            # records which arrive out of order are inserted after any with the same timestamp
+            i = bisect_right(self.timestamps, ts)
+            self.timestamps.insert(i, ts)
+            self.values.insert(i, value)
+            self.lines.insert(i, line)
+
+    def match(self, key, pattern) -> bool:
+        value = self.name if key == "name" else self.meta.get(key)
+        return isinstance(value, str) and pattern.fullmatch(value) is not None
+
+    def aggregate(self, i, j, func, window, end) -> bytes:
+        windows = {}
+
+        for ts, value in zip(self.timestamps[i:j], self.values[i:j]):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                windows.setdefault(ts // window * window, []).append(value)
+
+        lines = []
+
+        for start, values in windows.items():
+            stop = start + window
+            if end is not None:
+                stop = min(stop, end)
+            r = {
+                "timestamp": pd.Timestamp(stop, unit="ns", tz="UTC").isoformat().replace("+00:00", "Z"),
+                "name": self.name,
+                "value": AGGREGATIONS[func](values),
+                "meta": self.meta,
+            }
+            lines.append(json.dumps(r).encode() + b"\n")
+
+        return b"".join(lines)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    # allow bursts of concurrent connections when load testing
+    request_queue_size = 128
+
+
+def _time_ns(t) -> int:
+    if not isinstance(t, str):
+        raise ValueError(f"invalid time {t!r}")
+    return parse_ns(t)
+
+
+def _compile_pattern(pattern):
+    if not isinstance(pattern, str):
+        raise ValueError(f"invalid filter pattern {pattern!r}")
+    # patterns are compiled by the client's filters module, so the server matches records the same way
+    return compile_pattern(pattern)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve NDJSON files using the data API query endpoint.")
+    parser.add_argument("paths", nargs="*", help="NDJSON files to serve. paths ending in .gz, .zst or .br are decompressed.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before responding to each request")
+    args = parser.parse_args()
+
+    server = Server(latency=args.latency, host=args.host, port=args.port)
+
+    for path in args.paths:
+        server.load(path)
+
+    server.start()
+    print(f"serving {len(args.paths)} files at {server.endpoint}", flush=True)
+
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
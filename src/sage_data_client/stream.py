@@ -0,0 +1,197 @@
+import asyncio
+from collections import Counter
+import time
+import pandas as pd
+from .client import Client
+from .query import _build_query, _load, _utc, resolve_time
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+
+def watch(
+    filter: Optional[Dict[str, str]] = None,
+    start=None,
+    interval: float = 3.0,
+    min_interval: float = 1.0,
+    max_interval: float = 30.0,
+    endpoint: str = "https://data.sagecontinuum.org/api/v1/query",
+    bucket: Optional[str] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    watch polls the data API for new records and yields them as data frames as they arrive.
+
+    Each record is yielded exactly once. watch tracks the latest timestamp seen along with the
+    records seen at that timestamp, so records sharing a timestamp across polls are neither
+    dropped nor repeated. Records which arrive at the data API with a timestamp older than the
+    latest one already seen are not yielded.
+
+    Parameters
+    ----------
+    filter : dictionary of query filters, default: None
+
+    start : time to start watching from, default: None (now)
+        Timestamps can be a relative like "-1h" or absolute like "2021-05-01T10:30:00Z".
+
+    interval : initial number of seconds between polls, default: 3.0
+
+    min_interval : minimum number of seconds between polls, default: 1.0
+
+    max_interval : maximum number of seconds between polls, default: 30.0
+        The polling interval shrinks towards `min_interval` while new records are arriving and
+        backs off towards `max_interval` while they are not.
+
+    endpoint : url of query api, default: "https://data.sagecontinuum.org/api/v1/query"
+
+    bucket: name of bucket to query
+
+    Returns
+    -------
+    result : iterator of pandas.DataFrame
+        Each data frame contains only new records ordered by timestamp and has the same columns as those returned by `load`.
+
+    Examples
+    --------
+
+    ```python
+    import sage_data_client
+
+    for df in sage_data_client.watch(filter={"name": "env.temperature", "sensor": "bme280"}):
+        print(df[df.value > 50.0])
+    ```
+    """
+    watcher = _Watcher(filter, start, interval, min_interval, max_interval, endpoint, bucket)
+    try:
+        while True:
+            df = watcher.poll()
+            if len(df) > 0:
+                yield df
+            time.sleep(watcher.interval)
+    finally:
+        watcher.close()
+
+
+async def awatch(
+    filter: Optional[Dict[str, str]] = None,
+    start=None,
+    interval: float = 3.0,
+    min_interval: float = 1.0,
+    max_interval: float = 30.0,
+    endpoint: str = "https://data.sagecontinuum.org/api/v1/query",
+    bucket: Optional[str] = None,
+) -> AsyncIterator[pd.DataFrame]:
+    """
+    awatch is the asyncio version of `watch`. Requests and parsing run in the default executor so the event loop is not blocked.
+
+    See the `watch` function for details on the parameters and results.
+
+    Examples
+    --------
+
+    ```python
+    import asyncio
+    import sage_data_client
+
+    async def main():
+        async for df in sage_data_client.awatch(filter={"name": "env.temperature"}):
+            print(df)
+
+    asyncio.get_event_loop().run_until_complete(main())
+    ```
+    """
+    loop = asyncio.get_event_loop()
+    watcher = _Watcher(filter, start, interval, min_interval, max_interval, endpoint, bucket)
+    try:
+        while True:
+            df = await loop.run_in_executor(None, watcher.poll)
+            if len(df) > 0:
+                yield df
+            await asyncio.sleep(watcher.interval)
+    finally:
+        watcher.close()
+
+
+class _Watcher:
+    """
+    _Watcher holds the state for watch and awatch: the connection to the endpoint, the high
+    water mark timestamp, the number of times each record was already seen at it and the current
+    polling interval.
+    """
+
+    def __init__(self, filter, start, interval, min_interval, max_interval, endpoint, bucket):
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("intervals must satisfy 0 < min_interval <= max_interval")
+        self.filter = filter
+        self.bucket = bucket
+        self.latest = _utc(resolve_time(start if start is not None else "now"))
+        self.seen = Counter()
+        self.interval = min(max(interval, min_interval), max_interval)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.client = Client(endpoint, pool_size=1)
+
+    def close(self):
+        self.client.close()
+
+    def poll(self) -> pd.DataFrame:
+        q = _build_query(start=self.latest, filter=self.filter, bucket=self.bucket)
+
+        with self.client.open(q) as f:
+            df = _load(f)
+
+        df = self._new_records(df)
+
+        if len(df) > 0:
+            self.interval = max(self.interval / 2, self.min_interval)
+        else:
+            self.interval = min(self.interval * 1.5, self.max_interval)
+
+        return df
+
+    def _new_records(self, df) -> pd.DataFrame:
+        if len(df) == 0:
+            return df
+
+        # the query start is inclusive and truncated to microseconds by timestr, so the
+        # response can include records at or just before the latest timestamp already seen.
+        mask = (df.timestamp > self.latest).to_numpy(copy=True)
+        boundary = (df.timestamp == self.latest).to_numpy()
+        if boundary.any():
+            # identical records may be repeated at the same timestamp, so only the copies beyond
+            # those already yielded are new
+            counts = Counter()
+            keep = []
+            for k in _record_keys(df[boundary]):
+                counts[k] += 1
+                keep.append(counts[k] > self.seen[k])
+            mask[boundary] = keep
+
+        df = df[mask]
+
+        if len(df) == 0:
+            return df
+
+        df = df.sort_values("timestamp", kind="stable", ignore_index=True)
+
+        latest = df.timestamp.iloc[-1]
+        seen = Counter(_record_keys(df[df.timestamp == latest]))
+
+        if latest == self.latest:
+            self.seen += seen
+        else:
+            self.latest = latest
+            self.seen = seen
+
+        return df
+
+
+def _record_keys(df):
+    """
+    _record_keys returns a (name, value, meta) key for each record. Only meta fields present in a
+    record are included, so keys don't depend on which other records were in the same response.
+    """
+    meta = [c for c in df.columns if c.startswith("meta.")]
+    return [
+        (name, value if value == value else None, tuple((c, v) for c, v in zip(meta, values) if v is not None and v == v))
+        for name, value, *values in zip(df.name, df.value, *(df[c] for c in meta))
+    ]
@@ -0,0 +1,206 @@
+"""
+Fast parsing and formatting of query times without pandas.
+
+Relative times like "-1h", "-10m" or "-1d12h" and ISO 8601 times like "2021-05-01T10:30:00Z" are
+matched by regular expressions and their parsed values are cached, so building many small
+queries doesn't pay for pandas' general purpose parser. Other inputs fall back to pandas.
+"""
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+import re
+import time
+
+# NOTE Using the deprecated type aliases to maintain compatibility with Python 3.6
+from typing import Optional
+
+
+NS_PER_US = 1000
+NS_PER_SECOND = 1_000_000_000
+NS_PER_DAY = 86400 * NS_PER_SECOND
+
+UNITS = {}
+
+for names, ns in [
+    (("w", "week", "weeks"), 7 * NS_PER_DAY),
+    (("d", "day", "days"), NS_PER_DAY),
+    (("h", "hr", "hour", "hours"), 3600 * NS_PER_SECOND),
+    (("m", "min", "mins", "minute", "minutes"), 60 * NS_PER_SECOND),
+    (("s", "sec", "secs", "second", "seconds"), NS_PER_SECOND),
+    (("ms", "milli", "millis", "millisecond", "milliseconds"), 1_000_000),
+    (("us", "micro", "micros", "microsecond", "microseconds"), NS_PER_US),
+    (("ns", "nano", "nanos", "nanosecond", "nanoseconds"), 1),
+]:
+    for name in names:
+        UNITS[name] = ns
+
+_ISO = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})"
+    r"(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d{1,9}))?)?)?"
+    r"\s*(Z|[+-]\d{2}(?::?\d{2})?)?",
+    re.IGNORECASE,
+)
+
+_RELATIVE = re.compile(r"([+-]?)\s*((?:(?:\d+(?:\.\d*)?|\.\d+)\s*[a-z]+\s*)+)", re.IGNORECASE)
+_RELATIVE_PART = re.compile(r"(\d*)(?:\.(\d*))?\s*([a-z]+)", re.IGNORECASE)
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def parse_ns(t, now: Optional[int] = None) -> int:
+    """
+    parse_ns returns time `t` as UTC nanoseconds since the Unix epoch.
+
+    `t` can be a relative time like "-1h" or a timedelta, which is added to `now`, an absolute
+    time like "2021-05-01T10:30:00Z", a datetime or pandas Timestamp, or "now". Times without a
+    time zone are in UTC.
+
+    Parameters
+    ----------
+    t : time to parse
+
+    now : current time in UTC nanoseconds since the Unix epoch, default: None (current time)
+
+    ValueError is raised for times which can't be parsed.
+    """
+    if isinstance(t, str):
+        s = t.strip()
+        if _ISO.fullmatch(s):
+            return _parse_iso(s)
+        if _RELATIVE.fullmatch(s):
+            delta = _parse_relative(s)
+            if delta is not None:
+                return _now(now) + delta
+        if s.lower() == "now":
+            return _now(now)
+    elif isinstance(t, datetime):
+        return _datetime_ns(t)
+    elif isinstance(t, timedelta):
+        return _now(now) + _timedelta_ns(t)
+
+    return _parse_pandas(t, now)
+
+
+def is_absolute(t) -> bool:
+    """
+    is_absolute returns whether `t` is an absolute time rather than one relative to now.
+    """
+    if isinstance(t, datetime):
+        return True
+    if not isinstance(t, str):
+        return False
+
+    s = t.strip()
+
+    if _ISO.fullmatch(s):
+        return True
+    if _RELATIVE.fullmatch(s) or s.lower() in ("now", "today"):
+        return False
+
+    try:
+        _parse_pandas(s, None, relative=False)
+    except ValueError:
+        return False
+    return True
+
+
+def format_ns(ns: int) -> str:
+    """
+    format_ns formats UTC nanoseconds since the Unix epoch like the data API, with microsecond precision.
+    """
+    seconds, ns = divmod(ns, NS_PER_SECOND)
+    return f"{_format_seconds(seconds)}.{ns // NS_PER_US:06d}Z"
+
+
+@lru_cache(maxsize=4096)
+def _format_seconds(seconds: int) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(s: str) -> int:
+    year, month, day, hour, minute, second, fraction, offset = _ISO.fullmatch(s).groups()
+
+    try:
+        # datetime validates the fields, like rejecting February 30th
+        dt = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0))
+    except ValueError as exc:
+        raise ValueError(f"invalid time {s!r}: {exc}") from None
+
+    days = dt.toordinal() - _EPOCH_ORDINAL
+    ns = (days * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second) * NS_PER_SECOND
+
+    if fraction:
+        ns += int(fraction.ljust(9, "0"))
+
+    if offset and offset.upper() != "Z":
+        sign = -1 if offset[0] == "-" else 1
+        digits = offset[1:].replace(":", "")
+        minutes = int(digits[:2]) * 60 + int(digits[2:] or 0)
+        ns -= sign * minutes * 60 * NS_PER_SECOND
+
+    return ns
+
+
+@lru_cache(maxsize=1024)
+def _parse_relative(s: str) -> Optional[int]:
+    # None is returned for units which aren't known here, so pandas can try them
+    sign, parts = _RELATIVE.fullmatch(s).groups()
+    total = 0
+
+    for whole, fraction, unit in _RELATIVE_PART.findall(parts):
+        ns = UNITS.get(unit.lower())
+        if ns is None:
+            return None
+        total += int(whole or 0) * ns
+        if fraction:
+            total += int(fraction) * ns // 10 ** len(fraction)
+
+    return -total if sign == "-" else total
+
+
+def _datetime_ns(dt) -> int:
+    # pandas Timestamps store their UTC nanoseconds, including for naive timestamps
+    value = getattr(dt, "value", None)
+    if isinstance(value, int):
+        return value
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    days = dt.toordinal() - _EPOCH_ORDINAL
+    seconds = days * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second
+    return seconds * NS_PER_SECOND + dt.microsecond * NS_PER_US
+
+
+def _timedelta_ns(td) -> int:
+    value = getattr(td, "value", None)
+    if isinstance(value, int):
+        return value
+    return (td.days * 86400 + td.seconds) * NS_PER_SECOND + td.microseconds * NS_PER_US
+
+
+def _now(now) -> int:
+    if now is not None:
+        return now
+    try:
+        return time.time_ns()
+    except AttributeError:
+        # time_ns requires Python 3.7
+        return int(time.time() * NS_PER_SECOND)
+
+
+def _parse_pandas(t, now, relative=True) -> int:
+    # less common inputs, like "today" or numpy datetimes, use pandas' parsers
+    import pandas as pd
+
+    try:
+        ts = pd.to_datetime(t)
+    except (TypeError, ValueError, OverflowError):
+        if not relative:
+            raise ValueError(f"invalid time {t!r}")
+        try:
+            return _now(now) + pd.to_timedelta(t).value
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f"invalid time {t!r}") from None
+
+    if ts is pd.NaT:
+        raise ValueError(f"invalid time {t!r}")
+    return ts.value
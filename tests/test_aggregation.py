@@ -0,0 +1,115 @@
+import json
+import random
+import unittest
+from urllib.error import HTTPError
+import pandas as pd
+import sage_data_client
+from sage_data_client.server import Server
+
+
+def records(seed=0):
+    rng = random.Random(seed)
+    start = pd.Timestamp("2023-09-28T16:00:00Z").value
+    for i in range(2000):
+        timestamp = start + rng.randrange(0, 6 * 3600 * 10**9)
+        vsn = rng.choice(["W023", "W039", "W07A"])
+        sensor = rng.choice(["bme280", "bme680"])
+        name = rng.choice(["env.temperature", "env.pressure"])
+        value = round(rng.uniform(-10, 40), 3) if rng.random() < 0.95 else "error"
+        yield json.dumps(
+            {
+                "timestamp": pd.Timestamp(timestamp, tz="UTC").isoformat(),
+                "name": name,
+                "value": value,
+                "meta": {"vsn": vsn, "sensor": sensor},
+            }
+        )
+
+
+START = "2023-09-28T16:00:00Z"
+END = "2023-09-28T21:20:00.5Z"
+
+
+class TestAggregate(unittest.TestCase):
+    def aggregate(self, endpoint, **kwargs):
+        return sage_data_client.aggregate(
+            filter={"name": "env.*"}, start=START, end=END, endpoint=endpoint, **kwargs
+        )
+
+    def test_server_and_local_agree(self):
+        with Server(records()) as stub:
+            for func in ["mean", "sum", "count", "min", "max"]:
+                for window in ["7m", "1h"]:
+                    for by in [["name", "vsn"], ["vsn", "sensor", "name"], ["name"], []]:
+                        with self.subTest(func=func, window=window, by=by):
+                            server = self.aggregate(stub.endpoint, func=func, window=window, by=by, server=True)
+                            local = self.aggregate(stub.endpoint, func=func, window=window, by=by, server=False, chunksize=97)
+                            self.assertGreater(len(server), 0)
+                            pd.testing.assert_frame_equal(server, local)
+
+    def test_local_matches_resample(self):
+        with Server(records()) as stub:
+            raw = sage_data_client.query(start=START, end=END, filter={"name": "env.temperature"}, endpoint=stub.endpoint)
+            raw = raw.assign(value=pd.to_numeric(raw.value, errors="coerce"))
+            expect = raw.groupby("meta.vsn").resample("1h", on="timestamp").value.mean().unstack(0)
+            expect = expect.dropna(how="all")
+            expect.columns.name = "vsn"
+
+            result = sage_data_client.aggregate(
+                filter={"name": "env.temperature"}, start=START, end=END, window="1h", by=["vsn"],
+                endpoint=stub.endpoint, server=False,
+            )
+            pd.testing.assert_frame_equal(result, expect, check_freq=False)
+
+    def test_wide_columns(self):
+        with Server(records()) as stub:
+            df = self.aggregate(stub.endpoint, by=["name", "vsn"])
+            self.assertEqual(df.index.name, "timestamp")
+            self.assertEqual(df.columns.names, ["name", "vsn"])
+            self.assertEqual(df["env.temperature"].columns.tolist(), ["W023", "W039", "W07A"])
+
+            df = self.aggregate(stub.endpoint, func="count", by=[])
+            self.assertEqual(df.columns.tolist(), ["count"])
+            raw = sage_data_client.query(start=START, end=END, filter={"name": "env.*"}, endpoint=stub.endpoint)
+            self.assertEqual(df["count"].sum(), (raw.value != "error").sum())
+
+    def test_server_requests(self):
+        with Server(records()) as stub:
+            self.aggregate(stub.endpoint, func="max")
+            self.assertEqual(len(stub.requests), 1)
+            self.assertEqual(stub.requests[0]["experimental_func"], "max")
+            self.assertEqual(stub.requests[0]["experimental_window"], "1h")
+
+    def test_fallback_unsupported_status(self):
+        with Server(records()) as stub:
+            expect = self.aggregate(stub.endpoint, server=False)
+            stub.failures.extend([400, 400])
+            pd.testing.assert_frame_equal(self.aggregate(stub.endpoint), expect)
+
+            stub.failures.extend([400, 400])
+            with self.assertRaises(HTTPError):
+                self.aggregate(stub.endpoint, server=True)
+
+    def test_fallback_ignored_aggregation(self):
+        with Server(records(), aggregation=False) as stub:
+            expect = self.aggregate(stub.endpoint, server=False)
+            pd.testing.assert_frame_equal(self.aggregate(stub.endpoint), expect)
+            with self.assertRaises(ValueError):
+                self.aggregate(stub.endpoint, server=True)
+
+    def test_empty(self):
+        with Server() as stub:
+            for server in [True, False]:
+                df = self.aggregate(stub.endpoint, server=server)
+                self.assertEqual(len(df), 0)
+                self.assertEqual(df.columns.names, ["name", "vsn"])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            sage_data_client.aggregate(filter={}, start=START, func="median")
+        with self.assertRaises(ValueError):
+            sage_data_client.aggregate(filter={}, start=START, window="soon")
+
+
+if __name__ == "__main__":
+    unittest.main()
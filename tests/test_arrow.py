@@ -0,0 +1,136 @@
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import json
+import unittest
+import pandas as pd
+import sage_data_client
+from sage_data_client.arrow import table_to_frame
+from sage_data_client.server import Server
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+def records():
+    for i in range(10):
+        for vsn in ["W023", "W039"]:
+            yield json.dumps(
+                {
+                    "timestamp": f"2023-09-28T16:{i:02d}:00.123456789Z",
+                    "name": "env.temperature",
+                    "value": 20.0 + i,
+                    "meta": {"vsn": vsn, "sensor": "bme680"},
+                }
+            )
+
+
+@unittest.skipUnless(pa is not None, "requires pyarrow")
+class TestArrow(unittest.TestCase):
+    def test_save_load(self):
+        df = sage_data_client.load("tests/test-data.ndjson")
+
+        with TemporaryDirectory() as dir:
+            for suffix in [".parquet", ".feather", ".arrow"]:
+                path = Path(dir, "data" + suffix)
+                sage_data_client.save(df, path)
+                pd.testing.assert_frame_equal(sage_data_client.load(path), df)
+
+    def test_save_load_categorical(self):
+        df = sage_data_client.load("tests/test-data.ndjson", categorical=True)
+
+        with TemporaryDirectory() as dir:
+            path = Path(dir, "data.arrow")
+            sage_data_client.save(df, path)
+
+            table = sage_data_client.load(path, format="arrow")
+            self.assertTrue(pa.types.is_dictionary(table.schema.field("name").type))
+            self.assertTrue(pa.types.is_dictionary(table.schema.field("meta.vsn").type))
+
+            result = sage_data_client.load(path, categorical=True)
+            self.assertIsInstance(result.name.dtype, pd.CategoricalDtype)
+            self.assertEqual(result.name.tolist(), df.name.tolist())
+            self.assertEqual(result["meta.vsn"].tolist(), df["meta.vsn"].tolist())
+
+    def test_save_mixed_values(self):
+        df = sage_data_client.load("tests/test-data.ndjson")
+        df = df.assign(value=[1.0, "a"] * (len(df) // 2) + [1.0] * (len(df) % 2))
+
+        with TemporaryDirectory() as dir:
+            path = Path(dir, "data.parquet")
+            sage_data_client.save(df, path)
+            self.assertEqual(sage_data_client.load(path).value.tolist()[:2], ["1.0", "a"])
+
+    def test_load_filter(self):
+        expect = sage_data_client.load("tests/test-data.ndjson", filter={"vsn": "W06F|W02*"}, columns=["timestamp", "meta.vsn"])
+        self.assertGreater(len(expect), 0)
+
+        result = sage_data_client.load(
+            "tests/test-data.ndjson", engine="pyarrow", filter={"vsn": "W06F|W02*"}, columns=["timestamp", "meta.vsn"]
+        )
+        pd.testing.assert_frame_equal(result, expect)
+
+        with TemporaryDirectory() as dir:
+            path = Path(dir, "data.arrow")
+            sage_data_client.save(sage_data_client.load("tests/test-data.ndjson"), path)
+            result = sage_data_client.load(path, filter={"vsn": "W06F|W02*"}, columns=["timestamp", "meta.vsn"])
+            pd.testing.assert_frame_equal(result, expect)
+
+    def test_save_unsupported_suffix(self):
+        with self.assertRaises(ValueError):
+            sage_data_client.save(pd.DataFrame(), "data.csv")
+
+    def test_load_pyarrow_engine(self):
+        for path in ["tests/test-data.ndjson", "tests/test-data.ndjson.gz", "tests/test-empty.ndjson"]:
+            expect = sage_data_client.load(path)
+            result = sage_data_client.load(path, engine="pyarrow")
+            self.assertEqual(result.columns.tolist(), expect.columns.tolist())
+            pd.testing.assert_frame_equal(result, expect, check_dtype=False)
+
+    def test_load_pyarrow_engine_key_order(self):
+        # records don't need to start with the timestamp
+        lines = []
+        for line in Path("tests/test-data.ndjson").read_text().splitlines():
+            r = json.loads(line)
+            lines.append(json.dumps({"meta": r["meta"], "value": r["value"], "name": r["name"], "timestamp": r["timestamp"]}))
+        data = "\n".join(lines).encode() + b"\n"
+
+        expect = sage_data_client.load(BytesIO(data))
+        result = sage_data_client.load(BytesIO(data), engine="pyarrow")
+        self.assertEqual(result.columns.tolist(), expect.columns.tolist())
+        pd.testing.assert_frame_equal(result, expect, check_dtype=False)
+
+    def test_load_format_arrow(self):
+        table = sage_data_client.load("tests/test-data.ndjson", format="arrow")
+        self.assertIsInstance(table, pa.Table)
+        self.assertTrue(pa.types.is_dictionary(table.schema.field("name").type))
+        pd.testing.assert_frame_equal(
+            table_to_frame(table),
+            sage_data_client.load("tests/test-data.ndjson"),
+            check_dtype=False,
+        )
+
+    def test_query_format_arrow(self):
+        with Server(records()) as stub:
+            expect = sage_data_client.query(start="2023-09-28T16:00:00Z", endpoint=stub.endpoint)
+
+            for kwargs in [{}, {"shards": 3}, {"categorical": True}]:
+                table = sage_data_client.query(
+                    start="2023-09-28T16:00:00Z", endpoint=stub.endpoint, format="arrow", **kwargs
+                )
+                self.assertIsInstance(table, pa.Table)
+                self.assertEqual(table.num_rows, len(expect))
+                self.assertEqual(table.column("timestamp").type, pa.timestamp("ns", "UTC"))
+                self.assertEqual(sorted(table.column("value").to_pylist()), sorted(expect.value))
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            sage_data_client.load("tests/test-data.ndjson", engine="rust")
+        with self.assertRaises(ValueError):
+            sage_data_client.load("tests/test-data.ndjson", format="polars")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from urllib.error import HTTPError
+import unittest
+import warnings
+import pandas as pd
+import sage_data_client
+from sage_data_client.server import Server
+
+
+START = pd.Timestamp("2023-01-01T00:00:00Z")
+END = START + pd.Timedelta(days=1)
+
+
+def records(n, series=10):
+    for i in range(n):
+        t = START + pd.Timedelta(int(i / n * 86400e9), unit="ns")
+        yield json.dumps(
+            {
+                "timestamp": t.isoformat(),
+                "name": "env.temperature" if i % 2 else "env.pressure",
+                "value": i,
+                "meta": {"vsn": f"W{i % series:03d}"},
+            }
+        )
+
+
+def normalize(df):
+    return df.sort_values(["timestamp", "name", "meta.vsn"], ignore_index=True)
+
+
+class TestDownload(unittest.TestCase):
+    def setUp(self):
+        self.server = Server(records(2000))
+        self.server.start()
+        self.tmp = TemporaryDirectory()
+        self.path = Path(self.tmp.name, "backfill")
+        self.kwargs = dict(start=START, end=END, chunk_window="6h", endpoint=self.server.endpoint)
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def manifest(self):
+        with open(self.path / "manifest.json") as f:
+            return json.load(f)
+
+    def test_download(self):
+        expect = sage_data_client.query(start=START, end=END, endpoint=self.server.endpoint)
+        progress = []
+
+        rows = sage_data_client.download(self.path, progress=lambda *args: progress.append(args), **self.kwargs)
+        self.assertEqual(rows, 2000)
+
+        manifest = self.manifest()
+        self.assertTrue(manifest["complete"])
+        self.assertEqual([s["file"] for s in manifest["shards"]], [f"00000{i}.ndjson.gz" for i in range(4)])
+        self.assertEqual([s["rows"] for s in manifest["shards"]], [500] * 4)
+        self.assertEqual(manifest["shards"][1]["start"], "2023-01-01T06:00:00.000000Z")
+        self.assertEqual(progress[-1], (2000, 2000, 1.0))
+
+        pd.testing.assert_frame_equal(normalize(sage_data_client.load(self.path)), normalize(expect))
+        pd.testing.assert_frame_equal(normalize(sage_data_client.load_many(self.path, workers=1)), normalize(expect))
+        self.assertEqual(sum(len(df) for df in sage_data_client.load_iter(self.path, chunksize=300)), 2000)
+
+        df = sage_data_client.load(str(self.path), filter={"vsn": "W001"}, columns=["timestamp", "value"])
+        self.assertEqual(list(df.columns), ["timestamp", "value"])
+        self.assertEqual(len(df), 200)
+
+        # a complete download isn't requested again
+        self.server.requests.clear()
+        self.assertEqual(sage_data_client.download(self.path, **self.kwargs), 2000)
+        self.assertEqual(self.server.requests, [])
+
+    def test_resume(self):
+        client = sage_data_client.Client(self.server.endpoint, retries=0)
+        self.server.failures.extend([None, None, 400])
+
+        with self.assertRaises(HTTPError):
+            sage_data_client.download(self.path, client=client, retries=0, **self.kwargs)
+
+        manifest = self.manifest()
+        self.assertFalse(manifest["complete"])
+        self.assertEqual(len(manifest["shards"]), 2)
+        self.assertEqual(sorted(p.name for p in self.path.iterdir()), ["000000.ndjson.gz", "000001.ndjson.gz", "manifest.json"])
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            self.assertEqual(len(sage_data_client.load(self.path)), 1000)
+        self.assertEqual(len(caught), 1)
+
+        # only the missing windows are requested when resuming
+        self.server.requests.clear()
+        self.assertEqual(sage_data_client.download(self.path, client=client, **self.kwargs), 2000)
+        self.assertEqual([q["start"] for q in self.server.requests], ["2023-01-01T12:00:00.000000Z", "2023-01-01T18:00:00.000000Z"])
+        self.assertEqual(len(sage_data_client.load(self.path)), 2000)
+
+    def test_retry(self):
+        client = sage_data_client.Client(self.server.endpoint, retries=0, backoff=0)
+        self.server.failures.extend([None, 503])
+
+        self.assertEqual(sage_data_client.download(self.path, client=client, retries=1, **self.kwargs), 2000)
+        self.assertEqual(len(self.server.requests), 5)
+
+    def test_workers(self):
+        expect = sage_data_client.query(start=START, end=END, endpoint=self.server.endpoint)
+        client = sage_data_client.Client(self.server.endpoint, retries=0)
+        self.server.failures.extend([None, 400])
+
+        # shards which finish after the failure are still recorded
+        with self.assertRaises(HTTPError):
+            sage_data_client.download(self.path, client=client, retries=0, workers=3, **self.kwargs)
+        done = len(self.manifest()["shards"])
+        self.assertGreaterEqual(done, 2)
+
+        self.server.requests.clear()
+        self.assertEqual(sage_data_client.download(self.path, workers=3, **self.kwargs), 2000)
+        self.assertEqual(len(self.server.requests), 4 - done)
+        pd.testing.assert_frame_equal(normalize(sage_data_client.load(self.path)), normalize(expect))
+
+    def test_verify(self):
+        sage_data_client.download(self.path, **self.kwargs)
+
+        # shards which are missing or don't match the manifest's counts are downloaded again
+        (self.path / "000000.ndjson.gz").unlink()
+        manifest = self.manifest()
+        manifest["shards"][2]["rows"] = 1
+        with open(self.path / "manifest.json", "w") as f:
+            json.dump(manifest, f)
+
+        self.server.requests.clear()
+        self.assertEqual(sage_data_client.download(self.path, verify=True, **self.kwargs), 2000)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual([s["rows"] for s in self.manifest()["shards"]], [500] * 4)
+
+    def test_different_query(self):
+        sage_data_client.download(self.path, **self.kwargs)
+
+        with self.assertRaises(ValueError):
+            sage_data_client.download(self.path, **dict(self.kwargs, filter={"name": "env.pressure"}))
+        with self.assertRaises(ValueError):
+            sage_data_client.download(self.path, **dict(self.kwargs, chunk_window="1h"))
+        with self.assertRaises(ValueError):
+            sage_data_client.download(Path(self.tmp.name, "other"), **dict(self.kwargs, chunk_window="0s"))
+
+
+if __name__ == "__main__":
+    unittest.main()
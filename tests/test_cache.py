@@ -0,0 +1,264 @@
+import os
+import tempfile
+import time
+import unittest
+import pandas as pd
+import sage_data_client
+from sage_data_client.server import Server
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        with open("tests/test-data.ndjson", "rb") as f:
+            self.server = Server(f)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def query(self, cache, start="2023-09-28T15:56:00Z", end="2023-09-28T16:02:00Z", **kwargs):
+        return sage_data_client.query(
+            start=start,
+            end=end,
+            endpoint=self.server.endpoint,
+            cache=cache,
+            **kwargs,
+        )
+
+    def test_hit_skips_request(self):
+        cache = sage_data_client.QueryCache(self.tempdir.name)
+
+        with self.server:
+            df1 = self.query(cache)
+            df2 = self.query(cache)
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(len(df1), 1611)
+        self.assertTrue((df1.fillna("") == df2.fillna("")).all().all())
+        self.assertTrue((df1.dtypes == df2.dtypes).all())
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+        self.assertGreater(stats["bytes"], 0)
+
+    def test_key_includes_query(self):
+        cache = sage_data_client.QueryCache(self.tempdir.name)
+
+        with self.server:
+            self.query(cache, filter={"vsn": "W0A0"})
+            self.query(cache, filter={"vsn": "W0A1"})
+            self.query(cache, filter={"vsn": "W0A0"}, head=1)
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(cache.stats()["entries"], 3)
+
+    def test_key_includes_options(self):
+        cache = sage_data_client.QueryCache(self.tempdir.name)
+
+        with self.server:
+            expect = self.query(None)
+            categorical = self.query(cache, categorical=True)
+            df = self.query(cache)
+            self.assertEqual(len(self.server.requests), 3)
+            self.assertEqual(self.query(cache).dtypes.to_dict(), expect.dtypes.to_dict())
+
+        self.assertEqual(categorical.name.dtype, "category")
+        self.assertEqual(df.dtypes.to_dict(), expect.dtypes.to_dict())
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_relative_bypasses_cache(self):
+        cache = sage_data_client.QueryCache(self.tempdir.name)
+
+        with self.server:
+            self.query(cache, start="-1h", end=None)
+            self.query(cache, start="-1h", end=None)
+            self.query(cache, end="now")
+            # absolute end in the future may still receive new data
+            self.query(cache, end="2200-01-01T00:00:00Z")
+
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertEqual(cache.stats()["bypassed"], 4)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_ttl(self):
+        cache = sage_data_client.QueryCache(self.tempdir.name, ttl=60)
+
+        with self.server:
+            self.query(cache)
+            # age entry past ttl
+            for path in cache.path.iterdir():
+                old = time.time() - 120
+                os.utime(path, (old, old))
+            self.query(cache)
+
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_storage_format(self):
+        cache = sage_data_client.QueryCache(self.tempdir.name)
+
+        with self.server:
+            df = self.query(cache)
+        self.assertEqual([p.suffix for p in cache.path.iterdir()], [".parquet" if pa is not None else ".gz"])
+
+        # pickles in the cache directory are never loaded
+        path = next(cache.path.iterdir())
+        pd.DataFrame().to_pickle(path.with_name(path.name.split(".")[0] + ".pkl"))
+        path.unlink()
+        with self.server:
+            pd.testing.assert_frame_equal(self.query(cache), df)
+        self.assertEqual(cache.stats()["hits"], 0)
+
+        # values with mixed types are stored exactly
+        lines = [
+            b'{"timestamp":"2023-09-28T15:56:00.123456789Z","name":"x","value":1,"meta":{"vsn":"W001"}}',
+            b'{"timestamp":"2023-09-28T15:57:00Z","name":"x","value":"on","meta":{}}',
+        ]
+        with Server(lines) as server:
+            expect = sage_data_client.query(start="2023-09-28T15:56:00Z", end="2023-09-28T16:02:00Z", endpoint=server.endpoint)
+            for _ in range(2):
+                df = sage_data_client.query(start="2023-09-28T15:56:00Z", end="2023-09-28T16:02:00Z", endpoint=server.endpoint, cache=cache)
+                pd.testing.assert_frame_equal(df, expect)
+            self.assertEqual(len(server.requests), 2)
+
+    def test_lru_eviction(self):
+        cache = sage_data_client.QueryCache(self.tempdir.name)
+
+        with self.server:
+            self.query(cache, filter={"vsn": "W0A0"})
+            entry_size = cache.stats()["bytes"]
+            cache.max_bytes = int(entry_size * 2.5)
+
+            self.query(cache, filter={"vsn": "W0A1"})
+            time.sleep(0.01)
+            # use first entry so second is least recently used
+            self.query(cache, filter={"vsn": "W0A0"})
+            time.sleep(0.01)
+            self.query(cache, filter={"vsn": "W0A2"})
+            self.assertEqual(cache.stats()["entries"], 2)
+
+            self.server.requests.clear()
+            self.query(cache, filter={"vsn": "W0A0"})
+            self.query(cache, filter={"vsn": "W0A2"})
+            self.assertEqual(len(self.server.requests), 0)
+            self.query(cache, filter={"vsn": "W0A1"})
+            self.assertEqual(len(self.server.requests), 1)
+
+
+class TestRangeCache(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        with open("tests/test-data.ndjson", "rb") as f:
+            self.server = Server(f)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def query(self, start, end, cache=None, **kwargs):
+        return sage_data_client.query(
+            start=f"2023-09-28T{start}Z",
+            end=f"2023-09-28T{end}Z",
+            endpoint=self.server.endpoint,
+            cache=cache,
+            **kwargs,
+        )
+
+    def assertSameRows(self, df1, df2):
+        self.assertEqual(len(df1), len(df2))
+        by = ["timestamp", "meta.vsn", "meta.sensor"]
+        df1 = df1.sort_values(by, ignore_index=True).fillna("")
+        df2 = df2.sort_values(by, ignore_index=True).fillna("")[df1.columns]
+        self.assertTrue((df1 == df2).all().all())
+
+    def test_fetches_only_missing_intervals(self):
+        cache = sage_data_client.RangeCache(self.tempdir.name, settle=0)
+
+        with self.server:
+            df = self.query("15:56:00", "15:59:00", cache)
+            self.assertSameRows(df, self.query("15:56:00", "15:59:00"))
+            self.assertEqual(len(self.server.requests), 2)
+
+            self.server.requests.clear()
+            df = self.query("15:57:00", "16:02:00", cache)
+            self.assertSameRows(df, self.query("15:57:00", "16:02:00"))
+            self.assertEqual(len(self.server.requests), 2)
+            self.assertEqual(self.server.requests[0]["start"], "2023-09-28T15:59:00.000000Z")
+            self.assertEqual(self.server.requests[0]["end"], "2023-09-28T16:02:00.000000Z")
+
+            self.server.requests.clear()
+            df = self.query("15:56:00", "16:02:00", cache)
+            self.assertSameRows(df, self.query("15:56:00", "16:02:00"))
+            self.assertTrue(df.timestamp.is_monotonic_increasing)
+            self.assertEqual(len(self.server.requests), 1)
+
+        self.assertEqual(cache.stats()["requests"], 2)
+
+    def test_separate_filters(self):
+        cache = sage_data_client.RangeCache(self.tempdir.name, settle=0)
+
+        with self.server:
+            self.query("15:56:00", "15:59:00", cache, filter={"vsn": "W0A0"})
+            df = self.query("15:56:00", "15:59:00", cache, filter={"vsn": "W0A1"})
+            self.assertEqual(set(df["meta.vsn"]), {"W0A1"})
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(cache.stats()["filters"], 2)
+
+    def test_separate_options(self):
+        cache = sage_data_client.RangeCache(self.tempdir.name, settle=0)
+
+        with self.server:
+            expect = self.query("15:56:00", "15:59:00")
+            categorical = self.query("15:56:00", "15:59:00", cache, categorical=True)
+            df = self.query("15:56:00", "15:59:00", cache)
+
+        self.assertEqual(categorical.name.dtype, "category")
+        self.assertEqual(df.dtypes.to_dict(), expect.dtypes.to_dict())
+        self.assertEqual(cache.stats()["filters"], 2)
+
+    def test_unsettled_data_is_refetched(self):
+        cache = sage_data_client.RangeCache(self.tempdir.name, settle=1e9)
+
+        with self.server:
+            self.query("15:56:00", "15:59:00", cache)
+            self.query("15:56:00", "15:59:00", cache)
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(cache.stats()["segments"], 0)
+
+    def test_head_tail_bypass(self):
+        cache = sage_data_client.RangeCache(self.tempdir.name, settle=0)
+
+        with self.server:
+            self.query("15:56:00", "15:59:00", cache, tail=1)
+            self.query("15:56:00", "15:59:00", cache, tail=1)
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(cache.stats()["bypassed"], 2)
+
+    def test_compaction(self):
+        cache = sage_data_client.RangeCache(self.tempdir.name, settle=0, max_segments=2)
+
+        with self.server:
+            self.query("15:56:00", "15:57:00", cache)
+            self.query("15:58:00", "15:59:00", cache)
+            self.query("16:00:00", "16:01:00", cache)
+            self.assertEqual(cache.stats()["segments"], 3)
+            self.query("15:56:30", "16:02:00", cache)
+            self.assertEqual(cache.stats()["segments"], 1)
+
+            self.server.requests.clear()
+            df = self.query("15:56:00", "16:02:00", cache)
+            self.assertEqual(len(self.server.requests), 0)
+            self.assertSameRows(df, self.query("15:56:00", "16:02:00"))
+
+
+if __name__ == "__main__":
+    unittest.main()
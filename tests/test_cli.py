@@ -0,0 +1,160 @@
+from gzip import compress
+from io import BytesIO, TextIOWrapper
+import json
+from pathlib import Path
+import sys
+from tempfile import TemporaryDirectory
+import unittest
+from unittest import mock
+import pandas as pd
+import sage_data_client
+from sage_data_client.cli import main
+from sage_data_client.server import Server
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+START = pd.Timestamp("2023-01-01T00:00:00Z")
+END = START + pd.Timedelta(days=1)
+
+
+def records(n, series=10):
+    for i in range(n):
+        t = START + pd.Timedelta(int(i / n * 86400e9), unit="ns")
+        yield json.dumps(
+            {
+                "timestamp": t.isoformat(),
+                "name": "env.temperature" if i % 2 else "env.pressure",
+                "value": i,
+                "meta": {"vsn": f"W{i % series:03d}"},
+            }
+        )
+
+
+def run(*argv, stdin=b""):
+    """
+    run runs the command line with `argv` and returns what it wrote to stdout.
+    """
+    stdout, old = TextIOWrapper(BytesIO()), (sys.stdin, sys.stdout)
+    sys.stdin, sys.stdout = TextIOWrapper(BytesIO(stdin)), stdout
+    try:
+        main(list(argv))
+        stdout.flush()
+        return stdout.buffer.getvalue()
+    finally:
+        sys.stdin, sys.stdout = old
+
+
+def normalize(df):
+    return df.sort_values(["timestamp", "name", "meta.vsn"], ignore_index=True)
+
+
+class TestCLI(unittest.TestCase):
+    def setUp(self):
+        self.server = Server(records(2000))
+        self.server.start()
+        self.tmp = TemporaryDirectory()
+        self.args = ["--start", START.isoformat(), "--end", END.isoformat(), "--endpoint", self.server.endpoint]
+        self.expect = sage_data_client.query(start=START, end=END, endpoint=self.server.endpoint)
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def test_query(self):
+        for extra in [[], ["--workers", "3"], ["--max-rows", "300"]]:
+            with self.subTest(extra=extra):
+                data = run("query", *self.args, *extra)
+                pd.testing.assert_frame_equal(normalize(sage_data_client.load(BytesIO(data))), normalize(self.expect))
+
+        data = run("query", *self.args, "-f", "name=env.pressure", "--filter", "vsn=W002|W004")
+        self.assertEqual(len(sage_data_client.load(BytesIO(data))), 400)
+
+        # relative times aren't mistaken for options
+        self.assertEqual(run("query", "--start", "-1h", "--end", "-30m", "--endpoint", self.server.endpoint), b"")
+
+        path = Path(self.tmp.name, "out.ndjson.gz")
+        self.assertEqual(run("query", *self.args, "-o", str(path)), b"")
+        self.assertEqual(len(sage_data_client.load(path)), 2000)
+
+    def test_query_errors(self):
+        for extra in [["-f", "name"], ["--workers", "0"], ["--workers", "2", "--max-rows", "10"]]:
+            with self.subTest(extra=extra), self.assertRaises(SystemExit) as cm:
+                run("query", *self.args, *extra)
+            self.assertEqual(cm.exception.code, 1)
+
+    def test_download(self):
+        path = Path(self.tmp.name, "backfill")
+        run("download", *self.args, "--chunk-window", "6h", "--workers", "2", str(path))
+        self.assertEqual(len(list(path.glob("*.ndjson.gz"))), 4)
+        pd.testing.assert_frame_equal(normalize(sage_data_client.load(path)), normalize(self.expect))
+
+    def test_convert(self):
+        path = Path(self.tmp.name, "data.csv.gz")
+        run("convert", "tests/test-data.ndjson.gz", str(path), "--chunksize", "500")
+        expect = sage_data_client.load("tests/test-data.ndjson")
+        df = pd.read_csv(path, parse_dates=["timestamp"])
+        self.assertEqual(list(df.columns), list(expect.columns))
+        pd.testing.assert_series_equal(df.value, expect.value)
+        pd.testing.assert_series_equal(df["meta.vsn"], expect["meta.vsn"], check_dtype=False)
+
+        # piped from stdin, keeping only the meta fields selected
+        with open("tests/test-data.ndjson", "rb") as f:
+            data = run("convert", "-", "-", "--columns", "timestamp,value,meta.vsn", stdin=f.read())
+        df = sage_data_client.load(BytesIO(data))
+        self.assertEqual(list(df.columns), ["timestamp", "name", "value", "meta.vsn"])
+        pd.testing.assert_frame_equal(df, expect[["timestamp", "name", "value", "meta.vsn"]])
+
+        with self.assertRaises(SystemExit):
+            run("convert", "tests/test-data.ndjson", str(Path(self.tmp.name, "data.xlsx")))
+
+    @unittest.skipUnless(pa is not None, "requires pyarrow")
+    def test_convert_arrow(self):
+        path = Path(self.tmp.name, "backfill")
+        run("download", *self.args, "--chunk-window", "6h", str(path))
+
+        for suffix in [".parquet", ".feather"]:
+            with self.subTest(suffix=suffix):
+                out = Path(self.tmp.name, "data" + suffix)
+                run("convert", str(path), str(out), "--chunksize", "300")
+                pd.testing.assert_frame_equal(
+                    normalize(sage_data_client.load(out)),
+                    normalize(self.expect.astype({"value": "float64"})),
+                )
+
+    def test_stats(self):
+        data = run("stats", "--by", "meta.vsn,name", "--csv", "--chunksize", "150", "tests/test-data.ndjson")
+        df = pd.read_csv(BytesIO(data), index_col=["meta.vsn", "name"])
+
+        grouped = sage_data_client.load("tests/test-data.ndjson").groupby(["meta.vsn", "name"])
+        pd.testing.assert_frame_equal(df[["count", "min", "max", "mean"]], grouped.value.agg(["count", "min", "max", "mean"]), check_names=False)
+        self.assertEqual(list(pd.to_datetime(df["first"])), list(grouped.timestamp.min()))
+        self.assertEqual(list(pd.to_datetime(df["last"])), list(grouped.timestamp.max()))
+
+        # stats of piped query results are read as a stream, without a temporary copy
+        with mock.patch("sage_data_client.cli.TemporaryFile", side_effect=AssertionError("stdin was spooled")):
+            data = run("stats", stdin=run("query", *self.args))
+        self.assertIn(b"env.pressure", data)
+        self.assertIn(b"1000", data)
+
+    def test_compressed_stdin(self):
+        with open("tests/test-data.ndjson", "rb") as f:
+            data = f.read()
+
+        expect = run("stats", "--csv", "tests/test-data.ndjson")
+        self.assertEqual(run("stats", "--csv", "--input-encoding", "gzip", stdin=compress(data)), expect)
+
+        # convert reads stdin twice for csv output, so it's decompressed into a temporary file
+        path = Path(self.tmp.name, "data.csv")
+        run("convert", "-", str(path), "--input-encoding", "gzip", stdin=compress(data))
+        self.assertEqual(len(pd.read_csv(path)), len(sage_data_client.load("tests/test-data.ndjson")))
+
+        data = run("convert", "-", "-", "--input-encoding", "gzip", stdin=compress(data))
+        pd.testing.assert_frame_equal(sage_data_client.load(BytesIO(data)), sage_data_client.load("tests/test-data.ndjson"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import time
+import unittest
+from urllib.error import HTTPError, URLError
+import sage_data_client
+from sage_data_client.server import Server
+
+
+class TestClient(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test-data.ndjson", "rb") as f:
+            self.server = Server(f)
+
+    def query(self, client, **kwargs):
+        return client.query(
+            start="2023-09-28T15:56:00Z",
+            end="2023-09-28T16:02:00Z",
+            **kwargs,
+        )
+
+    def test_reuses_connection(self):
+        with self.server:
+            with sage_data_client.Client(self.server.endpoint) as client:
+                for vsn in ["W0A0", "W0A1", "W0A2"]:
+                    df = self.query(client, filter={"vsn": vsn})
+                    self.assertEqual(set(df["meta.vsn"]), {vsn})
+
+        self.assertEqual(self.server.connections, 1)
+
+    def test_default_client(self):
+        with self.server:
+            for _ in range(3):
+                sage_data_client.query(start="2023-09-28T15:56:00Z", endpoint=self.server.endpoint)
+            sage_data_client.client.default_client(self.server.endpoint).close()
+
+        self.assertIs(
+            sage_data_client.client.default_client(self.server.endpoint),
+            sage_data_client.client.default_client(self.server.endpoint),
+        )
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_pool_size(self):
+        with self.server:
+            with sage_data_client.Client(self.server.endpoint, pool_size=2) as client:
+                with ThreadPoolExecutor(8) as executor:
+                    frames = list(executor.map(lambda _: self.query(client), range(16)))
+
+        self.assertTrue(all(len(df) == 1611 for df in frames))
+        self.assertLessEqual(self.server.connections, 2)
+
+    def test_retry_transient_failures(self):
+        self.server.failures = [503, 502]
+
+        with self.server:
+            with sage_data_client.Client(self.server.endpoint, backoff=0.01) as client:
+                df = self.query(client)
+
+        self.assertEqual(len(df), 1611)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_no_retry_client_errors(self):
+        self.server.failures = [400]
+
+        with self.server:
+            with sage_data_client.Client(self.server.endpoint, backoff=0.01) as client:
+                with self.assertRaises(HTTPError) as cm:
+                    self.query(client)
+
+        self.assertEqual(cm.exception.code, 400)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_retries_exhausted(self):
+        self.server.failures = [503] * 3
+
+        with self.server:
+            with sage_data_client.Client(self.server.endpoint, retries=2, backoff=0.01) as client:
+                with self.assertRaises(HTTPError):
+                    self.query(client)
+
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_connection_error(self):
+        with sage_data_client.Client("http://127.0.0.1:1/", retries=1, backoff=0.01) as client:
+            with self.assertRaises(URLError):
+                self.query(client)
+
+
+class TestAsyncClient(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test-data.ndjson", "rb") as f:
+            self.server = Server(f)
+
+    def run_async(self, coro):
+        return asyncio.get_event_loop().run_until_complete(coro)
+
+    def test_aquery(self):
+        async def run():
+            async with sage_data_client.AsyncClient(self.server.endpoint) as client:
+                return await client.aquery(start="2023-09-28T15:56:00Z", filter={"vsn": "W0A0"})
+
+        with self.server:
+            df = self.run_async(run())
+
+        self.assertEqual(set(df["meta.vsn"]), {"W0A0"})
+
+    def test_aquery_many_preserves_order(self):
+        vsns = ["W0A0", "W0A1", "W0A2", "W01B", "V015", "V040", "V041", "W0AA"] * 3
+
+        async def run():
+            async with sage_data_client.AsyncClient(self.server.endpoint, max_concurrency=4) as client:
+                return await client.aquery_many(
+                    [{"start": "2023-09-28T15:56:00Z", "filter": {"vsn": vsn}} for vsn in vsns],
+                    max_concurrency=3,
+                )
+
+        with self.server:
+            results = self.run_async(run())
+
+        self.assertEqual(len(results), len(vsns))
+        for vsn, df in zip(vsns, results):
+            self.assertGreater(len(df), 0)
+            self.assertEqual(set(df["meta.vsn"]), {vsn})
+        self.assertLessEqual(self.server.connections, 4)
+
+    def test_exit_doesnt_block_loop(self):
+        self.server.latency = 0.5
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.02)
+
+        async def run():
+            ticker = asyncio.ensure_future(tick())
+            async with sage_data_client.AsyncClient(self.server.endpoint) as client:
+                task = asyncio.ensure_future(client.aquery(start="2023-09-28T15:56:00Z", filter={"vsn": "W0A0"}))
+                await asyncio.sleep(0.1)
+                exiting = time.monotonic()
+            ticker.cancel()
+            return exiting, await task
+
+        with self.server:
+            exiting, df = self.run_async(run())
+
+        # the loop kept running while the query in flight finished
+        self.assertGreater(len([t for t in ticks if t > exiting]), 5)
+        self.assertEqual(set(df["meta.vsn"]), {"W0A0"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+from gzip import compress
+from io import BytesIO
+from pathlib import Path
+import socket
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
+import time
+import unittest
+import pandas as pd
+import sage_data_client
+from sage_data_client import compression
+from sage_data_client.server import Server
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+DATA = Path("tests/test-data.ndjson").read_bytes()
+
+
+def encoders():
+    yield "identity", lambda data: data
+    yield "gzip", compress
+    if zstandard is not None:
+        yield "zstd", zstandard.compress
+    if brotli is not None:
+        yield "br", brotli.compress
+
+
+class Stalled(BytesIO):
+    """
+    Stalled returns its data and then blocks reading until it's interrupted, like a response whose server stopped sending.
+    """
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.interrupted = Event()
+
+    def read(self, size=-1):
+        data = super().read(size)
+        if not data:
+            self.interrupted.wait(30)
+        return data
+
+
+def stalled_server(body):
+    """
+    stalled_server starts a server which sends the start of a gzip response with body `body` and then stops sending. It returns the endpoint and a function to stop the server.
+    """
+    listener = socket.create_server(("127.0.0.1", 0))
+    stop = Event()
+
+    def serve():
+        conn, _ = listener.accept()
+        conn.recv(65536)
+        header = f"HTTP/1.1 200 OK\r\nContent-Encoding: gzip\r\nContent-Length: {len(body) * 2}\r\n\r\n"
+        conn.sendall(header.encode() + body)
+        stop.wait(30)
+        conn.close()
+
+    Thread(target=serve, daemon=True).start()
+
+    def close():
+        stop.set()
+        listener.close()
+
+    return f"http://127.0.0.1:{listener.getsockname()[1]}/", close
+
+
+class TestDecode(unittest.TestCase):
+    def test_decode(self):
+        for encoding, encode in encoders():
+            for threaded in [False, True]:
+                with self.subTest(encoding=encoding, threaded=threaded):
+                    with compression.decode(BytesIO(encode(DATA)), encoding, threaded=threaded) as f:
+                        self.assertEqual(b"".join(f), DATA)
+
+    def test_decode_concatenated(self):
+        # concatenated gzip members and zstd frames decode as a single stream
+        members = [("gzip", compress)]
+        if zstandard is not None:
+            members.append(("zstd", zstandard.compress))
+        for encoding, encode in members:
+            data = encode(DATA[:1000]) + encode(DATA[1000:])
+            with compression.decode(BytesIO(data), encoding) as f:
+                self.assertEqual(f.read(), DATA)
+
+    def test_decode_truncated(self):
+        for threaded in [False, True]:
+            with self.assertRaises(EOFError):
+                with compression.decode(BytesIO(compress(DATA)[:-100]), "gzip", threaded=threaded) as f:
+                    f.read()
+
+    def test_decode_close_early(self):
+        data = compress(DATA * 50)
+        f = compression.decode(BytesIO(data), "gzip", threaded=True)
+        f.readline()
+        f.close()
+        self.assertFalse(f.raw.thread.is_alive())
+
+    def test_decode_close_interrupts(self):
+        source = Stalled(compress(DATA)[:-100])
+        f = compression.decode(source, "gzip", threaded=True, interrupt=source.interrupted.set)
+        f.readline()
+
+        t = time.monotonic()
+        f.close()
+        self.assertLess(time.monotonic() - t, 5)
+        self.assertTrue(source.interrupted.is_set())
+        self.assertFalse(f.raw.thread.is_alive())
+
+    def test_response_close_early(self):
+        endpoint, stop = stalled_server(compress(DATA * 20)[: compression.CHUNK_SIZE + 1000])
+        self.addCleanup(stop)
+        client = sage_data_client.Client(endpoint, retries=0)
+
+        t = time.monotonic()
+        with client.open({"start": "-1h"}) as f:
+            f.readline()
+        # the decode thread blocked reading the stalled response is woken instead of waited for
+        self.assertLess(time.monotonic() - t, 5)
+        client.close()
+
+    def test_decode_unsupported(self):
+        with self.assertRaises(ValueError):
+            compression.decode(BytesIO(DATA), "lzma")
+
+    def test_accept_encoding(self):
+        accepted = compression.accept_encoding().split(", ")
+        self.assertEqual(accepted[-1], "gzip")
+        self.assertEqual("zstd" in accepted, zstandard is not None)
+
+
+class TestCompressedLoad(unittest.TestCase):
+    def test_load_suffixes(self):
+        expect = sage_data_client.load("tests/test-data.ndjson")
+        suffixes = {"gzip": ".gz", "zstd": ".zst", "br": ".br"}
+
+        with TemporaryDirectory() as dir:
+            for encoding, encode in encoders():
+                if encoding == "identity":
+                    continue
+                path = Path(dir, "data.ndjson" + suffixes[encoding])
+                path.write_bytes(encode(DATA))
+                pd.testing.assert_frame_equal(sage_data_client.load(path), expect)
+                self.assertEqual(sum(len(df) for df in sage_data_client.load_iter(path, chunksize=100)), len(expect))
+
+    def test_query_encodings(self):
+        expect = sage_data_client.load("tests/test-data.ndjson")
+
+        for encoding, _ in encoders():
+            with self.subTest(encoding=encoding):
+                with Server(DATA.splitlines(), encodings=[encoding]) as stub:
+                    client = sage_data_client.Client(stub.endpoint)
+                    for _ in range(3):
+                        df = client.query(start="2023-09-28T00:00:00Z")
+                        pd.testing.assert_frame_equal(df, expect)
+                    # fully decoded responses leave the connection reusable
+                    self.assertEqual(stub.connections, 1)
+                    client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
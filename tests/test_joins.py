@@ -0,0 +1,101 @@
+import json
+import random
+import unittest
+import pandas as pd
+import sage_data_client
+from sage_data_client.server import Server
+
+
+START = pd.Timestamp("2023-09-28T16:00:00Z")
+
+
+def frame(seed, n=500, vsns=("W023", "W039", "W07A")):
+    rng = random.Random(seed)
+    return pd.DataFrame(
+        {
+            "timestamp": pd.to_datetime([START.value + rng.randrange(0, 3600 * 10**9) for _ in range(n)], utc=True),
+            "name": "env.temperature",
+            "meta.vsn": [rng.choice(vsns) for _ in range(n)],
+            "value": [round(rng.uniform(-10, 40), 3) for _ in range(n)],
+        }
+    )
+
+
+class TestJoin(unittest.TestCase):
+    def test_asof_matches_merge_asof(self):
+        frames = {"a": frame(0), "b": frame(1), "c": frame(2, vsns=("W023", "W039", "W0B0"))}
+        # categorical results, with different categories, can be joined with others
+        frames["c"]["meta.vsn"] = frames["c"]["meta.vsn"].astype("category")
+
+        for direction in ["nearest", "backward", "forward"]:
+            for tolerance in [None, "5s"]:
+                with self.subTest(direction=direction, tolerance=tolerance):
+                    result = sage_data_client.join(frames, how="asof", tolerance=tolerance, direction=direction)
+
+                    # reference aligns each group separately
+                    parts = []
+                    for vsn, left in frames["a"].groupby("meta.vsn", observed=True):
+                        left = left[["timestamp", "value"]].rename(columns={"value": "a"}).sort_values("timestamp", kind="stable")
+                        for label in ["b", "c"]:
+                            right = frames[label][frames[label]["meta.vsn"] == vsn][["timestamp", "value"]].sort_values("timestamp")
+                            left = pd.merge_asof(
+                                left,
+                                right.rename(columns={"value": label}),
+                                on="timestamp",
+                                tolerance=pd.Timedelta(tolerance) if tolerance else None,
+                                direction=direction,
+                            )
+                        parts.append(left.assign(**{"meta.vsn": vsn}))
+                    expect = pd.concat(parts).set_index(["meta.vsn", "timestamp"])
+
+                    self.assertEqual(len(result), len(frames["a"]))
+                    pd.testing.assert_frame_equal(result, expect, check_index_type=False, check_dtype=False)
+
+    def test_window_matches_resample(self):
+        a, b = frame(0), frame(1)
+        b["value"] = b.value.astype(object)
+        b.loc[::10, "value"] = "error"
+
+        result = sage_data_client.join({"a": a, "b": b}, how="window", tolerance="5m")
+
+        def resample(df):
+            df = df.assign(value=pd.to_numeric(df.value, errors="coerce"))
+            return df.groupby("meta.vsn", observed=True).resample("5min", on="timestamp").value.mean()
+
+        expect = pd.DataFrame({"a": resample(a), "b": resample(b)}).dropna(how="all")
+        pd.testing.assert_frame_equal(result, expect, check_index_type=False, check_freq=False)
+
+    def test_without_by(self):
+        a = frame(0)
+        result = sage_data_client.join({"a": a, "count": a}, by=[], how="window", tolerance="1h", func="count")
+        self.assertEqual(list(result.index), [START])
+        self.assertEqual(result["count"].tolist(), [len(a)])
+
+    def test_filters(self):
+        lines = []
+        for label, df in [("env.temperature", frame(0)), ("env.pressure", frame(1))]:
+            for r in df.assign(name=label).itertuples(index=False):
+                lines.append(json.dumps({"timestamp": r[0].isoformat(), "name": r.name, "value": r.value, "meta": {"vsn": r[2]}}))
+
+        with Server(lines) as server:
+            filters = {"temperature": {"name": "env.temperature"}, "pressure": {"name": "env.pressure"}}
+            result = sage_data_client.join(filters, start=START, end=START + pd.Timedelta("1h"), tolerance="10s", endpoint=server.endpoint)
+            frames = sage_data_client.query_many(filters, start=START, end=START + pd.Timedelta("1h"), endpoint=server.endpoint)
+
+        pd.testing.assert_frame_equal(result, sage_data_client.join(frames, tolerance="10s"))
+        self.assertEqual(len(result), 500)
+        self.assertGreater(result.pressure.notna().sum(), 0)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            sage_data_client.join({"a": frame(0)}, how="outer")
+        with self.assertRaises(ValueError):
+            sage_data_client.join({"a": frame(0)}, how="window")
+        with self.assertRaises(ValueError):
+            sage_data_client.join({"a": {"name": "env.temperature"}})
+        with self.assertRaises(ValueError):
+            sage_data_client.join({})
+
+
+if __name__ == "__main__":
+    unittest.main()
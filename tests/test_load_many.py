@@ -0,0 +1,93 @@
+from gzip import GzipFile
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import unittest
+import pandas as pd
+import sage_data_client
+
+
+def write_exports(dir, days=4):
+    for day in range(1, days + 1):
+        path = Path(dir, f"2023-09-{day:02d}.ndjson.gz")
+        with GzipFile(path, "wb") as f:
+            for hour in range(24):
+                for vsn in ["W023", "W039"]:
+                    for name in ["env.temperature", "env.pressure"]:
+                        meta = {"vsn": vsn, "sensor": "bme680"}
+                        # later exports include an extra meta field
+                        if day >= 3:
+                            meta["zone"] = "core"
+                        record = {
+                            "timestamp": f"2023-09-{day:02d}T{hour:02d}:00:00Z",
+                            "name": name,
+                            "value": day * 100 + hour,
+                            "meta": meta,
+                        }
+                        f.write(json.dumps(record).encode() + b"\n")
+
+
+class TestLoadMany(unittest.TestCase):
+    def setUp(self):
+        self.dir = TemporaryDirectory()
+        write_exports(self.dir.name)
+        self.pattern = str(Path(self.dir.name, "*.ndjson.gz"))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def expected(self):
+        paths = sorted(Path(self.dir.name).glob("*.ndjson.gz"))
+        return pd.concat([sage_data_client.load(p) for p in paths], ignore_index=True)
+
+    def test_load_many(self):
+        expect = self.expected()
+        for workers in [1, 2]:
+            df = sage_data_client.load_many(self.pattern, workers=workers)
+            pd.testing.assert_frame_equal(df, expect)
+
+        self.assertIn("meta.zone", df.columns)
+        self.assertEqual(df["meta.zone"].isna().sum(), 2 * 24 * 4)
+
+    def test_load_many_paths(self):
+        paths = sorted(Path(self.dir.name).glob("*.ndjson.gz"))
+        df = sage_data_client.load_many(paths[:2], workers=2)
+        self.assertEqual(len(df), 2 * 24 * 4)
+        self.assertNotIn("meta.zone", df.columns)
+
+    def test_load_many_filter(self):
+        expect = self.expected()
+        expect = expect[
+            (expect.name == "env.temperature")
+            & (expect["meta.vsn"] == "W039")
+            & (expect.timestamp >= pd.Timestamp("2023-09-02T12:00:00Z"))
+            & (expect.timestamp < pd.Timestamp("2023-09-04T00:00:00Z"))
+        ].reset_index(drop=True)
+
+        for workers in [1, 2]:
+            df = sage_data_client.load_many(
+                self.pattern,
+                workers=workers,
+                filter={"name": "env.temp*", "vsn": "W039"},
+                start="2023-09-02T12:00:00Z",
+                end="2023-09-04T00:00:00Z",
+            )
+            pd.testing.assert_frame_equal(df, expect)
+
+    def test_load_many_categorical(self):
+        df = sage_data_client.load_many(self.pattern, workers=2, categorical=True)
+        self.assertIsInstance(df.name.dtype, pd.CategoricalDtype)
+        self.assertIsInstance(df["meta.vsn"].dtype, pd.CategoricalDtype)
+        self.assertEqual(df.name.tolist(), self.expected().name.tolist())
+
+    def test_load_many_no_matches(self):
+        with self.assertRaises(FileNotFoundError):
+            sage_data_client.load_many(str(Path(self.dir.name, "*.csv")))
+
+        df = sage_data_client.load_many(self.pattern, filter={"vsn": "XXXX"})
+        self.assertEqual(len(df), 0)
+        self.assertEqual(df.columns.tolist(), ["timestamp", "name", "value"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import unittest
+import pandas as pd
+import sage_data_client
+from sage_data_client.server import Server
+
+
+START = pd.Timestamp("2023-01-01T00:00:00Z")
+END = START + pd.Timedelta(days=1)
+
+
+def records(n, series=10):
+    for i in range(n):
+        t = START + pd.Timedelta(int(i / n * 86400e9), unit="ns")
+        yield json.dumps(
+            {
+                "timestamp": t.isoformat(),
+                "name": "env.temperature" if i % 2 else "env.pressure",
+                "value": i,
+                "meta": {"vsn": f"W{i % series:03d}"},
+            }
+        )
+
+
+def normalize(df):
+    return df.sort_values(["timestamp", "name", "meta.vsn"], ignore_index=True)
+
+
+class TestPagination(unittest.TestCase):
+    def setUp(self):
+        self.server = Server(records(20000))
+        self.server.start()
+        self.kwargs = dict(start=START, end=END, endpoint=self.server.endpoint)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_estimate(self):
+        est = sage_data_client.estimate(**self.kwargs)
+        self.assertFalse(est.exact)
+        self.assertEqual(est.series, 10)
+        self.assertAlmostEqual(est.rows / 20000, 1, delta=0.05)
+        self.assertGreater(est.bytes, 0)
+
+        est = sage_data_client.estimate(start=START, end=START + pd.Timedelta(minutes=1), endpoint=self.server.endpoint)
+        self.assertTrue(est.exact)
+
+        # head and tail probes, then only a head probe when it holds every record
+        self.assertEqual([q.get("head") or q.get("tail") for q in self.server.requests], [10, 10, 10])
+
+        self.assertEqual(est.rows, len(sage_data_client.query(start=START, end=START + pd.Timedelta(minutes=1), endpoint=self.server.endpoint)))
+
+    def test_query(self):
+        expect = sage_data_client.query(**self.kwargs)
+        progress = []
+
+        self.server.requests.clear()
+        df = sage_data_client.query(max_rows=3000, progress=lambda *args: progress.append(args), **self.kwargs)
+
+        pd.testing.assert_frame_equal(normalize(df), normalize(expect))
+
+        pages = [q for q in self.server.requests if "head" not in q and "tail" not in q]
+        self.assertGreaterEqual(len(pages), 20000 // 3000)
+        self.assertEqual(pages[0]["start"], "2023-01-01T00:00:00.000000Z")
+        self.assertEqual(pages[-1]["end"], "2023-01-02T00:00:00.000000Z")
+        for a, b in zip(pages, pages[1:]):
+            self.assertEqual(a["end"], b["start"])
+
+        self.assertEqual(len(progress), len(pages))
+        self.assertEqual(progress[-1][0], 20000)
+        self.assertEqual(progress[-1][2], 1.0)
+
+        table = sage_data_client.query(max_rows=3000, format="series", **self.kwargs)
+        self.assertEqual(len(table), 20000)
+
+    def test_query_iter(self):
+        chunks = list(sage_data_client.query_iter(max_rows=5000, chunksize=1000, **self.kwargs))
+        self.assertTrue(all(len(df) <= 1000 for df in chunks))
+        self.assertEqual(sum(len(df) for df in chunks), 20000)
+
+    def test_exact(self):
+        # small results are returned from the probe without paging
+        kwargs = dict(self.kwargs, end=START + pd.Timedelta(minutes=1))
+        expect = sage_data_client.query(**kwargs)
+        self.server.requests.clear()
+        pages = list(sage_data_client.paginate(max_rows=1, **kwargs))
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(len(pages), 1)
+        pd.testing.assert_frame_equal(pages[0], expect)
+
+    def test_query_to_file(self):
+        expect = sage_data_client.query(**self.kwargs)
+
+        with TemporaryDirectory() as dir:
+            path = Path(dir, "data.ndjson.gz")
+            rows = sage_data_client.query_to_file(path, max_rows=4000, **self.kwargs)
+            self.assertEqual(rows, 20000)
+            pd.testing.assert_frame_equal(normalize(sage_data_client.load(path)), normalize(expect))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            sage_data_client.query(max_rows=100, head=1, **self.kwargs)
+        with self.assertRaises(ValueError):
+            sage_data_client.query(max_rows=100, shards=2, **self.kwargs)
+        with self.assertRaises(ValueError):
+            sage_data_client.query(max_rows=0, **self.kwargs)
+        with self.assertRaises(ValueError):
+            sage_data_client.query_iter(max_rows=100, tail=1, **self.kwargs)
+
+
+if __name__ == "__main__":
+    unittest.main()
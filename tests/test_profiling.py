@@ -0,0 +1,117 @@
+import logging
+from pathlib import Path
+import unittest
+import sage_data_client
+from sage_data_client import profiling
+from sage_data_client.server import Server
+
+DATA = Path("tests/test-data.ndjson").read_bytes()
+
+
+class TestProfiling(unittest.TestCase):
+    def test_query(self):
+        with Server(DATA.splitlines(), encodings=["gzip"]) as stub:
+            with sage_data_client.profile() as profiler:
+                df = sage_data_client.query(start="2023-09-28T00:00:00Z", endpoint=stub.endpoint)
+
+        self.assertEqual(len(profiler.records), 1)
+        stats = profiler.records[0]
+        self.assertEqual(stats.kind, "query")
+        self.assertEqual(stats.source["start"], "2023-09-28T00:00:00.000000Z")
+        self.assertEqual(stats.rows, len(df))
+        self.assertEqual(stats.encoding, "gzip")
+        self.assertEqual(stats.bytes_decoded, len(DATA))
+        self.assertLess(stats.bytes_read, stats.bytes_decoded)
+        self.assertEqual(set(stats.stages), set(profiling.STAGES))
+        self.assertLessEqual(sum(stats.stages[s] for s in profiling.STAGES if s != "decompress"), stats.duration)
+        self.assertIsNone(stats.error)
+
+    def test_query_shards_and_iter(self):
+        with Server(DATA.splitlines()) as stub:
+            with sage_data_client.profile() as profiler:
+                df = sage_data_client.query(
+                    start="2023-09-28T00:00:00Z", end="2023-09-29T00:00:00Z", endpoint=stub.endpoint, shards=3
+                )
+                chunks = list(sage_data_client.query_iter(start="2023-09-28T00:00:00Z", endpoint=stub.endpoint, chunksize=100))
+
+        self.assertEqual(len(profiler.records), 4)
+        self.assertEqual(sum(r.rows for r in list(profiler.records)[:3]), len(df))
+        self.assertEqual(profiler.records[3].rows, sum(map(len, chunks)))
+
+    def test_load(self):
+        with sage_data_client.profile() as profiler:
+            df = sage_data_client.load("tests/test-data.ndjson.gz")
+            filtered = sage_data_client.load("tests/test-data.ndjson", filter={"vsn": "W06F"})
+            chunks = list(sage_data_client.load_iter("tests/test-data.ndjson", chunksize=100))
+
+        gz, plain, it = profiler.records
+        self.assertEqual((gz.kind, gz.source, gz.encoding), ("load", "tests/test-data.ndjson.gz", "gzip"))
+        self.assertEqual(gz.rows, len(df))
+        self.assertEqual(gz.bytes_decoded, len(DATA))
+        self.assertEqual(gz.bytes_read, Path("tests/test-data.ndjson.gz").stat().st_size)
+        self.assertEqual(plain.rows, len(filtered))
+        self.assertEqual(plain.bytes_read, len(DATA))
+        self.assertEqual(it.rows, sum(map(len, chunks)))
+
+    def test_error(self):
+        with sage_data_client.profile() as profiler:
+            with self.assertRaises(FileNotFoundError):
+                sage_data_client.load("tests/missing.ndjson")
+        self.assertEqual(profiler.records[0].error, "FileNotFoundError")
+
+    def test_trace_memory(self):
+        with sage_data_client.profile(trace_memory=True) as profiler:
+            sage_data_client.load("tests/test-data.ndjson")
+        self.assertGreater(profiler.records[0].peak_memory, 0)
+
+    def test_hooks(self):
+        calls = []
+        sage_data_client.add_hook(calls.append)
+        try:
+            sage_data_client.load("tests/test-data.ndjson")
+        finally:
+            sage_data_client.remove_hook(calls.append)
+        sage_data_client.load("tests/test-data.ndjson")
+        self.assertEqual(len(calls), 1)
+
+        # a failing hook is logged and doesn't break the load
+        def fail(stats):
+            raise RuntimeError("hook failed")
+
+        sage_data_client.add_hook(fail)
+        try:
+            with self.assertLogs("sage_data_client", logging.ERROR):
+                sage_data_client.load("tests/test-data.ndjson")
+        finally:
+            sage_data_client.remove_hook(fail)
+
+    def test_log_hook(self):
+        sage_data_client.add_hook(sage_data_client.log_hook)
+        try:
+            with self.assertLogs("sage_data_client", logging.INFO) as logs:
+                sage_data_client.load("tests/test-data.ndjson")
+        finally:
+            sage_data_client.remove_hook(sage_data_client.log_hook)
+        self.assertIn('"kind": "load"', logs.output[0])
+
+    def test_prometheus(self):
+        with sage_data_client.profile() as profiler:
+            for _ in range(2):
+                df = sage_data_client.load("tests/test-data.ndjson")
+
+        text = profiler.to_prometheus()
+        self.assertIn('sage_data_client_operations_total{kind="load"} 2', text)
+        self.assertIn(f'sage_data_client_rows_total{{kind="load"}} {2 * len(df)}', text)
+        self.assertIn('sage_data_client_stage_seconds_total{kind="load",stage="parse"}', text)
+
+        summary = profiler.summary()
+        self.assertEqual(len(summary), 2)
+        self.assertEqual(summary.rows.tolist(), [len(df)] * 2)
+
+    def test_disabled(self):
+        with profiling.record("load") as stats:
+            self.assertIsNone(stats)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,9 +3,28 @@ import sage_data_client
 from io import BytesIO
 from datetime import datetime, timedelta
 import pandas as pd
+from sage_data_client.server import Server
 
 
 class TestQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = Server(
+            [
+                '{"timestamp":"2021-01-01T10:30:30Z","name":"env.temperature","value":21.5,"meta":{"vsn":"W023"}}',
+                '{"timestamp":"2021-01-01T10:31:30Z","name":"env.temperature","value":22.5,"meta":{"vsn":"W023"}}',
+            ]
+        )
+        cls.server.load("tests/test-data.ndjson")
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def query(self, **kwargs):
+        return sage_data_client.query(endpoint=self.server.endpoint, **kwargs)
+
     def assertValueResponse(self, df):
         self.assertIn("name", df.columns)
         df.name.str
@@ -15,7 +34,7 @@ class TestQuery(unittest.TestCase):
 
     def test_empty_response(self):
         self.assertValueResponse(
-            sage_data_client.query(
+            self.query(
                 start="-2000d",
                 filter={
                     "name": "should.not.every.exist.XYZ",
@@ -37,7 +56,7 @@ class TestQuery(unittest.TestCase):
 
     def test_queries(self):
         self.assertValueResponse(
-            sage_data_client.query(
+            self.query(
                 start="2021-01-01T10:30:00",
                 end="2021-01-01T10:31:00",
                 filter={
@@ -47,7 +66,7 @@ class TestQuery(unittest.TestCase):
         )
 
         self.assertValueResponse(
-            sage_data_client.query(
+            self.query(
                 start="2021-01-01T10:30:00Z",
                 end="2021-01-01T10:31:00Z",
                 filter={
@@ -57,7 +76,7 @@ class TestQuery(unittest.TestCase):
         )
 
         self.assertValueResponse(
-            sage_data_client.query(
+            self.query(
                 start="2021-01-01T10:30:00.123Z",
                 end="2021-01-01T10:31:00.123Z",
                 filter={
@@ -67,7 +86,7 @@ class TestQuery(unittest.TestCase):
         )
 
         self.assertValueResponse(
-            sage_data_client.query(
+            self.query(
                 start="2021-01-01T10:30:00.123456Z",
                 end="2021-01-01T10:31:00.123456Z",
                 filter={
@@ -77,7 +96,7 @@ class TestQuery(unittest.TestCase):
         )
 
         self.assertValueResponse(
-            sage_data_client.query(
+            self.query(
                 start="2021-01-01 10:30:00",
                 end="2021-01-01 10:31:00",
                 filter={
@@ -87,7 +106,7 @@ class TestQuery(unittest.TestCase):
         )
 
         self.assertValueResponse(
-            sage_data_client.query(
+            self.query(
                 start=datetime(2021, 1, 1, 10, 31, 0),
                 end=datetime(2021, 1, 1, 10, 32, 0),
                 filter={
@@ -97,7 +116,7 @@ class TestQuery(unittest.TestCase):
         )
 
         self.assertValueResponse(
-            sage_data_client.query(
+            self.query(
                 start=pd.to_datetime("2021-01-01 10:30:00"),
                 end=pd.to_datetime("2021-01-01 10:31:00"),
                 filter={
@@ -108,7 +127,7 @@ class TestQuery(unittest.TestCase):
 
         for dt in ["-30s", "-3m", "-3min", "-1d", "-1w"]:
             self.assertValueResponse(
-                sage_data_client.query(
+                self.query(
                     start=dt,
                     tail=1,
                     filter={
@@ -118,7 +137,7 @@ class TestQuery(unittest.TestCase):
             )
 
         self.assertValueResponse(
-            sage_data_client.query(
+            self.query(
                 start="-4h",
                 end="-2h",
                 tail=1,
@@ -135,7 +154,7 @@ class TestQuery(unittest.TestCase):
             timedelta(days=-1),
         ]:
             self.assertValueResponse(
-                sage_data_client.query(
+                self.query(
                     start=dt,
                     tail=1,
                     filter={
@@ -202,6 +221,124 @@ class TestQuery(unittest.TestCase):
         self.assertEqual(df.iloc[1].value, "26.09")
         self.assertEqual(df.iloc[2].value, 123)
 
+    def test_load_sparse_meta(self):
+        sample_data = BytesIO(
+            b"""{"timestamp":"2021-10-14T21:42:21.149425156Z","name":"test","value":1,"meta":{"node":"000048b02d15c31f","vsn":"W01C"}}
+{"timestamp":"2021-10-14T21:42:22Z","name":"test","value":2,"meta":{"vsn":"W01A","job":"sage"}}
+{"timestamp":"2021-10-14T21:42:23.5Z","name":"test","value":3,"meta":{}}
+"""
+        )
+        df = sage_data_client.load(sample_data)
+        self.assertValueResponse(df)
+        self.assertEqual(
+            list(df.columns),
+            ["timestamp", "name", "value", "meta.node", "meta.vsn", "meta.job"],
+        )
+        self.assertEqual(str(df.timestamp.dtype), "datetime64[ns, UTC]")
+        self.assertEqual(df.timestamp.iloc[0], pd.Timestamp("2021-10-14T21:42:21.149425156Z"))
+        self.assertEqual(df["meta.node"].isna().tolist(), [False, True, True])
+        self.assertEqual(df["meta.vsn"].isna().tolist(), [False, False, True])
+        self.assertEqual(df["meta.job"].isna().tolist(), [True, False, True])
+        self.assertEqual(df["meta.job"].iloc[1], "sage")
+
+    def test_load_iter(self):
+        df = sage_data_client.load("tests/test-data.ndjson")
+
+        for path in ["tests/test-data.ndjson", "tests/test-data.ndjson.gz"]:
+            chunks = list(sage_data_client.load_iter(path, chunksize=500))
+            self.assertEqual([len(c) for c in chunks], [500, 500, 500, 111])
+            for c in chunks:
+                self.assertValueResponse(c)
+            joined = pd.concat(chunks, ignore_index=True)[df.columns]
+            self.assertTrue((df.fillna("") == joined.fillna("")).all().all())
+
+        self.assertEqual(list(sage_data_client.load_iter("tests/test-empty.ndjson.gz")), [])
+
+        with self.assertRaises(ValueError):
+            sage_data_client.load_iter("tests/test-data.ndjson", chunksize=0)
+
+    def test_load_categorical(self):
+        df = sage_data_client.load("tests/test-data.ndjson")
+        dfc = sage_data_client.load("tests/test-data.ndjson", categorical=True)
+
+        self.assertValueResponse(dfc)
+        self.assertEqual(list(df.columns), list(dfc.columns))
+        for c in dfc.columns:
+            if c == "name" or c.startswith("meta."):
+                self.assertIsInstance(dfc[c].dtype, pd.CategoricalDtype)
+        self.assertEqual(dfc.value.dtype, "float64")
+        self.assertEqual(df["meta.job"].isna().sum(), dfc["meta.job"].isna().sum())
+        self.assertTrue((df.fillna("") == dfc.astype(object).fillna("")).all().all())
+        self.assertLess(dfc.memory_usage(deep=True).sum(), df.memory_usage(deep=True).sum())
+
+        self.assertEqual(len(sage_data_client.load("tests/test-empty.ndjson", categorical=True)), 0)
+
+    def test_load_categorical_values(self):
+        sample_data = b"""{"timestamp":"2021-10-14T21:42:21.149425156Z","name":"test","value":21,"meta":{"vsn":"W01C"}}
+{"timestamp":"2021-10-14T21:42:09.201150729Z","name":"test","value":2.5,"meta":{"vsn":"W01A"}}
+"""
+        df = sage_data_client.load(BytesIO(sample_data), categorical=True)
+        self.assertEqual(df.value.dtype, "float64")
+        self.assertEqual(df.value.tolist(), [21.0, 2.5])
+
+        df = sage_data_client.load(
+            BytesIO(sample_data + b"""{"timestamp":"2021-10-14T21:42:09.201150729Z","name":"test","value":"26.09","meta":{}}\n"""),
+            categorical=True,
+        )
+        self.assertEqual(df.value.tolist(), [21, 2.5, "26.09"])
+        self.assertEqual(df["meta.vsn"].isna().tolist(), [False, False, True])
+
+    def test_load_filter(self):
+        df = sage_data_client.load("tests/test-data.ndjson")
+
+        for filter in [{"vsn": "W06F"}, {"vsn": "W02*|V04*", "sensor": "bme280"}, {"name": "env.*"}, {"vsn": "XXXX"}]:
+            mask = pd.Series(True, index=df.index)
+            for k, v in filter.items():
+                mask &= df[f"meta.{k}" if k != "name" else "name"].str.fullmatch(v.replace(".", r"\.").replace("*", ".*"))
+            expect = df[mask].reset_index(drop=True)
+
+            for path in ["tests/test-data.ndjson", "tests/test-data.ndjson.gz"]:
+                result = sage_data_client.load(path, filter=filter)
+                self.assertEqual(len(result), len(expect))
+                if len(expect) > 0:
+                    pd.testing.assert_frame_equal(result, expect)
+
+    def test_load_time_range(self):
+        df = sage_data_client.load("tests/test-data.ndjson")
+        start = pd.Timestamp("2023-09-28T15:58:00Z")
+        end = pd.Timestamp("2023-09-28T16:00:00Z")
+        expect = df[(df.timestamp >= start) & (df.timestamp < end)].reset_index(drop=True)
+
+        result = sage_data_client.load("tests/test-data.ndjson", start=start, end="2023-09-28T16:00:00Z")
+        pd.testing.assert_frame_equal(result, expect)
+
+    def test_load_columns(self):
+        df = sage_data_client.load("tests/test-data.ndjson")
+
+        result = sage_data_client.load(
+            "tests/test-data.ndjson", filter={"sensor": "bme280"}, columns=["meta.vsn", "value", "meta.missing"]
+        )
+        self.assertEqual(list(result.columns), ["meta.vsn", "value"])
+        expect = df[df["meta.sensor"] == "bme280"][["meta.vsn", "value"]].reset_index(drop=True)
+        pd.testing.assert_frame_equal(result, expect)
+
+        result = sage_data_client.load("tests/test-data.ndjson", columns=["timestamp", "name"], categorical=True)
+        self.assertEqual(list(result.columns), ["timestamp", "name"])
+
+        with self.assertRaises(ValueError):
+            sage_data_client.load("tests/test-data.ndjson", columns=["vsn"])
+
+    def test_load_filter_escaped_values(self):
+        sample_data = b"""{"timestamp":"2021-10-14T21:42:21.149425156Z","name":"test","value":1,"meta":{"plugin":"a\\u0026b"}}
+{"timestamp":"2021-10-14T21:42:22.149425156Z","name":"test","value":2,"meta":{"plugin":"a&b"}}
+{"timestamp":"2021-10-14T21:42:23.149425156Z","name":"test","value":3,"meta":{"plugin":"\\u00e9t\\u00e9"}}
+"""
+        df = sage_data_client.load(BytesIO(sample_data), filter={"plugin": "a&b"})
+        self.assertEqual(df.value.tolist(), [1, 2])
+
+        df = sage_data_client.load(BytesIO(sample_data), filter={"plugin": "\u00e9t*"})
+        self.assertEqual(df.value.tolist(), [3])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,118 @@
+import json
+import unittest
+import pandas as pd
+import sage_data_client
+from sage_data_client.filters import compile_pattern, match_frame, record_matcher
+from sage_data_client.server import Server
+
+
+def records():
+    for i in range(60):
+        for vsn in ["W023", "W039"]:
+            for name, value in [("env.temperature", 20.0), ("env.pressure", 1000.0), ("sys.gps.lat", 41.7)]:
+                meta = {"vsn": vsn, "sensor": "bme680"}
+                if name == "sys.gps.lat":
+                    meta = {"vsn": vsn, "gps": "ublox"}
+                yield json.dumps(
+                    {
+                        "timestamp": f"2023-09-28T16:{i:02d}:00Z",
+                        "name": name,
+                        "value": value + i,
+                        "meta": meta,
+                    }
+                )
+
+
+class TestFilters(unittest.TestCase):
+    def test_compile_pattern(self):
+        self.assertTrue(compile_pattern("env.raingauge.*").fullmatch("env.raingauge.acc"))
+        self.assertFalse(compile_pattern("env.raingauge.*").fullmatch("env_raingauge.acc"))
+        self.assertTrue(compile_pattern("env.temperature|env.pressure").fullmatch("env.pressure"))
+        self.assertFalse(compile_pattern("env.temperature|env.pressure").fullmatch("env.temperature2"))
+        self.assertTrue(compile_pattern("W0*|V0*").fullmatch("V015"))
+
+    def test_match_frame(self):
+        df = pd.DataFrame(
+            {
+                "name": ["env.temperature", "env.pressure", "env.temperature"],
+                "meta.vsn": ["W023", "W023", None],
+            }
+        )
+        self.assertEqual(match_frame(df, {}).tolist(), [True, True, True])
+        self.assertEqual(match_frame(df, {"name": "env.temperature"}).tolist(), [True, False, True])
+        self.assertEqual(match_frame(df, {"name": "env.*", "vsn": "W0*"}).tolist(), [True, True, False])
+        self.assertEqual(match_frame(df, {"sensor": "bme680"}).tolist(), [False, False, False])
+
+
+    def test_record_matcher(self):
+        match = record_matcher({"name": "env.temperature|env.pressure", "vsn": "W0*"})
+        self.assertTrue(match({"name": "env.pressure", "meta": {"vsn": "W023"}}))
+        self.assertFalse(match({"name": "env.pressure", "meta": {"vsn": "V023"}}))
+        self.assertFalse(match({"name": "env.pressure", "meta": {}}))
+        self.assertFalse(match({"name": "env.humidity", "meta": {"vsn": "W023"}}))
+
+
+class TestQueryMany(unittest.TestCase):
+    def setUp(self):
+        self.server = Server(records())
+        self.filters = {
+            "lat": {"name": "sys.gps.lat", "vsn": "W023"},
+            "temperature": {"name": "env.temperature", "vsn": "W023", "sensor": "bme680"},
+            "pressure": {"name": "env.pressure", "vsn": "W023", "sensor": "bme680"},
+            "all": {"vsn": "W039"},
+        }
+
+    def query_many(self, **kwargs):
+        return sage_data_client.query_many(
+            self.filters,
+            start="2023-09-28T16:00:00Z",
+            end="2023-09-28T17:00:00Z",
+            endpoint=self.server.endpoint,
+            **kwargs,
+        )
+
+    def test_matches_separate_queries(self):
+        with self.server:
+            results = self.query_many()
+            self.assertEqual(len(self.server.requests), 3)
+            self.assertEqual(list(results), list(self.filters))
+
+            for label, filter in self.filters.items():
+                expect = sage_data_client.query(
+                    start="2023-09-28T16:00:00Z",
+                    end="2023-09-28T17:00:00Z",
+                    filter=filter,
+                    endpoint=self.server.endpoint,
+                )
+                df = results[label]
+                self.assertEqual(list(df.columns), list(expect.columns))
+                self.assertTrue((df.fillna("") == expect.fillna("")).all().all())
+
+    def test_coalesced_request(self):
+        with self.server:
+            self.query_many()
+
+        filters = [q["filter"] for q in self.server.requests]
+        self.assertIn(
+            {"name": "env.temperature|env.pressure", "vsn": "W023", "sensor": "bme680"},
+            filters,
+        )
+
+    def test_no_coalesce(self):
+        with self.server:
+            results = self.query_many(coalesce=False)
+
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertEqual(set(results["temperature"].name), {"env.temperature"})
+
+    def test_tail(self):
+        with self.server:
+            results = self.query_many(tail=2)
+
+        self.assertEqual(len(results["temperature"]), 2)
+        self.assertEqual(len(results["pressure"]), 2)
+        self.assertEqual(len(results["all"]), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import numpy as np
+import pandas as pd
+import sage_data_client
+
+STATS = ["count", "sum", "mean", "std", "var", "min", "max"]
+
+
+def ticks(count=30, rows=200, seed=0):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2023-09-28T16:00:00Z")
+    for i in range(count):
+        timestamps = start + pd.to_timedelta(i * 60 + np.sort(rng.uniform(0, 60, rows)), unit="s")
+        yield pd.DataFrame(
+            {
+                "timestamp": timestamps,
+                "name": "env.pressure",
+                "value": rng.normal(1000.0, 8.0, rows),
+                "meta.vsn": rng.choice(["W023", "W039", "W07A"], rows),
+                "meta.sensor": rng.choice(["bme280", "bme680"], rows),
+            }
+        )
+
+
+def recompute(frames, window, by, now=None):
+    df = pd.concat(frames, ignore_index=True)
+    now = now if now is not None else df.timestamp.max()
+    df = df[df.timestamp > now - pd.Timedelta(window)]
+    columns = [f"meta.{k}" for k in by]
+    result = df.groupby(columns).value.agg(STATS)
+    result.index.names = by
+    return result
+
+
+class TestRollingAggregator(unittest.TestCase):
+    def test_matches_recompute(self):
+        for by in [["vsn"], ["vsn", "sensor"]]:
+            agg = sage_data_client.RollingAggregator(window="5m", by=by)
+            frames = []
+            for df in ticks():
+                frames.append(df)
+                result = agg.update(df)
+                pd.testing.assert_frame_equal(result, recompute(frames, "5m", by), check_dtype=False)
+
+    def test_long_running_precision(self):
+        agg = sage_data_client.RollingAggregator(window="2m", by=["vsn"])
+        frames = []
+        for df in ticks(count=300, rows=20):
+            frames.append(df)
+            result = agg.update(df)
+        expect = recompute(frames[-5:], "2m", ["vsn"])
+        pd.testing.assert_frame_equal(result, expect, check_dtype=False, rtol=1e-9)
+
+    def test_expire(self):
+        agg = sage_data_client.RollingAggregator(window="1m", by=["vsn"])
+        df = next(ticks())
+        agg.update(df)
+        self.assertEqual(agg.stats()["count"].sum(), len(df))
+
+        agg.expire(df.timestamp.max() + pd.Timedelta("30s"))
+        self.assertEqual(agg.stats()["count"].sum(), (df.timestamp > df.timestamp.max() - pd.Timedelta("30s")).sum())
+
+        agg.expire(df.timestamp.max() + pd.Timedelta("1m"))
+        self.assertEqual(len(agg.stats()), 0)
+
+    def test_single_record_and_non_numeric(self):
+        agg = sage_data_client.RollingAggregator(window="5m", by=["vsn"])
+        df = pd.DataFrame(
+            {
+                "timestamp": pd.to_datetime(["2023-09-28T16:00:00Z", "2023-09-28T16:00:01Z"]),
+                "name": ["env.pressure", "env.pressure"],
+                "value": [1000.0, "error"],
+                "meta.vsn": ["W023", "W023"],
+            }
+        )
+        result = agg.update(df)
+        self.assertEqual(result.loc["W023", "count"], 1)
+        self.assertTrue(np.isnan(result.loc["W023", "std"]))
+        self.assertEqual(result.loc["W023", "min"], 1000.0)
+
+    def test_missing_group_values(self):
+        agg = sage_data_client.RollingAggregator(window="5m", by=["node"])
+        for df in ticks(count=3):
+            agg.update(df)
+        result = agg.stats()
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result["count"].iloc[0], 600)
+
+
+if __name__ == "__main__":
+    unittest.main()
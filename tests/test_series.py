@@ -0,0 +1,94 @@
+import json
+import unittest
+import numpy as np
+import pandas as pd
+import sage_data_client
+from sage_data_client.server import Server
+from sage_data_client.series import SeriesTable
+
+
+class TestSeriesTable(unittest.TestCase):
+    def test_load(self):
+        expect = sage_data_client.load("tests/test-data.ndjson")
+        st = sage_data_client.load("tests/test-data.ndjson", format="series")
+
+        self.assertIsInstance(st, SeriesTable)
+        self.assertEqual(len(st), len(expect))
+        self.assertEqual(st.series_id.dtype, np.int32)
+        self.assertEqual(len(st.series), len(expect.drop(columns=["timestamp", "value"]).drop_duplicates()))
+        pd.testing.assert_frame_equal(st.to_frame(), expect)
+
+        # restricted loads and the pyarrow engine are converted from data frames
+        pd.testing.assert_frame_equal(
+            sage_data_client.load("tests/test-data.ndjson.gz", format="series", filter={"name": "env.*"}).to_frame(),
+            expect[expect.name.str.startswith("env.")].reset_index(drop=True),
+        )
+
+    def test_empty(self):
+        st = sage_data_client.load("tests/test-empty.ndjson", format="series")
+        self.assertEqual(len(st), 0)
+        self.assertEqual(len(st.to_frame()), 0)
+
+    def test_series_order(self):
+        # series with the same meta fields in a different order are the same series
+        lines = [
+            json.dumps({"timestamp": "2023-01-01T00:00:00Z", "name": "a", "value": 1, "meta": {"vsn": "W023", "sensor": "x"}}),
+            json.dumps({"timestamp": "2023-01-01T00:00:01Z", "name": "a", "value": "high", "meta": {"sensor": "x", "vsn": "W023"}}),
+            json.dumps({"timestamp": "2023-01-01T00:00:02Z", "name": "b", "value": 3, "meta": {"vsn": "W023"}}),
+        ]
+        st = sage_data_client.load(lines, format="series")
+        self.assertEqual(st.series_id.tolist(), [0, 0, 1])
+        self.assertEqual(st.series["meta.sensor"].tolist()[0], "x")
+        self.assertTrue(pd.isna(st.series["meta.sensor"].tolist()[1]))
+        self.assertEqual(st.value.tolist(), [1, "high", 3])
+
+    def test_from_frame(self):
+        df = sage_data_client.load("tests/test-data.ndjson")
+        st = SeriesTable.from_frame(df)
+        pd.testing.assert_frame_equal(st.to_frame(), df)
+
+        df = sage_data_client.load("tests/test-data.ndjson", categorical=True)
+        pd.testing.assert_frame_equal(SeriesTable.from_frame(df).to_frame(categorical=True), df, check_categorical=False)
+
+    def test_helpers(self):
+        df = sage_data_client.load("tests/test-data.ndjson")
+        st = sage_data_client.load("tests/test-data.ndjson", format="series")
+
+        pd.testing.assert_frame_equal(st.expand(["meta.vsn"]), df[["meta.vsn"]])
+        pd.testing.assert_frame_equal(st.to_frame(columns=["meta.vsn"]), df[["timestamp", "value", "meta.vsn"]])
+
+        selected = st.select({"name": "env.temperature", "vsn": "W02*"})
+        expect = df[(df.name == "env.temperature") & df["meta.vsn"].str.startswith("W02")].reset_index(drop=True)
+        pd.testing.assert_frame_equal(selected.to_frame(), expect)
+        self.assertEqual(len(selected.series), len(expect.drop(columns=["timestamp", "value"]).drop_duplicates()))
+
+        stats = st.agg(["size", "max"])
+        keys = list(st.series.columns)
+        expect = df.groupby(keys, dropna=False).value.agg(["size", "max"])
+        result = stats.set_index(keys).sort_index()
+        pd.testing.assert_frame_equal(result, expect, check_dtype=False, check_index_type=False)
+
+        wide = st.pivot(by=["meta.vsn", "name"], func="mean")
+        expect = df.pivot_table(index="timestamp", columns=["meta.vsn", "name"], values="value", aggfunc="mean")
+        pd.testing.assert_frame_equal(wide, expect, check_names=False)
+
+    def test_query(self):
+        with open("tests/test-data.ndjson") as f:
+            lines = f.readlines()
+
+        with Server(lines) as server:
+            st = sage_data_client.query(start="2000-01-01T00:00:00Z", filter={"name": "env.temperature"}, format="series", endpoint=server.endpoint)
+            expect = sage_data_client.query(start="2000-01-01T00:00:00Z", filter={"name": "env.temperature"}, endpoint=server.endpoint)
+            kwargs = dict(start="2023-09-28T00:00:00Z", end="2023-09-29T00:00:00Z", filter={"name": "env.temperature"}, shards=2, endpoint=server.endpoint)
+            sharded = sage_data_client.query(format="series", **kwargs)
+            expect_sharded = sage_data_client.query(**kwargs)
+
+        pd.testing.assert_frame_equal(st.to_frame(), expect)
+        pd.testing.assert_frame_equal(sharded.to_frame(), expect_sharded)
+
+        with self.assertRaises(ValueError):
+            sage_data_client.load("tests/test-data.ndjson", format="wide")
+
+
+if __name__ == "__main__":
+    unittest.main()
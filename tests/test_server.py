@@ -0,0 +1,92 @@
+import gzip
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import time
+import unittest
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+import pandas as pd
+import sage_data_client
+from sage_data_client.server import Server
+
+
+def record(timestamp, name="env.temperature", value=1.0, **meta):
+    return json.dumps({"timestamp": timestamp, "name": name, "value": value, "meta": meta})
+
+
+class TestServer(unittest.TestCase):
+    def test_query(self):
+        expect = sage_data_client.load("tests/test-data.ndjson")
+
+        with Server() as server:
+            server.load("tests/test-data.ndjson.gz")
+            df = sage_data_client.query(start="2023-09-28T00:00:00Z", endpoint=server.endpoint)
+
+        self.assertEqual(len(df), len(expect))
+        cols = ["timestamp", "name", "meta.vsn"]
+        pd.testing.assert_frame_equal(
+            df.sort_values(cols, ignore_index=True)[cols],
+            expect.sort_values(cols, ignore_index=True)[cols],
+        )
+
+    def test_filter_time_head_tail(self):
+        lines = [record(f"2023-01-01T00:0{i}:00Z", value=float(i), vsn=vsn) for i in range(5) for vsn in ["W023", "W039", "V008"]]
+
+        server = Server(reversed(lines))
+        q = {"start": "2023-01-01T00:01:00Z", "end": "2023-01-01T00:04:00Z", "filter": {"vsn": "W*|V008"}}
+
+        def values(**kwargs):
+            return [(r["meta"]["vsn"], r["value"]) for r in map(json.loads, server.query(dict(q, **kwargs)).splitlines())]
+
+        # series are returned in the order first added and ordered by timestamp within each series
+        self.assertEqual(values(), [(vsn, v) for vsn in ["V008", "W039", "W023"] for v in [1.0, 2.0, 3.0]])
+        self.assertEqual(values(filter={"vsn": "W0*3"}), [("W023", 1.0), ("W023", 2.0), ("W023", 3.0)])
+        self.assertEqual(values(head=1), [("V008", 1.0), ("W039", 1.0), ("W023", 1.0)])
+        self.assertEqual(values(tail=1), [("V008", 3.0), ("W039", 3.0), ("W023", 3.0)])
+
+    def test_buckets(self):
+        server = Server([record("2023-01-01T00:00:00Z", vsn="W023")])
+        server.add([record("2023-01-01T00:00:00Z", vsn="W039")], bucket="other")
+
+        def vsns(q):
+            return [json.loads(line)["meta"]["vsn"] for line in server.query(q).splitlines()]
+
+        self.assertEqual(vsns({"start": "2023-01-01T00:00:00Z"}), ["W023"])
+        self.assertEqual(vsns({"start": "2023-01-01T00:00:00Z", "bucket": "other"}), ["W039"])
+        self.assertEqual(vsns({"start": "2023-01-01T00:00:00Z", "bucket": "missing"}), [])
+
+    def test_invalid_query(self):
+        with Server() as server:
+            for body in [b"not json", b"[]", b'{"end": "2023-01-01T00:00:00Z"}', b'{"start": "bad time"}']:
+                with self.assertRaises(HTTPError) as ctx:
+                    urlopen(Request(server.endpoint, body))
+                self.assertEqual(ctx.exception.code, 400)
+
+    def test_failures_and_latency(self):
+        with Server([record("2023-01-01T00:00:00Z")], latency=0.2) as server:
+            server.failures.append(503)
+            start = time.perf_counter()
+            client = sage_data_client.Client(server.endpoint, backoff=0.01)
+            df = client.query(start="2023-01-01T00:00:00Z")
+            elapsed = time.perf_counter() - start
+            client.close()
+
+        self.assertEqual(len(df), 1)
+        self.assertEqual(len(server.requests), 2)
+        self.assertGreaterEqual(elapsed, 0.4)
+
+    def test_load_files(self):
+        with TemporaryDirectory() as dir:
+            path = Path(dir, "data.ndjson.gz")
+            path.write_bytes(gzip.compress(Path("tests/test-data.ndjson").read_bytes()))
+            server = Server()
+            server.load(path)
+            server.load(str(path), bucket="copy")
+
+        self.assertEqual(len(server.query({"start": "2023-09-28T00:00:00Z"}).splitlines()), 1611)
+        self.assertEqual(len(server.query({"start": "2023-09-28T00:00:00Z", "bucket": "copy"}).splitlines()), 1611)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+import unittest
+from unittest import mock
+import pandas as pd
+import sage_data_client
+from sage_data_client.server import Server
+
+
+def sort_frame(df):
+    return df.sort_values(["timestamp", "meta.vsn", "meta.sensor"], ignore_index=True).fillna("")
+
+
+class TestShards(unittest.TestCase):
+    def setUp(self):
+        with open("tests/test-data.ndjson", "rb") as f:
+            self.server = Server(f)
+
+    def assertSameRows(self, df1, df2):
+        self.assertEqual(len(df1), len(df2))
+        self.assertEqual(set(df1.columns), set(df2.columns))
+        df1 = sort_frame(df1)
+        df2 = sort_frame(df2)[df1.columns]
+        self.assertTrue((df1 == df2).all().all())
+
+    def query(self, **kwargs):
+        return sage_data_client.query(
+            start="2023-09-28T15:56:00Z",
+            end="2023-09-28T16:02:00Z",
+            endpoint=self.server.endpoint,
+            **kwargs,
+        )
+
+    def test_shards_match_unsharded(self):
+        with self.server:
+            expect = self.query()
+            self.assertEqual(len(expect), 1611)
+
+            for shards in [2, 3, 7]:
+                self.server.requests.clear()
+                df = self.query(shards=shards)
+                self.assertEqual(len(self.server.requests), shards)
+                self.assertTrue(df.timestamp.is_monotonic_increasing)
+                self.assertSameRows(df, expect)
+
+    def test_shards_bounded_by_pool(self):
+        with self.server:
+            expect = self.query()
+            client = sage_data_client.Client(self.server.endpoint, pool_size=2)
+            connections = self.server.connections
+
+            self.server.requests.clear()
+            with mock.patch("sage_data_client.query.ThreadPoolExecutor", wraps=ThreadPoolExecutor) as executor:
+                df = self.query(shards=20, client=client)
+            self.assertEqual(executor.call_args.kwargs["max_workers"], 2)
+            self.assertEqual(len(self.server.requests), 20)
+            self.assertLessEqual(self.server.connections - connections, 2)
+            self.assertSameRows(df, expect)
+            client.close()
+
+    def test_shards_head_tail(self):
+        with self.server:
+            for kwargs in [{"head": 3}, {"tail": 3}, {"head": 1, "filter": {"vsn": "W0*"}}]:
+                expect = self.query(**kwargs)
+                df = self.query(shards=4, **kwargs)
+                self.assertSameRows(df, expect)
+
+    def test_shards_categorical(self):
+        with self.server:
+            expect = self.query()
+            df = self.query(shards=3, categorical=True)
+
+        self.assertIsInstance(df["meta.vsn"].dtype, pd.CategoricalDtype)
+        self.assertSameRows(df.astype(object), expect)
+
+    def test_shards_empty(self):
+        with self.server:
+            df = self.query(shards=4, filter={"name": "should.not.exist"})
+            self.assertEqual(len(df), 0)
+            self.assertIn("timestamp", df.columns)
+
+    def test_invalid_shards(self):
+        with self.assertRaises(ValueError):
+            sage_data_client.query(start="-1h", shards=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import unittest
+import sage_data_client
+from sage_data_client.server import Server
+
+
+def record(timestamp, value, vsn="W001", **meta):
+    meta = dict(vsn=vsn, **meta)
+    return json.dumps(
+        {
+            "timestamp": f"2023-09-28T16:00:{timestamp}Z",
+            "name": "env.temperature",
+            "value": value,
+            "meta": meta,
+        }
+    )
+
+
+class TestWatch(unittest.TestCase):
+    def watch(self, server, **kwargs):
+        return sage_data_client.watch(
+            start="2023-09-28T16:00:00Z",
+            filter={"name": "env.temperature"},
+            interval=0.01,
+            min_interval=0.01,
+            max_interval=0.05,
+            endpoint=server.endpoint,
+            **kwargs,
+        )
+
+    def test_yields_each_record_once(self):
+        server = Server([record("01.5", 1.0), record("02.5", 2.0)])
+
+        with server:
+            stream = self.watch(server)
+
+            df = next(stream)
+            self.assertEqual(df.value.tolist(), [1.0, 2.0])
+
+            # new record at latest timestamp from another node and later records
+            server.add([record("02.5", 3.0, vsn="W002"), record("03.5", 4.0), record("03.5", 5.0, job="x")])
+            df = next(stream)
+            self.assertEqual(df.value.tolist(), [3.0, 4.0, 5.0])
+            self.assertTrue(df.timestamp.is_monotonic_increasing)
+
+            # record at latest timestamp with meta fields not present in previous response
+            server.add([record("03.5", 6.0, vsn="W003", job="y")])
+            df = next(stream)
+            self.assertEqual(df.value.tolist(), [6.0])
+
+            # records at latest timestamp from the same series with a different value or repeated
+            server.add([record("03.5", 7.0), record("03.5", 4.0)])
+            df = next(stream)
+            self.assertEqual(df.value.tolist(), [7.0, 4.0])
+
+            stream.close()
+
+        # all polls should share a single keep alive connection
+        self.assertGreaterEqual(len(server.requests), 4)
+        self.assertEqual(server.connections, 1)
+
+    def test_adaptive_interval(self):
+        server = Server()
+
+        with server:
+            watcher = sage_data_client.stream._Watcher(
+                None, "2023-09-28T16:00:00Z", 1.0, 0.5, 4.0, server.endpoint, None
+            )
+
+            for _ in range(10):
+                self.assertEqual(len(watcher.poll()), 0)
+            self.assertEqual(watcher.interval, 4.0)
+
+            server.add([record("01.5", 1.0)])
+            self.assertEqual(len(watcher.poll()), 1)
+            self.assertEqual(watcher.interval, 2.0)
+
+            server.add([record("02.5", 1.0)])
+            for _ in range(3):
+                watcher.poll()
+            self.assertEqual(watcher.interval, 1.0 * 1.5 * 1.5)
+
+            watcher.close()
+
+    def test_awatch(self):
+        server = Server([record("01.5", 1.0), record("02.5", 2.0)])
+
+        async def collect():
+            stream = sage_data_client.awatch(
+                start="2023-09-28T16:00:00Z",
+                interval=0.01,
+                min_interval=0.01,
+                endpoint=server.endpoint,
+            )
+            df1 = await stream.__anext__()
+            server.add([record("04.5", 3.0)])
+            df2 = await stream.__anext__()
+            await stream.aclose()
+            return df1, df2
+
+        with server:
+            df1, df2 = asyncio.get_event_loop().run_until_complete(collect())
+
+        self.assertEqual(df1.value.tolist(), [1.0, 2.0])
+        self.assertEqual(df2.value.tolist(), [3.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
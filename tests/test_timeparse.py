@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta, timezone
+import subprocess
+import sys
+import unittest
+import pandas as pd
+import sage_data_client
+from sage_data_client.server import Server
+from sage_data_client.timeparse import format_ns, is_absolute, parse_ns
+
+
+NOW = pd.Timestamp("2023-09-28T12:34:56.789123456Z").value
+
+
+class TestTimeparse(unittest.TestCase):
+    def test_absolute(self):
+        for t in [
+            "2023-09-28",
+            "2023-09-28T12:00:00Z",
+            "2023-09-28T12:00:00.123456Z",
+            "2023-09-28T12:00:00.123456789Z",
+            "2023-09-28 12:00:00",
+            "2023-09-28T12:00Z",
+            "2023-09-28T12:00:00+02:00",
+            "2023-09-28T12:00:00-0530",
+            "2024-02-29T23:59:59.5Z",
+        ]:
+            with self.subTest(t=t):
+                self.assertEqual(parse_ns(t), pd.Timestamp(t).value)
+                self.assertTrue(is_absolute(t))
+
+    def test_relative(self):
+        for t, delta in [
+            ("-30s", timedelta(seconds=-30)),
+            ("-3m", timedelta(minutes=-3)),
+            ("-3min", timedelta(minutes=-3)),
+            ("-1h", timedelta(hours=-1)),
+            ("-1d", timedelta(days=-1)),
+            ("-2000d", timedelta(days=-2000)),
+            ("-1w", timedelta(weeks=-1)),
+            ("-1d12h", timedelta(days=-1, hours=-12)),
+            ("-1.5h", timedelta(hours=-1.5)),
+            ("-500ms", timedelta(milliseconds=-500)),
+            ("1h", timedelta(hours=1)),
+        ]:
+            with self.subTest(t=t):
+                self.assertEqual(parse_ns(t, now=NOW), NOW + pd.Timedelta(delta).value)
+                self.assertFalse(is_absolute(t))
+
+    def test_objects(self):
+        dt = datetime(2023, 9, 28, 12, 0, 0, 123456)
+        self.assertEqual(parse_ns(dt), pd.Timestamp(dt).value)
+        # aware times are converted to UTC
+        aware = datetime(2023, 9, 28, 12, tzinfo=timezone(timedelta(hours=2)))
+        self.assertEqual(parse_ns(aware), pd.Timestamp("2023-09-28T10:00:00Z").value)
+        self.assertEqual(parse_ns(pd.Timestamp("2023-09-28T12:00:00.000000001Z")), pd.Timestamp("2023-09-28T12:00:00Z").value + 1)
+        self.assertEqual(parse_ns(timedelta(hours=-1), now=NOW), NOW - 3600 * 10**9)
+        self.assertEqual(parse_ns(pd.Timedelta("-1ns"), now=NOW), NOW - 1)
+        self.assertEqual(parse_ns("now", now=NOW), NOW)
+
+    def test_invalid(self):
+        for t in ["", "-1parsec", "2023-02-30T00:00:00Z", "yesterday-ish", None]:
+            with self.subTest(t=t):
+                with self.assertRaises(ValueError):
+                    parse_ns(t)
+
+    def test_format(self):
+        self.assertEqual(format_ns(NOW), "2023-09-28T12:34:56.789123Z")
+        self.assertEqual(format_ns(0), "1970-01-01T00:00:00.000000Z")
+        self.assertEqual(format_ns(-1000), "1969-12-31T23:59:59.999999Z")
+
+
+class TestPreparedQuery(unittest.TestCase):
+    def test_body(self):
+        q = sage_data_client.Query(start="2023-09-28T00:00:00Z", end="2023-09-29T00:00:00+02:00", filter={"name": "env.*"}, tail=1)
+        self.assertEqual(
+            q.body,
+            {"start": "2023-09-28T00:00:00.000000Z", "end": "2023-09-28T22:00:00.000000Z", "filter": {"name": "env.*"}, "tail": 1},
+        )
+        self.assertEqual(
+            q.data,
+            b'{"start":"2023-09-28T00:00:00.000000Z","end":"2023-09-28T22:00:00.000000Z","filter":{"name":"env.*"},"tail":1}',
+        )
+
+        with self.assertRaises(ValueError):
+            sage_data_client.Query(start="-1h", head=1, tail=1)
+
+    def test_run(self):
+        with open("tests/test-data.ndjson") as f:
+            lines = f.readlines()
+
+        expect = sage_data_client.load("tests/test-data.ndjson")
+        q = sage_data_client.Query(start="2000-01-01T00:00:00Z", filter={"name": "env.temperature"})
+
+        with Server(lines) as server:
+            with sage_data_client.Client(server.endpoint) as client:
+                for _ in range(2):
+                    df = q.run(client=client)
+                    pd.testing.assert_frame_equal(df, expect[expect.name == "env.temperature"].reset_index(drop=True))
+                chunks = list(q.iter(chunksize=2, client=client))
+            self.assertEqual(server.requests, [q.body] * 3)
+
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), df)
+
+    def test_lazy_import(self):
+        code = "import sys, sage_data_client; sage_data_client.Query(start='-1h'); print('pandas' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, check=True).stdout
+        self.assertEqual(output.strip(), b"False")
+
+
+if __name__ == "__main__":
+    unittest.main()